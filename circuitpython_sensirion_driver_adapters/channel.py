@@ -2,10 +2,90 @@
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
 import abc
-from typing import Any, Iterable, Optional, Tuple
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Sequence, Tuple
 
+from circuitpython_sensirion_driver_adapters.clock import Clock, system_clock
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
 
+if TYPE_CHECKING:
+    from circuitpython_sensirion_driver_adapters.instrumentation import Instrumentation
+
+
+class WriteReadRequest(NamedTuple):
+    """The arguments of one TxRxChannel.write_read call, in the same order"""
+    tx_bytes: Optional[Iterable]
+    payload_offset: int
+    response: Optional[RxData]
+    device_busy_delay: float = 0.0
+    post_processing_delay: Optional[float] = None
+    slave_address: Optional[int] = None
+    ignore_errors: bool = False
+
+
+class DeviceBusyTracker:
+    """
+    Remembers until when the devices are busy with the post processing of their last command.
+
+    Instead of sleeping for the post processing delay right after a transfer, a channel records the deadline with
+    set_busy and waits only when it talks to the same device again, and only for the part of the delay that has not
+    elapsed in the meantime.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        """
+        :param clock:
+            The clock that measures the post processing delays, by default the system clock. Note that with a
+            VirtualClock, wait_until_ready_async advances the time of all asyncio tasks, see
+            VirtualClock.sleep_async.
+        """
+        self._clock = clock if clock is not None else system_clock
+        self._busy_until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def clock(self) -> Clock:
+        return self._clock
+
+    def set_busy(self, device: Hashable, delay: Optional[float]) -> None:
+        """
+        Record that the device is busy for the given time from now on.
+
+        :param device:
+            Identifies the device, e.g. its i2c or shdlc address.
+        :param delay:
+            The post processing delay of the last command. Time unit: seconds
+        """
+        if not delay or delay <= 0:
+            return
+        deadline = self._clock.monotonic() + delay
+        with self._lock:
+            self._busy_until[device] = max(deadline, self._busy_until.get(device, 0.0))
+
+    def remaining(self, device: Hashable) -> float:
+        """The time until the device is ready again. Time unit: seconds"""
+        with self._lock:
+            deadline = self._busy_until.get(device)
+            if deadline is None:
+                return 0.0
+            remaining = deadline - self._clock.monotonic()
+            if remaining <= 0:
+                del self._busy_until[device]
+                return 0.0
+            return remaining
+
+    def wait_until_ready(self, device: Hashable) -> None:
+        """Block until the post processing of the last command to the device is finished."""
+        remaining = self.remaining(device)
+        if remaining > 0:
+            self._clock.sleep(remaining)
+
+    async def wait_until_ready_async(self, device: Hashable) -> None:
+        """Same as wait_until_ready, but the remaining time is awaited."""
+        remaining = self.remaining(device)
+        if remaining > 0:
+            await self._clock.sleep_async(remaining)
+
 
 class TxRxChannel(abc.ABC):
     """
@@ -13,6 +93,9 @@ class TxRxChannel(abc.ABC):
     source to any destination.
     """
 
+    #: Measures the transfers of the channel, if set. See set_instrumentation.
+    instrumentation: Optional["Instrumentation"] = None
+
     @abc.abstractmethod
     def write_read(self, tx_bytes: Iterable, payload_offset: int,
                    response: RxData,
@@ -48,6 +131,62 @@ class TxRxChannel(abc.ABC):
         """
         pass
 
+    def write_read_batch(self, requests: Sequence[WriteReadRequest]) -> Tuple[Optional[Tuple[Any, ...]], ...]:
+        """
+        Transfers a sequence of requests in the given order.
+
+        Channels may combine several requests into fewer bus transactions, as long as every request gets its
+        response. This implementation executes one write_read per request.
+
+        :param requests:
+            The arguments of the write_read calls.
+        :return:
+            The response of every request.
+        """
+        return tuple(self.write_read(*request) for request in requests)
+
+    def set_instrumentation(self, instrumentation: Optional["Instrumentation"]) -> None:
+        """
+        Emit a TransferEvent for every transfer of the channel, or stop doing so if instrumentation is None.
+
+        Channels that support instrumentation (I2cChannel, ShdlcChannel and MultiChannel) measure the phases of a
+        transfer. Without instrumentation, they only check this attribute once per transfer.
+        """
+        self.instrumentation = instrumentation
+
+    @abc.abstractmethod
+    def strip_protocol(self, data) -> None:
+        """"""
+        pass
+
+    @property
+    @abc.abstractmethod
+    def timeout(self) -> float:
+        pass
+
+
+class AsyncTxRxChannel(abc.ABC):
+    """
+    This is the abstract base class for any channel that is used with asyncio. It is the counterpart of TxRxChannel.
+
+    Instead of blocking the thread while the device is busy, the channel awaits asyncio.sleep. Hence one event loop
+    can drive many devices whose waiting times overlap.
+    """
+
+    @abc.abstractmethod
+    async def write_read(self, tx_bytes: Iterable, payload_offset: int,
+                         response: RxData,
+                         device_busy_delay: float = 0.0,
+                         post_processing_delay: Optional[float] = None,
+                         slave_address: Optional[int] = None,
+                         ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
+        """
+        Transfers the data to and from sensor.
+
+        The parameters and the return value are the same as for TxRxChannel.write_read.
+        """
+        pass
+
     @abc.abstractmethod
     def strip_protocol(self, data) -> None:
         """"""
@@ -97,6 +236,14 @@ class AbstractMultiChannel(TxRxChannel):
 class TxRxRequest:
     """This class is an adapter to the class I2cConnection. It keeps compatibility with the SensirionI2cCommand"""
 
+    #: Measures the phases of the request, if set. Instrumented channels set it to the timer of their Instrumentation.
+    timer: Optional[Callable[[], float]] = None
+    #: The time spent in waiting for the device, checking the CRCs and unpacking the response, if the timer is set.
+    #: Time unit: seconds
+    busy_wait_time = 0.0
+    crc_time = 0.0
+    unpack_time = 0.0
+
     def __init__(self, channel,
                  tx_bytes=None,
                  response=None,
@@ -137,7 +284,34 @@ class TxRxRequest:
         return 0.0
 
     def interpret_response(self, data):
+        if self.timer is not None:
+            return self._interpret_response_timed(data)
+        if self._response is not None:
+            self._record_frame(data)
         raw_data = self._channel.strip_protocol(data)
         if self._response is not None:
             return self._response.unpack(raw_data)
         return None
+
+    def _interpret_response_timed(self, data):
+        if self._response is not None:
+            self._record_frame(data)
+        timer = self.timer
+        start = timer()
+        try:
+            raw_data = self._channel.strip_protocol(data)
+        finally:
+            stripped = timer()
+            self.crc_time += stripped - start
+        if self._response is None:
+            return None
+        try:
+            return self._response.unpack(raw_data)
+        finally:
+            self.unpack_time += timer() - stripped
+
+    def _record_frame(self, data) -> None:
+        """Pass the received frame with the protocol to a response that records it, e.g. of a RecordingChannel"""
+        record_frame = getattr(self._response, 'record_frame', None)
+        if record_frame is not None:
+            record_frame(data)
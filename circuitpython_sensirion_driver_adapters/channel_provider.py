@@ -2,12 +2,26 @@
 # (c) Copyright 2023 Sensirion AG, Switzerland
 
 import abc
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Set, Tuple
 
-from sensirion_i2c_driver import CrcCalculator
+from circuitpython_sensirion_driver_adapters import lazy_import
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.readiness import ReadinessStrategy
 
-from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
-from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import ShdlcChannel
+if TYPE_CHECKING:
+    from sensirion_i2c_driver import CrcCalculator
+
+    from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+    from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import ShdlcChannel
+
+# The channel classes are imported on first access, such that a process that uses only one protocol does not import
+# the driver packages of the other one.
+_lazy_attributes = {
+    'I2cChannel': 'circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel',
+    'ShdlcChannel': 'circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel',
+}
+
+__getattr__ = lazy_import.lazy_attributes(globals(), _lazy_attributes)
 
 
 class ChannelProvider(abc.ABC):
@@ -39,7 +53,8 @@ class I2cChannelProvider(ChannelProvider):
 
     def __init__(self,
                  i2c_frequency: float = 100e3,
-                 supply_voltage: float = 3.3) -> None:
+                 supply_voltage: float = 3.3,
+                 readiness: Optional[ReadinessStrategy] = None) -> None:
         """
         Initialization of channel provider with defaults. Not all values are used by all channel providers.
 
@@ -47,20 +62,50 @@ class I2cChannelProvider(ChannelProvider):
             The i2c frequency that is applicable on the i2c bus
         :param supply_voltage:
             The supply voltage of the sensor
+        :param readiness:
+            Decides how long to wait until the hardware is ready after the channel is prepared. Each provider has its
+            own default.
         """
         self.i2c_frequency = i2c_frequency
         self.supply_voltage = supply_voltage
+        self.readiness = readiness
+        self._ready_devices: Set[int] = set()
+
+    def wait_until_powered(self) -> None:
+        """Apply a readiness strategy that does not depend on a device; called when the hardware is initialized."""
+        if self.readiness is not None and not self.readiness.per_device:
+            self.readiness.wait_until_ready()
+
+    def wait_until_device_ready(self, channel: "I2cChannel") -> None:
+        """Apply a per device readiness strategy; called when the first channel to a device is created."""
+        if self.readiness is None or not self.readiness.per_device or channel.slave_address in self._ready_devices:
+            return
+        self.readiness.wait_until_ready(channel.probe)
+        self._ready_devices.add(channel.slave_address)
+
+    def forget_ready_devices(self) -> None:
+        """
+        Apply the per device readiness strategy again when the next channel to a device is created; called when the
+        devices are reset or the resources of the provider are released.
+        """
+        self._ready_devices.clear()
 
     @staticmethod
-    def try_create_crc_calculator(parameters: Optional[Tuple[int, int, int, int]]) -> Optional[CrcCalculator]:
-        """Evaluate the CRC parameters. If not None, create a CrcCalculator instance. Otherwise, return None."""
+    def try_create_crc_calculator(parameters: Optional[Tuple[int, int, int, int]]) -> Optional["CrcCalculator"]:
+        """
+        Evaluate the CRC parameters. If not None, return a CrcCalculator instance. Otherwise, return None.
+
+        Calculators are shared between all channels with the same CRC parameters, such that the lookup table of the
+        table driven calculator is computed only once.
+        """
         if parameters is None:
             return None
-        return CrcCalculator(*parameters)
+        from circuitpython_sensirion_driver_adapters.i2c_adapter.crc_engine import TableCrcCalculator
+        return TableCrcCalculator.create(tuple(parameters))
 
     @abc.abstractmethod
     def get_channel(self, slave_address: int,
-                    crc_parameters: Optional[Tuple[int, int, int, int]]) -> I2cChannel:
+                    crc_parameters: Optional[Tuple[int, int, int, int]]) -> "I2cChannel":
         """
         Create and return an initialized channel to communicate with the sensor.
 
@@ -74,15 +119,33 @@ class I2cChannelProvider(ChannelProvider):
             set to None, no crc will be computed.
         """
 
+    def get_async_channel(self, slave_address: int,
+                          crc_parameters: Optional[Tuple[int, int, int, int]]) -> AsyncTxRxChannel:
+        """
+        Create and return an initialized asyncio channel to communicate with the sensor.
+
+        The parameters are the same as for get_channel.
+        """
+        raise NotImplementedError()
+
 
 class ShdlcChannelProvider(ChannelProvider):
     """Provide an abstract interface that can be used to create shdlc channels for different purposes."""
 
     @abc.abstractmethod
-    def get_channel(self, channel_delay: float) -> ShdlcChannel:
+    def get_channel(self, channel_delay: float) -> "ShdlcChannel":
         """
         Create and return a SHDLC channel.
 
         :param channel_delay:
             Any roundtrip time below this channel delay will not cause a timeout exception.
         """
+
+    def get_async_channel(self, channel_delay: float) -> AsyncTxRxChannel:
+        """
+        Create and return an asyncio SHDLC channel.
+
+        :param channel_delay:
+            Any roundtrip time below this channel delay will not cause a timeout exception.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import abc
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+
+class Clock(abc.ABC):
+    """
+    Source of time for the components that wait for devices, e.g. the mocks, the ShdlcChannel and the multi drivers.
+
+    Work that is executed concurrently on worker threads is started with branch and merged back with join. The
+    SystemClock ignores this, but a VirtualClock needs it to let the branches run in parallel in virtual time.
+    """
+
+    #: True if the time does not pass by itself
+    virtual: bool = False
+
+    @abc.abstractmethod
+    def monotonic(self) -> float:
+        """The current time. Time unit: seconds"""
+
+    @abc.abstractmethod
+    def sleep(self, seconds: float) -> None:
+        """Block the calling thread for the given time. Time unit: seconds"""
+
+    async def sleep_async(self, seconds: float) -> None:
+        """Same as sleep, but the time is awaited."""
+        # asyncio is imported only here, since it is costly to import and not needed by synchronous applications
+        import asyncio
+        await asyncio.sleep(seconds)
+
+    def branch(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Prepare a function that is run concurrently to the calling thread, e.g. on a worker thread.
+
+        The branch starts at the current time of the calling thread.
+
+        :param function:
+            The function that is run by the branch.
+        :return:
+            A callable with the same signature as function.
+        """
+        return function
+
+    def join(self, branches: Iterable[Callable[..., Any]]) -> None:
+        """Wait in the calling thread until all branches are finished. The branches must have been run already."""
+
+
+class SystemClock(Clock):
+    """The clock of the system: time.monotonic and time.sleep"""
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class _VirtualBranch:
+    __slots__ = ('_clock', '_function', 'start_time', 'end_time')
+
+    def __init__(self, clock: "VirtualClock", function: Callable[..., Any], start_time: float) -> None:
+        self._clock = clock
+        self._function = function
+        self.start_time = start_time
+        self.end_time: Optional[float] = None
+
+    def __call__(self, *args, **kwargs) -> Any:
+        outer_time = self._clock._enter_branch(self.start_time)
+        try:
+            return self._function(*args, **kwargs)
+        finally:
+            self.end_time = self._clock._leave_branch(outer_time)
+
+
+class VirtualClock(Clock):
+    """
+    Clock whose time advances instantly when it is slept.
+
+    Simulations of many devices with long measurement delays run as fast as the code allows, while the order of the
+    events and the busy times of the devices are the same as with the system clock.
+
+    Each branch has its own time line that starts at the time of the thread that created it. Joining the branches
+    advances the joining thread to the end of the latest branch, hence branches that run on worker threads overlap
+    in virtual time as they would in real time. All other threads and all asyncio tasks share the main time line,
+    i.e. their sleeps add up.
+    """
+
+    virtual = True
+
+    def __init__(self, start: float = 0.0) -> None:
+        """
+        :param start:
+            The initial time. Time unit: seconds
+        """
+        self._now = start
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def monotonic(self) -> float:
+        now = getattr(self._local, 'now', None)
+        if now is not None:
+            return now
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.advance_to(self.monotonic() + seconds)
+
+    async def sleep_async(self, seconds: float) -> None:
+        """
+        Advance the time like sleep and let the other tasks run.
+
+        The tasks of an event loop run on one thread and therefore share one time line: the virtual delays of tasks
+        that are awaited concurrently, e.g. with asyncio.gather, add up instead of overlapping. Simulations of
+        concurrent asyncio channels measure the sum of their delays.
+        """
+        import asyncio
+        self.sleep(seconds)
+        await asyncio.sleep(0)  # let the other tasks run as they would while sleeping
+
+    def advance_to(self, deadline: float) -> None:
+        """Advance the time of the calling thread to the deadline, if it is later than the current time."""
+        if getattr(self._local, 'now', None) is not None:
+            self._local.now = max(self._local.now, deadline)
+            return
+        with self._lock:
+            self._now = max(self._now, deadline)
+
+    def branch(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        return _VirtualBranch(self, function, self.monotonic())
+
+    def join(self, branches: Iterable[Callable[..., Any]]) -> None:
+        end_times = [branch.end_time for branch in branches if isinstance(branch, _VirtualBranch)]
+        assert None not in end_times, "Branches must be finished before they are joined"
+        if end_times:
+            self.advance_to(max(end_times))
+
+    def _enter_branch(self, start_time: float) -> Optional[float]:
+        # a branch may also be run by a thread that is in a branch itself
+        outer_time = getattr(self._local, 'now', None)
+        self._local.now = start_time
+        return outer_time
+
+    def _leave_branch(self, outer_time: Optional[float]) -> float:
+        end_time, self._local.now = self._local.now, outer_time
+        return end_time
+
+
+system_clock = SystemClock()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import asyncio
+from typing import Any, Iterable, Optional, Tuple
+
+from sensirion_i2c_driver import I2cConnection
+
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel, RawI2cCommand
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
+
+
+class AsyncI2cConnection(I2cConnection):
+    """
+    I2c connection that waits for the device with asyncio.sleep instead of blocking the thread.
+
+    The write and the read part of a command are executed as two separate transfers in the default executor of the
+    event loop, since the transceivers block. Only single channel transceivers are supported.
+    """
+
+    async def execute_async(self, slave_address, command, wait_post_process=True):
+        """
+        Perform write and read operations of an i2c command and await the read delay and post processing time.
+
+        :param slave_address:
+            The slave address of the device to communicate with.
+        :param command:
+            The command to execute.
+        :param wait_post_process:
+            If True and the command needs some time for post processing, the post processing time is awaited.
+        :return:
+            The interpreted data of the command.
+        """
+        assert not self.is_multi_channel, "Multi channel transceivers are not supported"
+        loop = asyncio.get_event_loop()  # the running loop; get_running_loop requires Python 3.7
+        response = b""
+        if command.tx_data is not None:
+            await loop.run_in_executor(None, self.execute, slave_address,
+                                       RawI2cCommand(command.tx_data, None, command.timeout))
+            if command.read_delay > 0:
+                await asyncio.sleep(command.read_delay)
+        if command.rx_length is not None:
+            response = await loop.run_in_executor(None, self.execute, slave_address,
+                                                  RawI2cCommand(None, command.rx_length, command.timeout))
+        if wait_post_process and command.post_processing_time > 0.0:
+            await asyncio.sleep(command.post_processing_time)
+        return command.interpret_response(response)
+
+
+class AsyncI2cChannel(AsyncTxRxChannel):
+    """This is the asyncio counterpart of the I2cChannel.
+
+    The connection must provide a coroutine execute_async(slave_address, request), as the AsyncI2cConnection and the
+    I2cConnectionMock do.
+    """
+
+    def __init__(self, connection, slave_address=0, crc=None) -> None:
+        """Initialization of asyncio i2c channel.
+
+        :param connection:
+            The i2c connection that is used to communicate with the device.
+        :param slave_address:
+            The i2c slave address of the attached device.
+        :param crc:
+            The CrcCalculator that is used to compute the CRC. If crc is not provided, no checksums will be inserted.
+        """
+        self._connection = connection
+        # the i2c channel is used to encode requests and decode responses
+        self._i2c_channel = I2cChannel(connection, slave_address=slave_address, crc=crc)
+
+    async def write_read(self, tx_bytes: Iterable,
+                         payload_offset: int,
+                         response: Optional[RxData],
+                         device_busy_delay: float = 0.0,
+                         post_processing_delay: Optional[float] = None,
+                         slave_address: Optional[int] = None,
+                         ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
+        """Implementation of abstract write_read method."""
+
+        tx_rx = self._i2c_channel.create_request(tx_bytes, payload_offset, response,
+                                                 device_busy_delay=device_busy_delay,
+                                                 post_processing_delay=post_processing_delay)
+        if slave_address is None:
+            slave_address = self._i2c_channel.slave_address
+        try:
+            result = await self._connection.execute_async(slave_address, tx_rx)
+        except Exception as error:
+            if not ignore_errors:
+                raise error
+            result = None
+        return result
+
+    @property
+    def timeout(self):
+        return self._i2c_channel.timeout
+
+    def strip_protocol(self, data):
+        """Validates and removes the CRCs of the received data. See I2cChannel.strip_protocol"""
+        return self._i2c_channel.strip_protocol(data)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from sensirion_i2c_driver.crc_calculator import CrcCalculator
+from sensirion_i2c_driver.errors import I2cChecksumError
+
+from circuitpython_sensirion_driver_adapters import lazy_import
+
+CrcParameters = Tuple[int, int, int, int]
+
+
+class TableCrcCalculator(CrcCalculator):
+    """
+    CRC calculator that uses a precomputed lookup table.
+
+    The calculator computes the same checksums as the CrcCalculator it derives from, but it processes a byte
+    with a single table lookup. In addition, it is able to check and strip or to insert the CRCs of a complete
+    i2c frame in one pass.
+
+    Only 8 bit wide CRCs are supported. Use the method create to get a calculator that is shared between all
+    users of the same CRC parameters.
+    """
+
+    _instances: Dict[CrcParameters, "TableCrcCalculator"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, width, polynomial, init_value=0, final_xor=0):
+        """
+        Constructs a calculator object with the given CRC parameters.
+
+        :param width:
+            Number of bits of the CRC. Must be 8.
+        :param polynomial:
+            The polynomial of the CRC, without leading '1'.
+        :param init_value:
+            Initialization value of the CRC.
+        :param final_xor:
+            Final XOR value of the CRC.
+        """
+        if width != 8:
+            raise ValueError(f"Table driven CRC supports only a width of 8 bits, not {width}")
+        super().__init__(width, polynomial, init_value, final_xor)
+        self._table = bytes(CrcCalculator(width, polynomial, 0, 0)([value]) for value in range(256))
+        # CRC state after the first byte of a word, the init value is already applied
+        self._first_table = bytes(self._table[init_value ^ value] for value in range(256))
+        self._word_table = None
+
+    @property
+    def parameters(self) -> CrcParameters:
+        return self._width, self._polynomial, self._init_value, self._final_xor
+
+    @property
+    def table(self) -> bytes:
+        return self._table
+
+    @property
+    def word_table(self):
+        """
+        Lookup table with the CRC of every 16 bit word as numpy array (requires numpy).
+
+        The table is indexed with the big endian value of the two byte word and computed on first usage.
+        """
+        if self._word_table is None:
+            np = lazy_import.numpy()
+            table = np.frombuffer(self._table, dtype=np.uint8)
+            first_table = np.frombuffer(self._first_table, dtype=np.uint8)
+            words = np.arange(1 << 16, dtype=np.uint32)
+            self._word_table = table[first_table[words >> 8] ^ (words & 0xFF)] ^ np.uint8(self._final_xor)
+        return self._word_table
+
+    @classmethod
+    def create(cls, parameters: CrcParameters) -> CrcCalculator:
+        """
+        Return the shared calculator for a set of CRC parameters.
+
+        The lookup table is computed only once per set of parameters. Parameter sets that are not supported by the
+        table driven calculator fall back to a plain CrcCalculator.
+        """
+        with cls._lock:
+            calculator = cls._instances.get(parameters)
+            if calculator is None:
+                if parameters[0] != 8:
+                    return CrcCalculator(*parameters)
+                calculator = cls(*parameters)
+                cls._instances[parameters] = calculator
+            return calculator
+
+    @classmethod
+    def from_calculator(cls, crc: Optional[CrcCalculator]) -> Optional[CrcCalculator]:
+        """Return the shared table driven equivalent of a CrcCalculator or the calculator itself if not supported."""
+        if crc is None or isinstance(crc, TableCrcCalculator) or type(crc) is not CrcCalculator:
+            return crc
+        return cls.create((crc._width, crc._polynomial, crc._init_value, crc._final_xor))
+
+    def __call__(self, data):
+        table = self._table
+        crc = self._init_value
+        for value in data:
+            crc = table[crc ^ value]
+        return crc ^ self._final_xor
+
+    def word_crcs(self, first_bytes, second_bytes) -> bytes:
+        """Compute the CRC of each two byte word given as sequence of first bytes and sequence of second bytes."""
+        table, first_table, final_xor = self._table, self._first_table, self._final_xor
+        return bytes(table[first_table[a] ^ b] ^ final_xor for a, b in zip(first_bytes, second_bytes))
+
+    def strip_and_check(self, data) -> Optional[bytes]:
+        """
+        Check and remove the CRC that follows every two byte word of an i2c frame.
+
+        :param data:
+            The byte string including crc's.
+        :return:
+            data without crc checksums or None if the data is empty.
+        :raise ~sensirion_i2c_driver.errors.I2cChecksumError:
+            If a received CRC was wrong.
+        """
+        first, second, received = data[0::3], data[1::3], data[2::3]
+        expected = self.word_crcs(first, second)
+        if expected != received:
+            for received_crc, expected_crc in zip(received, expected):
+                if received_crc != expected_crc:
+                    raise I2cChecksumError(received_crc, expected_crc, data)
+        data_without_crc = bytearray(len(first) + len(second))
+        data_without_crc[0::2] = first
+        data_without_crc[1::2] = second
+        return bytes(data_without_crc) if len(data_without_crc) else None
+
+    def strip_and_check_vectorized(self, data) -> Optional[bytes]:
+        """
+        Check and remove the CRCs of an i2c frame with numpy.
+
+        Same as strip_and_check, but all CRCs are looked up at once in the word table. This pays off only for long
+        frames, since the conversion to and from numpy arrays has some fixed cost.
+
+        :param data:
+            The byte string including crc's.
+        :return:
+            data without crc checksums or None if the data is empty.
+        :raise ~sensirion_i2c_driver.errors.I2cChecksumError:
+            If a received CRC was wrong. The error reports the first wrong word.
+        """
+        np = lazy_import.numpy()
+        frame = np.frombuffer(data, dtype=np.uint8)
+        nr_of_words = len(frame) // 3
+        words = frame[:3 * nr_of_words].reshape(nr_of_words, 3)
+        expected = self.word_table[(words[:, 0].astype(np.uint32) << 8) | words[:, 1]]
+        wrong = np.flatnonzero(expected != words[:, 2])
+        if wrong.size:
+            i = wrong[0]
+            raise I2cChecksumError(int(words[i, 2]), int(expected[i]), data)
+        data_without_crc = words[:, :2].tobytes() + frame[3 * nr_of_words:].tobytes()
+        return data_without_crc if len(data_without_crc) else None
+
+    def insert(self, payload, header=b'') -> bytes:
+        """
+        Insert a CRC after every two byte word of the payload.
+
+        :param payload:
+            The bytes to be protected by a CRC. A trailing single byte is copied without CRC.
+        :param header:
+            Bytes that are copied unchanged to the beginning of the frame (e.g. the command).
+        :return:
+            The frame consisting of header and payload with CRCs.
+        """
+        frame = bytearray(self.frame_length(len(payload), len(header)))
+        self.insert_into(frame, payload, header)
+        return bytes(frame)
+
+    def insert_into(self, buffer, payload, header=b'') -> int:
+        """
+        Same as insert, but the frame is written to the beginning of a writable buffer.
+
+        :param buffer:
+            A bytearray or writable memoryview with at least frame_length bytes.
+        :param payload:
+            The bytes to be protected by a CRC. Any bytes-like object, a memoryview avoids copying the payload.
+        :param header:
+            Bytes that are copied unchanged to the beginning of the frame (e.g. the command).
+        :return:
+            The number of bytes written.
+        """
+        first, second = payload[0::2], payload[1::2]
+        header_len = len(header)
+        length = header_len + len(first) + 2 * len(second)
+        buffer[:header_len] = header
+        buffer[header_len:length:3] = first
+        buffer[header_len + 1:length:3] = second
+        buffer[header_len + 2:length:3] = self.word_crcs(first, second)
+        return length
+
+    @staticmethod
+    def frame_length(payload_length: int, header_length: int = 0) -> int:
+        """Length of a frame with a CRC after every complete two byte word of the payload"""
+        return header_length + payload_length + payload_length // 2
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sensirion_i2c_driver import I2cConnection
+
+
+class _BusJob:
+    """One i2c command that is executed by the bus scheduler in a write and a read phase."""
+
+    __slots__ = ('slave_address', 'command', 'wait_post_process', 'future', 'is_written')
+
+    def __init__(self, slave_address: int, command, wait_post_process: bool) -> None:
+        self.slave_address = slave_address
+        self.command = command
+        self.wait_post_process = wait_post_process
+        self.future: Future = Future()
+        self.is_written = False
+
+
+class I2cBusScheduler:
+    """
+    Schedules the i2c commands of several channels that share one transceiver.
+
+    The scheduler owns the transceiver and executes the write and the read part of each command separately. The read
+    delay of a command and its post processing time are used as deadlines: While one device is busy, the commands of
+    other devices are written and read. Commands to the same slave address are executed in the order of submission.
+
+    The scheduler can be used like an I2cConnection by any number of I2cChannel objects. The bus is only shared
+    efficiently if the channels are used from several threads, e.g. by a multi driver with execute_concurrent set to
+    True. The calling thread is blocked until its command is completed; the post processing time however does not
+    block the caller but delays the next command to the same device. The post processing time of a command to the
+    general call address delays the next command to every device.
+    """
+
+    GENERAL_CALL_ADDRESS = 0x00
+
+    def __init__(self, transceiver) -> None:
+        """
+        :param transceiver:
+            A single channel i2c transceiver of API version 1, e.g. a LinuxI2cTransceiver.
+        """
+        # the connection is used to call the transceiver and to interpret its responses
+        self._connection = I2cConnection(transceiver)
+        assert not self._connection.is_multi_channel, "Multi channel transceivers are not supported"
+        self._condition = threading.Condition()
+        self._deadlines: List[Tuple[float, int, _BusJob]] = []
+        self._sequence = itertools.count()
+        self._pending: Dict[int, Deque[_BusJob]] = {}
+        self._ready_time: Dict[int, float] = {}
+        # the devices are busy until this time after a command to the general call address, e.g. a reset
+        self._all_ready_time = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._error: Optional[BaseException] = None
+
+    def execute(self, slave_address: int, command, wait_post_process: bool = True):
+        """
+        Execute an i2c command. This method has the same interface as I2cConnection.execute.
+
+        :param slave_address:
+            The slave address of the device to communicate with.
+        :param command:
+            The command to execute.
+        :param wait_post_process:
+            If True, the next command to the same device is delayed by the post processing time of this command.
+        :return:
+            The interpreted data of the command.
+        """
+        response = self.submit(slave_address, command, wait_post_process).result()
+        return self._connection._interpret_response(command, response)
+
+    def submit(self, slave_address: int, command, wait_post_process: bool = True) -> Future:
+        """
+        Queue an i2c command for execution.
+
+        :return:
+            A future that is resolved with the raw response of the transceiver.
+        :raises RuntimeError:
+            If the scheduler is closed or its dispatcher thread failed.
+        """
+        job = _BusJob(slave_address, command, wait_post_process)
+        with self._condition:
+            if self._error is not None:
+                raise RuntimeError("The i2c bus scheduler failed") from self._error
+            if self._closed:
+                raise RuntimeError("The i2c bus scheduler is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="i2c-bus-scheduler", daemon=True)
+                self._thread.start()
+            pending = self._pending.setdefault(slave_address, deque())
+            pending.append(job)
+            if len(pending) == 1:
+                self._schedule(self._ready_at(slave_address), job)
+        return job.future
+
+    def close(self) -> None:
+        """Complete all queued commands and stop the scheduler. The transceiver is not closed."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _ready_at(self, slave_address: int) -> float:
+        return max(self._ready_time.get(slave_address, 0.0), self._all_ready_time)
+
+    def _schedule(self, deadline: float, job: _BusJob) -> None:
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), job))
+        self._condition.notify()
+
+    def _next_job(self) -> Optional[_BusJob]:
+        """Wait until the earliest deadline has passed and return the corresponding job."""
+        with self._condition:
+            while True:
+                if not self._deadlines:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                delay = self._deadlines[0][0] - now
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                job = heapq.heappop(self._deadlines)[2]
+                ready_time = self._ready_at(job.slave_address)
+                if not job.is_written and ready_time > now:
+                    # the job was scheduled before a general call made all devices busy
+                    self._schedule(ready_time, job)
+                    continue
+                return job
+
+    def _run(self) -> None:
+        try:
+            job = self._next_job()
+            while job is not None:
+                self._step(job)
+                job = self._next_job()
+        except BaseException as error:
+            self._fail(error)
+
+    def _fail(self, error: BaseException) -> None:
+        """Fail all queued commands with the error of the dispatcher thread and reject new ones."""
+        with self._condition:
+            self._error = error
+            jobs = [job for pending in self._pending.values() for job in pending]
+            self._pending.clear()
+            self._deadlines.clear()
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    def _step(self, job: _BusJob) -> None:
+        """Execute the next bus operation of a job."""
+        command = job.command
+        try:
+            if not job.is_written and command.tx_data is not None:
+                response = self._transceive(job.slave_address, command.tx_data, None, command.timeout)
+                job.is_written = True
+                if command.rx_length is not None:
+                    with self._condition:
+                        self._schedule(time.monotonic() + command.read_delay, job)
+                    return
+            else:
+                response = self._transceive(job.slave_address, None, command.rx_length, command.timeout)
+        except Exception as error:
+            self._complete(job, error)
+            return
+        self._complete(job, response)
+
+    def _transceive(self, slave_address, tx_data, rx_length, timeout):
+        response = self._connection._transceive(slave_address=slave_address,
+                                                tx_data=tx_data,
+                                                rx_length=rx_length,
+                                                read_delay=0.0,
+                                                timeout=timeout)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def _complete(self, job: _BusJob, response) -> None:
+        """Release the device for the next command after the post processing time and resolve the future."""
+        ready_time = time.monotonic()
+        if job.wait_post_process:
+            ready_time += job.command.post_processing_time
+        with self._condition:
+            self._ready_time[job.slave_address] = ready_time
+            if job.slave_address == self.GENERAL_CALL_ADDRESS:
+                self._all_ready_time = max(self._all_ready_time, ready_time)
+            pending = self._pending[job.slave_address]
+            pending.popleft()
+            if pending:
+                self._schedule(ready_time, pending[0])
+            else:
+                del self._pending[job.slave_address]
+        if isinstance(response, Exception):
+            job.future.set_exception(response)
+        else:
+            job.future.set_result(response)
@@ -1,20 +1,55 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
-from typing import Any, Iterable, Optional, Tuple
+import threading
+from typing import Any, Callable, Iterable, Optional, Sequence, Tuple
 
 from sensirion_i2c_driver.crc_calculator import CrcCalculator
 from sensirion_i2c_driver.errors import I2cChecksumError
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel, TxRxRequest
+from circuitpython_sensirion_driver_adapters import lazy_import
+from circuitpython_sensirion_driver_adapters.channel import DeviceBusyTracker, TxRxChannel, TxRxRequest, \
+    WriteReadRequest
+from circuitpython_sensirion_driver_adapters.clock import Clock
+from circuitpython_sensirion_driver_adapters.i2c_adapter.crc_engine import TableCrcCalculator
+from circuitpython_sensirion_driver_adapters.instrumentation import TransferEvent, command_id
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
 
 
+class RawI2cCommand:
+    """An i2c command without protocol: the received bytes are returned as they are"""
+    read_delay = 0.0
+    post_processing_time = 0.0
+
+    def __init__(self, tx_data: Optional[bytes], rx_length: Optional[int], timeout: float = 0.0) -> None:
+        self.tx_data = tx_data
+        self.rx_length = rx_length
+        self.timeout = timeout
+
+    @staticmethod
+    def interpret_response(data):
+        return data
+
+
 class I2cChannel(TxRxChannel):
     """This is the concrete channel implementation to be used with I2cConnection of the package
-    sensirion-i2c-driver"""
+    sensirion-i2c-driver
 
-    def __init__(self, connection, slave_address=0, crc=None) -> None:
+    If the connection opts in with the attribute defers_post_processing (as the I2cConnectionMock and the
+    SimulatedI2cBus do), the post processing time of a command is not slept after the command. The channel records
+    until when the device is busy and the next command to the same device waits for the remaining time only. Other
+    connections, e.g. an I2cConnection, wait for the post processing time right after the command, since channels
+    with different busy trackers may talk to the same device. The I2cBusScheduler defers the wait by itself.
+    """
+
+    GENERAL_CALL_ADDRESS = 0x00
+
+    # Received frames with at least this many bytes are checked with numpy, if numpy is available.
+    vectorized_crc_min_length = 384
+
+    def __init__(self, connection, slave_address=0, crc=None, reuse_tx_buffer=False,
+                 busy_tracker: Optional[DeviceBusyTracker] = None, clock: Optional[Clock] = None,
+                 on_general_call_reset: Optional[Callable[[], None]] = None) -> None:
         """Initialization of i2c channel.
 
         :param connection:
@@ -23,10 +58,26 @@ class I2cChannel(TxRxChannel):
             The i2c slave address of the attached device.
         :param crc:
             The CrcCalculator that is used to compute the CRC. If crc is not provided, no checksums will be inserted.
+            A plain 8 bit CrcCalculator is replaced by the shared table driven calculator with the same parameters.
+        :param reuse_tx_buffer:
+            If True, the raw bytes to send are built in a buffer that is owned by the channel and reused for every
+            command of the same thread. The connection gets one bytes copy of the frame, since the i2c transceivers
+            accept bytes only.
+        :param busy_tracker:
+            Keeps track of the post processing times. Channels that talk to the same bus should share a tracker.
+        :param clock:
+            The clock that measures the post processing times, if no busy_tracker is given. By default the system
+            clock is used.
+        :param on_general_call_reset:
+            Called after a general call reset was issued, e.g. by the channel provider to forget which devices are
+            ready.
         """
         self._connection = connection
         self._slave_address = slave_address
-        self._crc = crc
+        self._crc = TableCrcCalculator.from_calculator(crc)
+        self._tx_buffers = threading.local() if reuse_tx_buffer else None
+        self._busy = busy_tracker if busy_tracker is not None else DeviceBusyTracker(clock)
+        self._on_general_call_reset = on_general_call_reset
 
     def write_read(self, tx_bytes: Iterable,
                    payload_offset: int,
@@ -36,43 +87,241 @@ class I2cChannel(TxRxChannel):
                    slave_address: Optional[int] = None,
                    ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
         """Implementation of abstract write_read method."""
-
-        tx_bytes = I2cChannel.build_tx_data(tx_bytes, payload_offset, self._crc)
-        rx_len = None
-        if response:
-            rx_len = response.rx_length
-            if self._crc:
-                rx_len = 3 * rx_len // 2
-
-        tx_rx = TxRxRequest(channel=self, response=response, tx_bytes=tx_bytes,
-                            device_busy_delay=device_busy_delay,
-                            post_processing_time=post_processing_delay,
-                            receive_length=rx_len)
+        if self.instrumentation is not None:
+            return self._write_read_instrumented(tx_bytes, payload_offset, response, device_busy_delay,
+                                                 post_processing_delay, slave_address, ignore_errors)
+        tx_rx = self.create_request(tx_bytes, payload_offset, response,
+                                    device_busy_delay=device_busy_delay,
+                                    post_processing_delay=post_processing_delay)
         if slave_address is None:
             slave_address = self._slave_address
         try:
-            result = self._connection.execute(slave_address, tx_rx)
+            result = self._execute(slave_address, tx_rx)
         except Exception as error:
             if not ignore_errors:
                 raise error
             result = None
         return result
 
-    def i2c_general_call_reset(self):
+    def _execute(self, slave_address: int, request) -> Any:
+        """
+        Execute a request with the connection and defer the wait for its post processing time to the next request to
+        the same device. A general call addresses all devices, hence its post processing time is waited for at once.
+        """
+        if not getattr(self._connection, 'defers_post_processing', False) or \
+                slave_address == self.GENERAL_CALL_ADDRESS:
+            return self._connection.execute(slave_address, request)
+        if request.timer is None:
+            self._busy.wait_until_ready(slave_address)
+        else:
+            start = request.timer()
+            self._busy.wait_until_ready(slave_address)
+            request.busy_wait_time = request.timer() - start
+        try:
+            return self._connection.execute(slave_address, request, wait_post_process=False)
+        finally:
+            self._busy.set_busy(slave_address, request.post_processing_time)
+
+    def _write_read_instrumented(self, tx_bytes, payload_offset, response, device_busy_delay,
+                                 post_processing_delay, slave_address, ignore_errors):
+        """
+        Same as write_read, but the phases of the transfer are measured. Building the transmitted frame counts as
+        CRC time if the channel uses CRCs. The busy wait time is the wait for the post processing of the previous
+        command to the device; the read delay of the command itself is part of the bus time. Connections that do not
+        defer the post processing sleep it within the transfer, hence it counts as bus time as well.
+        """
+        instrumentation = self.instrumentation
+        timer = instrumentation.timer
+        start = timer()
+        tx_rx = self.create_request(tx_bytes, payload_offset, response,
+                                    device_busy_delay=device_busy_delay,
+                                    post_processing_delay=post_processing_delay)
+        tx_rx.timer = timer
+        if self._crc is not None:
+            tx_rx.crc_time = timer() - start
+        if slave_address is None:
+            slave_address = self._slave_address
+        error_type = None
+        result = None
+        try:
+            result = self._execute(slave_address, tx_rx)
+        except Exception as error:
+            error_type = type(error).__name__
+            if not ignore_errors:
+                raise
+        finally:
+            total_time = timer() - start
+            measured_time = tx_rx.busy_wait_time + tx_rx.crc_time + tx_rx.unpack_time
+            instrumentation.emit(TransferEvent(channel=self,
+                                               command_id=command_id(tx_bytes, payload_offset),
+                                               slave_address=slave_address,
+                                               tx_bytes=len(tx_rx.tx_data) if tx_rx.tx_data is not None else 0,
+                                               rx_bytes=tx_rx.rx_length or 0,
+                                               start_time=start,
+                                               total_time=total_time,
+                                               bus_time=max(0.0, total_time - measured_time),
+                                               busy_wait_time=tx_rx.busy_wait_time,
+                                               crc_time=tx_rx.crc_time,
+                                               unpack_time=tx_rx.unpack_time,
+                                               error_type=error_type))
+        return result
+
+    def write_read_batch(self, requests: Sequence[WriteReadRequest]) -> Tuple[Optional[Tuple[Any, ...]], ...]:
+        """
+        Transfers a sequence of requests in the given order.
+
+        A write-only request that is directly followed by a read-only request to the same device is executed as one
+        i2c transaction: the read starts when the post processing time of the write has elapsed. The response of
+        the write-only request is None. Requests with ignore_errors set are never combined.
+
+        If the connection provides execute_batch (e.g. the I2cBatchConnection), all requests are passed to the
+        connection at once, unless one of them ignores errors.
+
+        While the channel is instrumented, the requests are executed one by one, such that each of them is measured.
+        """
+        if self.instrumentation is not None:
+            return super().write_read_batch(requests)
+        groups = []
+        i = 0
+        while i < len(requests):
+            if i + 1 < len(requests) and self._can_combine(requests[i], requests[i + 1]):
+                groups.append((requests[i], requests[i + 1]))
+                i += 2
+            else:
+                groups.append((requests[i], None))
+                i += 1
+        execute_batch = getattr(self._connection, 'execute_batch', None)
+        if execute_batch is None or any(r.ignore_errors for r in requests):
+            responses = [self._execute(self._resolve_address(write.slave_address),
+                                       self._create_combined_request(write, read))
+                         if read is not None else self.write_read(*write) for write, read in groups]
+        else:
+            # the connection waits for the post processing times within the batch
+            for slave_address in {self._resolve_address(write.slave_address) for write, _ in groups}:
+                self._busy.wait_until_ready(slave_address)
+            responses = execute_batch([(self._resolve_address(write.slave_address),
+                                        self._create_combined_request(write, read) if read is not None else
+                                        self.create_request(write.tx_bytes, write.payload_offset, write.response,
+                                                            device_busy_delay=write.device_busy_delay,
+                                                            post_processing_delay=write.post_processing_delay))
+                                       for write, read in groups])
+        results = []
+        for (_, read), response in zip(groups, responses):
+            if read is not None:
+                results.append(None)
+            results.append(response)
+        return tuple(results)
+
+    def _can_combine(self, write: WriteReadRequest, read: WriteReadRequest) -> bool:
+        return (bool(write.tx_bytes) and write.response is None and not read.tx_bytes and read.response is not None
+                and not write.ignore_errors and not read.ignore_errors
+                and self._resolve_address(write.slave_address) == self._resolve_address(read.slave_address))
+
+    def _create_combined_request(self, write: WriteReadRequest, read: WriteReadRequest) -> TxRxRequest:
+        # the read has to wait for the time that follows the write-only request, see TxRxRequest.post_processing_time
+        read_delay = write.post_processing_delay if write.post_processing_delay is not None else write.device_busy_delay
+        return self.create_request(write.tx_bytes, write.payload_offset, read.response,
+                                   device_busy_delay=read_delay,
+                                   post_processing_delay=read.post_processing_delay)
+
+    def _resolve_address(self, slave_address: Optional[int]) -> int:
+        return self._slave_address if slave_address is None else slave_address
+
+    def create_request(self, tx_bytes: Iterable,
+                       payload_offset: int,
+                       response: Optional[RxData],
+                       device_busy_delay: float = 0.0,
+                       post_processing_delay: Optional[float] = None) -> TxRxRequest:
+        """
+        Create the request that is executed by the i2c connection.
+
+        The CRCs are inserted into the transmitted data and the length of the response is adapted accordingly.
+        """
+        if self._tx_buffers is not None:
+            tx_bytes = self._build_tx_frame(tx_bytes, payload_offset)
+        else:
+            tx_bytes = I2cChannel.build_tx_data(tx_bytes, payload_offset, self._crc)
+        rx_len = None
+        if response:
+            rx_len = response.rx_length
+            if self._crc:
+                rx_len = 3 * rx_len // 2
+
+        return TxRxRequest(channel=self, response=response, tx_bytes=tx_bytes,
+                           device_busy_delay=device_busy_delay,
+                           post_processing_time=post_processing_delay,
+                           receive_length=rx_len)
+
+    def _build_tx_frame(self, tx_bytes, payload_offset) -> Optional[bytes]:
+        """
+        Build the raw bytes to send in the reusable buffer of the calling thread. The frame is returned as bytes, which
+        is the only allocation per command.
+        """
+        if not tx_bytes:
+            return None
+        length = len(tx_bytes)
+        if self._crc is not None:
+            length = TableCrcCalculator.frame_length(length - payload_offset, payload_offset)
+        buffer = getattr(self._tx_buffers, 'buffer', None)
+        if buffer is None or len(buffer) < length:
+            buffer = bytearray(max(length, 32))
+            self._tx_buffers.buffer = buffer
+        length = I2cChannel.build_tx_data_into(buffer, tx_bytes, payload_offset, self._crc)
+        return bytes(memoryview(buffer)[:length])
+
+    @property
+    def slave_address(self) -> int:
+        return self._slave_address
+
+    @property
+    def busy_tracker(self) -> DeviceBusyTracker:
+        return self._busy
+
+    def i2c_general_call_reset(self, readiness=None):
         """
         Issue a i2c reset by writing the byte 0x6 on the general call address.
 
+        :param readiness:
+            A ReadinessStrategy that decides how long to wait for the devices to reboot. A per device strategy
+            probes the device of this channel.
         :Note:
             - all devices attached to this bus will be reset
-            - after the reset, the channel blocks for 50ms to allow the devices to reboot.
+            - after the reset, the channel blocks for 50ms to allow the devices to reboot, unless a readiness
+              strategy is given.
         """
         self.write_read(tx_bytes=[0x6],
                         payload_offset=1,
                         response=None,
                         slave_address=0,
                         ignore_errors=True,
-                        post_processing_delay=0.05
+                        post_processing_delay=0.05 if readiness is None else 0.0
                         )
+        if self._on_general_call_reset is not None:
+            self._on_general_call_reset()
+        if readiness is not None:
+            readiness.wait_until_ready(self.probe if readiness.per_device else None)
+
+    def probe(self, slave_address: Optional[int] = None, quick_write: bool = False) -> bool:
+        """
+        Check whether a device acknowledges its address, by reading one byte.
+
+        :param slave_address:
+            The address to probe; by default the slave address of the channel.
+        :param quick_write:
+            If True, the address is written without any data instead (SMBus quick command). Not all i2c adapters
+            support zero-length writes.
+        :return:
+            True if the device acknowledged its address.
+        """
+        if quick_write:
+            request = RawI2cCommand(tx_data=b'', rx_length=None, timeout=self.timeout)
+        else:
+            request = RawI2cCommand(tx_data=None, rx_length=1, timeout=self.timeout)
+        try:
+            self._connection.execute(self._resolve_address(slave_address), request)
+        except Exception:
+            return False
+        return True
 
     @property
     def timeout(self):
@@ -96,6 +345,9 @@ class I2cChannel(TxRxChannel):
             return data  # data does not contain CRCs -> return it as-is
 
         data = bytearray(data)  # Python 2 compatibility
+        if (len(data) >= self.vectorized_crc_min_length and isinstance(self._crc, TableCrcCalculator) and
+                lazy_import.numpy() is not None):
+            return self._crc.strip_and_check_vectorized(data)
         return self.strip_and_check_crc(data, self._crc)
 
     @staticmethod
@@ -118,6 +370,8 @@ class I2cChannel(TxRxChannel):
         :raise ~sensirion_i2c_driver.errors.I2cChecksumError:
             If a received CRC was wrong.
         """
+        if isinstance(crc, TableCrcCalculator):
+            return crc.strip_and_check(data)
         data_without_crc = bytearray()
         for i in range(len(data)):
             if i % 3 == 2:
@@ -148,6 +402,9 @@ class I2cChannel(TxRxChannel):
         """
         if not tx_data:
             return None
+        if isinstance(crc, TableCrcCalculator):
+            tx_view = I2cChannel._as_view(tx_data)
+            return crc.insert(tx_view[cmd_width:], header=tx_view[:cmd_width])
 
         data = bytearray(tx_data[:cmd_width])  # the command is in the beginning of the tx_data
         tx_data = bytearray(tx_data[cmd_width:] or [])  # Python 2 compatibility
@@ -156,3 +413,29 @@ class I2cChannel(TxRxChannel):
             if (crc is not None) and (i % 2 == 1):
                 data.append(crc(tx_data[i - 1:i + 1]))
         return bytes(data)
+
+    @staticmethod
+    def build_tx_data_into(buffer, tx_data, cmd_width, crc) -> int:
+        """
+        Same as build_tx_data, but the raw bytes are written to the beginning of a writable buffer.
+
+        :param buffer:
+            A bytearray or a writable memoryview that is large enough to hold the command, the data and the CRCs.
+        :return:
+            The number of bytes written.
+        """
+        if not tx_data:
+            return 0
+        if isinstance(crc, TableCrcCalculator):
+            tx_view = I2cChannel._as_view(tx_data)
+            return crc.insert_into(buffer, tx_view[cmd_width:], header=tx_view[:cmd_width])
+        data = I2cChannel.build_tx_data(tx_data, cmd_width, crc)
+        buffer[:len(data)] = data
+        return len(data)
+
+    @staticmethod
+    def _as_view(tx_data) -> memoryview:
+        """Slicing a memoryview does not copy the data"""
+        if isinstance(tx_data, (list, tuple)):
+            tx_data = bytes(tx_data)
+        return memoryview(tx_data)
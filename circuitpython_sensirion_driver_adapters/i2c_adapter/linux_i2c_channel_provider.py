@@ -1,35 +1,101 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2023 Sensirion AG, Switzerland
 
-import time
 from typing import Optional, Tuple
 
 from sensirion_i2c_driver import LinuxI2cTransceiver, I2cConnection
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel, DeviceBusyTracker, TxRxChannel
 from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_bus_scheduler import I2cBusScheduler
 from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.readiness import FixedDelay
+from circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_rdwr import I2cBatchConnection, \
+    LinuxI2cRdwrTransceiver
+from circuitpython_sensirion_driver_adapters.i2c_adapter.transceiver_registry import SharedTransceiver, \
+    TransceiverRegistry, shared_transceivers
+
+
+class _SeparateTransfers:
+    """
+    Transfers the frames over a shared LinuxI2cRdwrTransceiver with separate write and read system calls, as the
+    LinuxI2cTransceiver does. It is used by the providers without combined transactions.
+    """
+
+    def __init__(self, transceiver: LinuxI2cRdwrTransceiver) -> None:
+        self._transceiver = transceiver
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        return LinuxI2cTransceiver.transceive(self._transceiver, slave_address, tx_data, rx_length, read_delay,
+                                              timeout)
+
+    def __getattr__(self, name):
+        if name == 'transceive_batch':
+            raise AttributeError(name)
+        return getattr(self._transceiver, name)
 
 
 class LinuxI2cChannelProvider(I2cChannelProvider):
     """Create a channel that is using a I2cConnection to communicate with a sensor over Linux i2c device."""
 
-    def __init__(self, linux_device: str, *args, **kwargs):
+    def __init__(self, linux_device: str, *args, use_bus_scheduler: bool = False,
+                 combined_transactions: bool = False, registry: Optional[TransceiverRegistry] = None, **kwargs):
+        """
+        Initialize additional members for Linux i2c channel.
+
+        :param linux_device:
+            The Linux i2c device file, e.g. /dev/i2c-1
+        :param use_bus_scheduler:
+            If True, all channels of this provider share one I2cBusScheduler. The commands of channels that are used
+            from different threads are interleaved on the bus while the devices are busy.
+        :param combined_transactions:
+            If True, the I2C_RDWR ioctl is used: commands without read delay are executed as one write-then-read
+            transaction and the transfers of execute_transfers are combined into as few ioctl calls as possible.
+        :param registry:
+            The registry of shared transceivers. All providers of the same Linux i2c device share one transceiver,
+            by default process wide, also if only some of them use combined transactions.
+
+        The default readiness strategy waits 0.1 s after the device is opened.
+        """
         super().__init__(*args, **kwargs)
+        if self.readiness is None:
+            self.readiness = FixedDelay(0.1)
         self._linux_i2c_device = linux_device
-        self._i2c_transceiver: Optional[LinuxI2cTransceiver] = None
+        self._i2c_transceiver: Optional[SharedTransceiver] = None
+        self._registry = registry if registry is not None else shared_transceivers
+        self._registry_key = None
+        self._use_bus_scheduler = use_bus_scheduler
+        self._combined_transactions = combined_transactions
+        self._bus_scheduler: Optional[I2cBusScheduler] = None
+        # the channels of the provider share the post processing deadlines of the devices
+        self._busy_tracker = DeviceBusyTracker()
 
     def release_channel_resources(self):
         """Free up all resources that where acquired when initializing the channel"""
+        if self._bus_scheduler is not None:
+            self._bus_scheduler.close()
+        self._bus_scheduler = None
         if self._i2c_transceiver is not None:
-            self._i2c_transceiver.close()
+            self._registry.release(self._registry_key)
         self._i2c_transceiver = None
         self._linux_i2c_device = None
+        self.forget_ready_devices()
 
     def prepare_channel(self):
         """Initialize a concrete channel object that operates on a Linux i2c device."""
-        self._i2c_transceiver = LinuxI2cTransceiver(device_file=self._linux_i2c_device)
-        time.sleep(0.1)
+        self._registry_key = ('linux-i2c', self._linux_i2c_device)
+        transceiver = self._registry.acquire(self._registry_key, self._open_transceiver,
+                                             lambda transceiver: transceiver.close())
+        if not self._combined_transactions:
+            transceiver = _SeparateTransfers(transceiver)
+        self._i2c_transceiver = SharedTransceiver(transceiver, self._registry.lock(self._registry_key))
+        if self._use_bus_scheduler:
+            self._bus_scheduler = I2cBusScheduler(self._i2c_transceiver)
+
+    def _open_transceiver(self, lock) -> LinuxI2cRdwrTransceiver:
+        transceiver = LinuxI2cRdwrTransceiver(device_file=self._linux_i2c_device)
+        self.wait_until_powered()
+        return transceiver
 
     def get_channel(self, slave_address: int,
                     crc_parameters: Optional[Tuple[int, int, int, int]]) -> TxRxChannel:
@@ -45,6 +111,26 @@ class LinuxI2cChannelProvider(I2cChannelProvider):
             The crc calculator that can compute the crc checksum of the byte stream
         """
 
-        return I2cChannel(I2cConnection(self._i2c_transceiver),
-                          slave_address=slave_address,
-                          crc=self.try_create_crc_calculator(crc_parameters))
+        if self._bus_scheduler is not None:
+            connection = self._bus_scheduler
+        elif self._combined_transactions:
+            connection = I2cBatchConnection(self._i2c_transceiver)
+        else:
+            connection = I2cConnection(self._i2c_transceiver)
+        channel = I2cChannel(connection,
+                             slave_address=slave_address,
+                             crc=self.try_create_crc_calculator(crc_parameters),
+                             busy_tracker=self._busy_tracker,
+                             on_general_call_reset=self.forget_ready_devices)
+        self.wait_until_device_ready(channel)
+        return channel
+
+    def get_async_channel(self, slave_address: int,
+                          crc_parameters: Optional[Tuple[int, int, int, int]]) -> AsyncTxRxChannel:
+        """Create and return an initialized asyncio channel. See get_channel."""
+        # imported on demand, since asyncio is costly to import and not needed by synchronous applications
+        from circuitpython_sensirion_driver_adapters.i2c_adapter.async_i2c_channel import AsyncI2cChannel, \
+            AsyncI2cConnection
+        return AsyncI2cChannel(AsyncI2cConnection(self._i2c_transceiver),
+                               slave_address=slave_address,
+                               crc=self.try_create_crc_calculator(crc_parameters))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import ctypes
+import errno
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sensirion_i2c_driver import I2cConnection, LinuxI2cTransceiver
+
+# message of one i2c transfer: (slave_address, tx_data, rx_length)
+I2cMessage = Tuple[int, Optional[bytes], Optional[int]]
+# status, error and received data, as returned by I2cTransceiverV1.transceive
+TransceiveResult = Tuple[int, Optional[Exception], bytes]
+
+
+class _I2cMsg(ctypes.Structure):
+    """struct i2c_msg of linux/i2c.h"""
+    _fields_ = [('addr', ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('len', ctypes.c_uint16),
+                ('buf', ctypes.POINTER(ctypes.c_uint8))]
+
+
+class _I2cRdwrIoctlData(ctypes.Structure):
+    """struct i2c_rdwr_ioctl_data of linux/i2c-dev.h"""
+    _fields_ = [('msgs', ctypes.POINTER(_I2cMsg)),
+                ('nmsgs', ctypes.c_uint32)]
+
+
+class LinuxI2cRdwrTransceiver(LinuxI2cTransceiver):
+    """
+    Linux i2c transceiver that uses the I2C_RDWR ioctl instead of separate write and read system calls.
+
+    A command without read delay is executed as one combined write-then-read transaction with a repeated start
+    condition, hence with a single system call. Commands with read delay still need two transactions, since the delay
+    has to be implemented in software. With transceive_batch, the messages of several commands are transferred with
+    one ioctl.
+    """
+
+    I2C_RDWR = 0x0707
+    I2C_M_RD = 0x0001
+    # the kernel accepts at most this number of messages per I2C_RDWR call
+    I2C_RDWR_IOCTL_MAX_MSGS = 42
+
+    def __init__(self, device_file, do_open=True, ioctl: Optional[Callable] = None):
+        """
+        :param device_file:
+            Path to the i2c device file, for example "/dev/i2c-1".
+        :param do_open:
+            Whether the file should be opened immediately or not.
+        :param ioctl:
+            The function that is used to perform the ioctl, by default fcntl.ioctl. It is called with the file
+            descriptor, the request I2C_RDWR and the ctypes structure i2c_rdwr_ioctl_data.
+        """
+        self._ioctl = ioctl
+        super().__init__(device_file, do_open=do_open)
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout) -> TransceiveResult:
+        """
+        Transceive an i2c frame in single-channel mode.
+
+        For details, please refer to I2cTransceiverV1.transceive. The timeout is ignored as by the
+        LinuxI2cTransceiver.
+        """
+        assert type(slave_address) is int
+        assert (tx_data is None) or (type(tx_data) is bytes)
+        assert (rx_length is None) or (type(rx_length) is int)
+        assert type(read_delay) in [float, int]
+        assert type(timeout) in [float, int]
+
+        if tx_data is None or rx_length is None or read_delay <= 0:
+            return self.transceive_batch([(slave_address, tx_data, rx_length)])[0]
+        status, error, _ = self.transceive_batch([(slave_address, tx_data, None)])[0]
+        if status != self.STATUS_OK:
+            return status, error, b""
+        time.sleep(read_delay)
+        return self.transceive_batch([(slave_address, None, rx_length)])[0]
+
+    def transceive_batch(self, messages: Sequence[I2cMessage]) -> List[TransceiveResult]:
+        """
+        Transfer the write and read messages of several commands with as few ioctl calls as possible.
+
+        The commands are executed back to back without any delay. Since the kernel does not report which message
+        failed, all commands of a failing ioctl call get the same error.
+
+        :param messages:
+            The slave address, the data to write (or None) and the number of bytes to read (or None) of each command.
+        :return:
+            The status, the error and the received data of each command.
+        """
+        results: List[TransceiveResult] = []
+        chunk: List[I2cMessage] = []
+        nr_of_msgs = 0
+        for message in messages:
+            msg_count = (message[1] is not None) + (message[2] is not None)
+            if nr_of_msgs + msg_count > self.I2C_RDWR_IOCTL_MAX_MSGS:
+                results.extend(self._rdwr(chunk))
+                chunk, nr_of_msgs = [], 0
+            chunk.append(message)
+            nr_of_msgs += msg_count
+        if chunk:
+            results.extend(self._rdwr(chunk))
+        return results
+
+    def _rdwr(self, messages: Sequence[I2cMessage]) -> List[TransceiveResult]:
+        msgs = []
+        rx_buffers = []
+        # the messages only point to the buffers, hence the buffers have to be kept alive during the ioctl
+        tx_buffers = []
+        for slave_address, tx_data, rx_length in messages:
+            if tx_data is not None:
+                tx_buffer = (ctypes.c_uint8 * len(tx_data)).from_buffer_copy(tx_data)
+                tx_buffers.append(tx_buffer)
+                msgs.append(_I2cMsg(slave_address, 0, len(tx_data), tx_buffer))
+            rx_buffer = None
+            if rx_length is not None:
+                rx_buffer = (ctypes.c_uint8 * rx_length)()
+                msgs.append(_I2cMsg(slave_address, self.I2C_M_RD, rx_length, rx_buffer))
+            rx_buffers.append(rx_buffer)
+        if not msgs:
+            return [(self.STATUS_OK, None, b"") for _ in messages]
+        data = _I2cRdwrIoctlData((_I2cMsg * len(msgs))(*msgs), len(msgs))
+        try:
+            self._get_ioctl()(self._file_descriptor, self.I2C_RDWR, data)
+        except OSError as error:
+            status = self.STATUS_NACK if error.errno in (errno.ENXIO, errno.EREMOTEIO) else \
+                self.STATUS_UNSPECIFIED_ERROR
+            return [(status, error, b"") for _ in messages]
+        return [(self.STATUS_OK, None, bytes(rx_buffer) if rx_buffer is not None else b"")
+                for rx_buffer in rx_buffers]
+
+    def _get_ioctl(self) -> Callable:
+        if self._ioctl is None:
+            # Delayed import to avoid errors when importing this module on Windows
+            from fcntl import ioctl
+            self._ioctl = ioctl
+        return self._ioctl
+
+
+class I2cBatchConnection(I2cConnection):
+    """
+    I2c connection that executes several commands with one call to the transceiver, if the transceiver supports
+    transceive_batch (e.g. the LinuxI2cRdwrTransceiver).
+
+    Consecutive commands without read delay and without post processing time are transferred together. Only single
+    channel transceivers are supported.
+    """
+
+    def execute_batch(self, commands: Sequence[Tuple[int, object]]) -> list:
+        """
+        Execute a sequence of commands.
+
+        All commands are executed, even if one of them fails. The first error is raised afterwards.
+
+        :param commands:
+            Pairs of slave address and command.
+        :return:
+            The interpreted data of every command.
+        """
+        assert not self.is_multi_channel, "Multi channel transceivers are not supported"
+        transceive_batch = getattr(self._transceiver, 'transceive_batch', None)
+        responses = []
+        batch: List[Tuple[int, object]] = []
+        for slave_address, command in commands:
+            if transceive_batch is None or command.read_delay > 0:
+                responses.extend(self._transceive_batch(transceive_batch, batch))
+                batch = []
+                responses.append(self._transceive(slave_address, command.tx_data, command.rx_length,
+                                                  command.read_delay, command.timeout))
+                self._wait_post_process(command)
+                continue
+            batch.append((slave_address, command))
+            if command.post_processing_time > 0.0:
+                responses.extend(self._transceive_batch(transceive_batch, batch))
+                batch = []
+                self._wait_post_process(command)
+        responses.extend(self._transceive_batch(transceive_batch, batch))
+        results = [self._interpret_single_response(command, response)
+                   for (_, command), response in zip(commands, responses)]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def _transceive_batch(self, transceive_batch, batch: Sequence[Tuple[int, object]]) -> list:
+        if not batch:
+            return []
+        results = transceive_batch([(slave_address, command.tx_data, command.rx_length)
+                                    for slave_address, command in batch])
+        return [self._convert_result_v1(result) for result in results]
+
+    @staticmethod
+    def _wait_post_process(command) -> None:
+        if command.post_processing_time > 0.0:
+            time.sleep(command.post_processing_time)
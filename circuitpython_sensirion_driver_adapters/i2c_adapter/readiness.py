@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import abc
+import time
+from typing import Callable, Optional
+
+Probe = Callable[[], bool]
+
+
+class ReadinessStrategy(abc.ABC):
+    """
+    Decides how long to wait until the hardware is ready after start-up or reset.
+
+    Strategies with per_device set to False are applied once after the programming device is initialized. Strategies
+    with per_device set to True are applied for every i2c address, when the first channel to the address is created,
+    and get a probe that tells whether the device acknowledges its address.
+    """
+
+    per_device: bool = False
+
+    @abc.abstractmethod
+    def wait_until_ready(self, probe: Optional[Probe] = None) -> None:
+        """
+        Block until the hardware is ready.
+
+        :param probe:
+            Returns True if the device acknowledges its address. The probe is None if no device is known yet.
+        """
+
+
+class FixedDelay(ReadinessStrategy):
+    """Wait for a fixed time"""
+
+    def __init__(self, delay: float) -> None:
+        """
+        :param delay:
+            The time to wait. Time unit: seconds
+        """
+        self.delay = delay
+
+    def wait_until_ready(self, probe: Optional[Probe] = None) -> None:
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+
+class PollUntilAck(ReadinessStrategy):
+    """Probe the device until it acknowledges its address, with an exponentially growing delay between the probes."""
+
+    per_device = True
+
+    def __init__(self, initial_delay: float = 0.001, factor: float = 2.0, max_delay: float = 0.02,
+                 timeout: float = 1.0) -> None:
+        """
+        :param initial_delay:
+            The delay after the first failing probe. Time unit: seconds
+        :param factor:
+            The delay is multiplied by this factor after every failing probe.
+        :param max_delay:
+            The upper bound of the delay between two probes. Time unit: seconds
+        :param timeout:
+            The time after which the device is considered to be absent. Time unit: seconds
+        """
+        self.initial_delay = initial_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def wait_until_ready(self, probe: Optional[Probe] = None) -> None:
+        """
+        :raise TimeoutError:
+            If the device does not acknowledge its address within the timeout.
+        """
+        if probe is None:
+            return
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_delay
+        while not probe():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Device not ready after {self.timeout} s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * self.factor, self.max_delay)
+
+
+class ReadinessCallback(ReadinessStrategy):
+    """Delegate the wait to a user supplied function"""
+
+    def __init__(self, callback: Callable[[Optional[Probe]], None], per_device: bool = False) -> None:
+        """
+        :param callback:
+            Called with the probe (or None) and returns when the hardware is ready.
+        :param per_device:
+            If True, the callback is called for every i2c address, otherwise once after start-up.
+        """
+        self._callback = callback
+        self.per_device = per_device
+
+    def wait_until_ready(self, probe: Optional[Probe] = None) -> None:
+        self._callback(probe)
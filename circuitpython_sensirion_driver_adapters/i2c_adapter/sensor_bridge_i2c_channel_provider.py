@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2023 Sensirion AG, Switzerland
 
-import time
 from typing import Optional, Tuple
 
 from sensirion_i2c_driver import I2cConnection
@@ -10,9 +9,12 @@ from sensirion_shdlc_sensorbridge import (SensorBridgePort,
                                           SensorBridgeShdlcDevice,
                                           SensorBridgeI2cProxy)
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel, DeviceBusyTracker, TxRxChannel
 from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
 from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.readiness import FixedDelay
+from circuitpython_sensirion_driver_adapters.i2c_adapter.transceiver_registry import SharedTransceiver, \
+    TransceiverRegistry, shared_transceivers
 
 
 class SensorBridgeI2cChannelProvider(I2cChannelProvider):
@@ -21,7 +23,7 @@ class SensorBridgeI2cChannelProvider(I2cChannelProvider):
     def __init__(self, sensor_bridge_port: SensorBridgePort,
                  serial_port: str,
                  serial_baud_rate: int,
-                 *args, **kwargs):
+                 *args, registry: Optional[TransceiverRegistry] = None, **kwargs):
         """
         Initialize additional members for sensor bridge channel.
 
@@ -32,39 +34,75 @@ class SensorBridgeI2cChannelProvider(I2cChannelProvider):
         :param serial_baud_rate:
             The baud rate that can be applied on the serial line used by a programming device that uses the serial
             interface.
+        :param registry:
+            The registry of shared transceivers. All providers of the same serial port share the SensorBridge and
+            the providers of the same SensorBridge port share the port configuration, by default process wide. The
+            baud rate, i2c frequency and supply voltage of the first provider apply.
+
+        The default readiness strategy waits 0.1 s after the supply is switched on.
         """
         super().__init__(*args, **kwargs)
+        if self.readiness is None:
+            self.readiness = FixedDelay(0.1)
         self._sensor_bridge_port: SensorBridgePort = sensor_bridge_port
         self.serial_port = serial_port
         self.serial_baud_rate = serial_baud_rate
-        self._shdlc_port: Optional[ShdlcSerialPort] = None
-        self._sensor_bridge: Optional[SensorBridgeShdlcDevice] = None
-        self._i2c_transceiver: Optional[SensorBridgeI2cProxy] = None
+        self._i2c_transceiver: Optional[SharedTransceiver] = None
+        self._registry = registry if registry is not None else shared_transceivers
+        # the channels of the provider share the post processing deadlines of the devices
+        self._busy_tracker = DeviceBusyTracker()
+
+    @property
+    def _bridge_key(self):
+        return 'sensor-bridge', self.serial_port
+
+    @property
+    def _port_key(self):
+        return 'sensor-bridge', self.serial_port, self._sensor_bridge_port
 
     def release_channel_resources(self):
         """
-        Free up all resources that where acquired when initializing the channel:
+        Free up all resources that where acquired when initializing the channel. When the last provider of a
+        SensorBridge port is released:
             - switch off power
-            - release serial connection
+            - release serial connection, if no other port of the SensorBridge is used
         """
-        if self._sensor_bridge is None:
+        if self._i2c_transceiver is None:
             return
-        assert self._sensor_bridge_port is not None, "Illegal state: SensorBridgePort is None!"
-        assert self._shdlc_port is not None, "Illegal state: Shdlc port is None!"
-        self._sensor_bridge.switch_supply_off(self._sensor_bridge_port)
-        self._shdlc_port.close()
-        self._shdlc_port = None
+        self._registry.release(self._port_key)
+        self._i2c_transceiver = None
+        self.forget_ready_devices()
 
     def prepare_channel(self):
         """Initialize a concrete channel object that can be used to create a new sensor instance."""
-        self._shdlc_port = ShdlcSerialPort(port=self.serial_port, baudrate=self.serial_baud_rate)
-        self._sensor_bridge = SensorBridgeShdlcDevice(connection=ShdlcConnection(self._shdlc_port),
-                                                      slave_address=0)
-        self._sensor_bridge.set_i2c_frequency(self._sensor_bridge_port, frequency=self.i2c_frequency)
-        self._sensor_bridge.set_supply_voltage(self._sensor_bridge_port, voltage=self.supply_voltage)
-        self._sensor_bridge.switch_supply_on(self._sensor_bridge_port)
-        self._i2c_transceiver = SensorBridgeI2cProxy(self._sensor_bridge, port=self._sensor_bridge_port)
-        time.sleep(0.1)
+        bridge_key, port = self._bridge_key, self._sensor_bridge_port
+        registry = self._registry
+
+        def open_port(_):
+            _, bridge = registry.acquire(bridge_key, self._open_sensor_bridge, lambda resource: resource[0].close())
+            try:
+                bridge.set_i2c_frequency(port, frequency=self.i2c_frequency)
+                bridge.set_supply_voltage(port, voltage=self.supply_voltage)
+                bridge.switch_supply_on(port)
+            except BaseException:
+                registry.release(bridge_key)
+                raise
+            self.wait_until_powered()
+            # the two ports of a SensorBridge share the serial line
+            return SharedTransceiver(SensorBridgeI2cProxy(bridge, port=port), registry.lock(bridge_key)), bridge
+
+        def close_port(resource):
+            _, bridge = resource
+            try:
+                bridge.switch_supply_off(port)
+            finally:
+                registry.release(bridge_key)
+
+        self._i2c_transceiver, _ = registry.acquire(self._port_key, open_port, close_port)
+
+    def _open_sensor_bridge(self, _) -> Tuple[ShdlcSerialPort, SensorBridgeShdlcDevice]:
+        shdlc_port = ShdlcSerialPort(port=self.serial_port, baudrate=self.serial_baud_rate)
+        return shdlc_port, SensorBridgeShdlcDevice(connection=ShdlcConnection(shdlc_port), slave_address=0)
 
     def get_channel(self, slave_address: int,
                     crc_parameters: Tuple[int, int, int, int]) -> TxRxChannel:
@@ -80,6 +118,20 @@ class SensorBridgeI2cChannelProvider(I2cChannelProvider):
             The crc calculator that can compute the crc checksum of the byte stream
         """
 
-        return I2cChannel(I2cConnection(self._i2c_transceiver),
-                          slave_address=slave_address,
-                          crc=self.try_create_crc_calculator(crc_parameters))
+        channel = I2cChannel(I2cConnection(self._i2c_transceiver),
+                             slave_address=slave_address,
+                             crc=self.try_create_crc_calculator(crc_parameters),
+                             busy_tracker=self._busy_tracker,
+                             on_general_call_reset=self.forget_ready_devices)
+        self.wait_until_device_ready(channel)
+        return channel
+
+    def get_async_channel(self, slave_address: int,
+                          crc_parameters: Optional[Tuple[int, int, int, int]]) -> AsyncTxRxChannel:
+        """Create and return an initialized asyncio channel. See get_channel."""
+        # imported on demand, since asyncio is costly to import and not needed by synchronous applications
+        from circuitpython_sensirion_driver_adapters.i2c_adapter.async_i2c_channel import AsyncI2cChannel, \
+            AsyncI2cConnection
+        return AsyncI2cChannel(AsyncI2cConnection(self._i2c_transceiver),
+                               slave_address=slave_address,
+                               crc=self.try_create_crc_calculator(crc_parameters))
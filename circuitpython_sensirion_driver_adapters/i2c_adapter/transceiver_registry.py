@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SharedTransceiver:
+    """
+    Serializes the access to an i2c transceiver of API version 1 that is used by several connections.
+
+    All other attributes (e.g. the status codes, description and channel_count) are taken from the wrapped
+    transceiver.
+    """
+
+    def __init__(self, transceiver, lock) -> None:
+        """
+        :param transceiver:
+            The i2c transceiver that is shared.
+        :param lock:
+            The lock that is held during every transceive operation.
+        """
+        self._transceiver = transceiver
+        self._lock = lock
+        if hasattr(transceiver, 'transceive_batch'):
+            self.transceive_batch = self._transceive_batch
+
+    @property
+    def transceiver(self):
+        return self._transceiver
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        with self._lock:
+            return self._transceiver.transceive(slave_address, tx_data, rx_length, read_delay, timeout)
+
+    def _transceive_batch(self, messages):
+        with self._lock:
+            return self._transceiver.transceive_batch(messages)
+
+    def __getattr__(self, name):
+        return getattr(self._transceiver, name)
+
+
+class _Entry:
+    __slots__ = ('resource', 'close', 'ref_count', 'lock', 'opened', 'error')
+
+    def __init__(self, close: Callable[[Any], None], lock: threading.RLock) -> None:
+        self.resource = None
+        self.close = close
+        self.ref_count = 0
+        self.lock = lock
+        # set when the resource is opened or opening failed with error
+        self.opened = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class TransceiverRegistry:
+    """
+    Reference counted registry of resources that are shared by channel providers, e.g. the transceiver of a Linux i2c
+    device or the SensorBridge on a serial port.
+
+    The first user of a key opens the resource and the last user closes it again. Every key has a lock that the users
+    of the resource take to serialize their access. The channel providers use the process wide registry
+    shared_transceivers by default.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, _Entry] = {}
+        # the keys whose resources are being closed, with the events that are set when they are closed
+        self._closing: Dict[Hashable, threading.Event] = {}
+
+    def acquire(self, key: Hashable,
+                open_resource: Callable[[threading.RLock], Any],
+                close_resource: Callable[[Any], None]) -> Any:
+        """
+        Return the resource registered with key and increment its reference count.
+
+        The resource is opened outside the lock of the registry: opening a slow device blocks only the users of the
+        same key, and opening a resource may acquire other resources. If the resource of the key is being closed,
+        the call waits until it is closed and opens it again.
+
+        :param key:
+            Identifies the resource, e.g. a tuple of the kind of resource and the device path.
+        :param open_resource:
+            Creates the resource if it is not registered yet. It is called with the lock of the new resource.
+        :param close_resource:
+            Called with the resource when the last reference is released.
+        :return:
+            The shared resource.
+        :raise:
+            The exception of open_resource, also in the threads that waited for the resource to be opened.
+        """
+        while True:
+            with self._lock:
+                closing = self._closing.get(key)
+                if closing is None:
+                    entry = self._entries.get(key)
+                    is_opener = entry is None
+                    if is_opener:
+                        entry = self._entries[key] = _Entry(close_resource, threading.RLock())
+                    entry.ref_count += 1
+                    break
+            closing.wait()
+        if not is_opener:
+            entry.opened.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.resource
+        try:
+            entry.resource = open_resource(entry.lock)
+        except BaseException as error:
+            entry.error = error
+            with self._lock:
+                del self._entries[key]
+            raise
+        finally:
+            entry.opened.set()
+        return entry.resource
+
+    def release(self, key: Hashable) -> None:
+        """
+        Decrement the reference count of a resource and close it, if it is not used anymore. The resource is closed
+        outside the lock of the registry.
+        """
+        with self._lock:
+            entry = self._entries[key]
+            entry.ref_count -= 1
+            if entry.ref_count > 0:
+                return
+            del self._entries[key]
+            closed = self._closing[key] = threading.Event()
+        try:
+            entry.close(entry.resource)
+        finally:
+            with self._lock:
+                del self._closing[key]
+            closed.set()
+
+    def lock(self, key: Hashable) -> threading.RLock:
+        """The lock that serializes the access to a registered resource."""
+        with self._lock:
+            return self._entries[key].lock
+
+    def ref_count(self, key: Hashable) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.ref_count if entry is not None else 0
+
+
+shared_transceivers = TransceiverRegistry()
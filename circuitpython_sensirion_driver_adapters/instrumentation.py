@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import abc
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional
+
+
+class TransferEvent(NamedTuple):
+    """
+    The timings of one write_read of an instrumented channel.
+
+    The total time is split into the time the channel spends on the bus, waiting for busy devices, computing and
+    checking CRCs and unpacking the response. All times are measured with the timer of the Instrumentation.
+    Time unit: seconds
+    """
+    #: the channel that executed the transfer
+    channel: Any
+    #: the command id, i.e. the header of the transmitted bytes; None if nothing was transmitted
+    command_id: Optional[int]
+    slave_address: Optional[int]
+    #: the number of bytes that were transmitted and received, including the CRCs
+    tx_bytes: int
+    rx_bytes: int
+    start_time: float
+    total_time: float
+    #: the time of the transfer that is not spent in one of the other phases, e.g. on the bus or in the driver
+    bus_time: float
+    #: the wait for the post processing of the previous command to the device
+    busy_wait_time: float
+    crc_time: float
+    unpack_time: float
+    #: the type name of the exception, or None if the transfer succeeded; ignored errors are reported as well
+    error_type: Optional[str] = None
+
+
+class TransferEventSink(abc.ABC):
+    """Receives the events of instrumented channels"""
+
+    @abc.abstractmethod
+    def record(self, event: TransferEvent) -> None:
+        """Called after every transfer. Sinks must be thread safe, since channels may be used by several threads."""
+
+
+class CallbackSink(TransferEventSink):
+    """Pass the events to a function"""
+
+    def __init__(self, callback: Callable[[TransferEvent], None]) -> None:
+        self._callback = callback
+
+    def record(self, event: TransferEvent) -> None:
+        self._callback(event)
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations with a bounded relative error, in the style of an HDR histogram.
+
+    The durations are counted in nanoseconds. Each power of two is divided into 2 ** (precision_bits - 1) buckets,
+    hence the reported values are at most 2 ** -(precision_bits - 1) above the recorded ones. The memory grows with
+    the logarithm of the recorded range, not with the number of values. The histogram is not thread safe.
+    """
+
+    def __init__(self, precision_bits: int = 7) -> None:
+        """
+        :param precision_bits:
+            The number of significant bits of the buckets. The default gives a relative error below 2%.
+        """
+        self._precision_bits = precision_bits
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self._sum = 0
+        self._min: Optional[int] = None
+        self._max: Optional[int] = None
+
+    def record(self, seconds: float) -> None:
+        value = max(0, int(seconds * 1e9))
+        index = self._bucket_index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self._sum += value
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    @property
+    def min(self) -> float:
+        return self._min / 1e9 if self._min is not None else 0.0
+
+    @property
+    def max(self) -> float:
+        return self._max / 1e9 if self._max is not None else 0.0
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count / 1e9 if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        :param percent:
+            The percentile, e.g. 99.0.
+        :return:
+            The upper bound of the bucket that contains the percentile, but not more than the maximum. Time unit:
+            seconds
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, percent / 100.0 * self.count)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(self._bucket_upper_bound(index), self._max) / 1e9
+        return self.max
+
+    def _bucket_index(self, value: int) -> int:
+        shift = value.bit_length() - self._precision_bits
+        if shift <= 0:
+            return value
+        return (shift << (self._precision_bits - 1)) + (value >> shift)
+
+    def _bucket_upper_bound(self, index: int) -> int:
+        half = 1 << (self._precision_bits - 1)
+        if index < 2 * half:
+            return index
+        shift = index // half - 1
+        return ((index - shift * half) << shift) + (1 << shift) - 1
+
+
+class TransferStatistics:
+    """The histograms of the phases of the transfers with the same key of a HistogramSink"""
+
+    PHASES = ('total_time', 'bus_time', 'busy_wait_time', 'crc_time', 'unpack_time')
+
+    def __init__(self, precision_bits: int = 7) -> None:
+        self.histograms: Dict[str, LatencyHistogram] = {phase: LatencyHistogram(precision_bits)
+                                                        for phase in self.PHASES}
+        self.errors: Counter = Counter()
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+
+    @property
+    def count(self) -> int:
+        return self.histograms['total_time'].count
+
+    def record(self, event: TransferEvent) -> None:
+        for phase, histogram in self.histograms.items():
+            histogram.record(getattr(event, phase))
+        if event.error_type is not None:
+            self.errors[event.error_type] += 1
+        self.tx_bytes += event.tx_bytes
+        self.rx_bytes += event.rx_bytes
+
+    def summary(self, percentiles: Iterable[float] = (50.0, 90.0, 99.0)) -> Dict[str, Dict[str, float]]:
+        """
+        :return:
+            For every phase the mean, the maximum and the percentiles, e.g. {'bus_time': {'mean': ..., 'p99': ...}}.
+        """
+        result = {}
+        for phase, histogram in self.histograms.items():
+            values = {'mean': histogram.mean, 'max': histogram.max}
+            values.update({f'p{percent:g}': histogram.percentile(percent) for percent in percentiles})
+            result[phase] = values
+        return result
+
+
+class HistogramSink(TransferEventSink):
+    """Collects the events in latency histograms, one TransferStatistics per key"""
+
+    def __init__(self, key: Optional[Callable[[TransferEvent], Hashable]] = None, precision_bits: int = 7) -> None:
+        """
+        :param key:
+            Groups the events, by default by slave address and command id.
+        :param precision_bits:
+            The precision of the histograms, see LatencyHistogram.
+        """
+        self._key = key if key is not None else (lambda event: (event.slave_address, event.command_id))
+        self._precision_bits = precision_bits
+        self._statistics: Dict[Hashable, TransferStatistics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, event: TransferEvent) -> None:
+        key = self._key(event)
+        with self._lock:
+            statistics = self._statistics.get(key)
+            if statistics is None:
+                statistics = self._statistics[key] = TransferStatistics(self._precision_bits)
+            statistics.record(event)
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._statistics)
+
+    def statistics(self, key: Hashable) -> TransferStatistics:
+        with self._lock:
+            return self._statistics[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statistics.clear()
+
+
+class Instrumentation:
+    """
+    Measures the transfers of the channels it is attached to and passes the events to the sinks.
+
+    Channels are instrumented with TxRxChannel.set_instrumentation. One instance may be shared by many channels.
+    """
+
+    def __init__(self, *sinks: TransferEventSink, timer: Callable[[], float] = time.perf_counter) -> None:
+        """
+        :param sinks:
+            The sinks that receive the events.
+        :param timer:
+            Measures the timings, by default time.perf_counter. Pass the monotonic function of a VirtualClock to see
+            the simulated busy times.
+        """
+        self.sinks = list(sinks)
+        self.timer = timer
+
+    def emit(self, event: TransferEvent) -> None:
+        for sink in self.sinks:
+            sink.record(event)
+
+
+def command_id(tx_bytes, payload_offset: int) -> Optional[int]:
+    """The command id of a transfer is the big endian integer of the header of the transmitted bytes."""
+    if not tx_bytes or not payload_offset:
+        return None
+    return int.from_bytes(bytes(tx_bytes[:payload_offset]), 'big')
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import importlib
+import sys
+from types import ModuleType
+from typing import Any, Callable, Dict, Optional
+
+_optional_modules: Dict[str, Optional[ModuleType]] = {}
+
+
+def optional_module(name: str) -> Optional[ModuleType]:
+    """
+    Import an optional dependency on first use.
+
+    Heavy optional dependencies are not imported together with this package, since short-lived processes would pay
+    for the import even if they never use them.
+
+    :param name:
+        The name of the module, e.g. "numpy".
+    :return:
+        The module or None if it is not installed.
+    """
+    try:
+        return _optional_modules[name]
+    except KeyError:
+        pass
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        module = None
+    _optional_modules[name] = module
+    return module
+
+
+def numpy() -> Optional[ModuleType]:
+    """The numpy module or None if numpy is not installed"""
+    return optional_module('numpy')
+
+
+def lazy_attributes(module_globals: Dict[str, Any], attributes: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Create a module level __getattr__ that imports the given attributes on first access.
+
+    An imported attribute is stored in the module, such that further accesses (and monkey patching in tests) work as
+    with a regular import. A module level __getattr__ requires Python 3.7 (PEP 562); with older versions, the
+    attributes are imported right away:
+
+    .. code-block:: python
+
+        __getattr__ = lazy_attributes(globals(), {'ShdlcSerialPort': 'sensirion_shdlc_driver'})
+
+    :param module_globals:
+        The globals of the module that defines the __getattr__.
+    :param attributes:
+        Maps the attribute names to the name of the module that defines them.
+    """
+
+    if sys.version_info < (3, 7):
+        import_lazy_attributes(module_globals, attributes)
+
+    def __getattr__(name: str) -> Any:
+        module_name = attributes.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {module_globals['__name__']!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name), name)
+        module_globals[name] = value
+        return value
+
+    return __getattr__
+
+
+def import_lazy_attributes(module_globals: Dict[str, Any], attributes: Dict[str, str]) -> None:
+    """Import all lazy attributes of a module that are not imported yet, such that the module can use them."""
+    for name, module_name in attributes.items():
+        if name not in module_globals:
+            module_globals[name] = getattr(importlib.import_module(module_name), name)
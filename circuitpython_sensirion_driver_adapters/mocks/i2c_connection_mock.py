@@ -2,10 +2,10 @@
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
 import logging
-import time
 from typing import Optional, Tuple, Any
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxRequest
+from circuitpython_sensirion_driver_adapters.channel import DeviceBusyTracker, TxRxRequest
+from circuitpython_sensirion_driver_adapters.clock import Clock, system_clock
 from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
 
 connection_logger = logging.getLogger(__name__)
@@ -15,11 +15,23 @@ class I2cConnectionMock:
     """
     An i2c connection is used within the i2c channel to communicate with a sensor. This mock provides the same
     interface to the channel when instantiated with a sensor_mock.
+
+    The post processing time of a request is not waited for after the request. Unless the channel keeps track of it
+    (wait_post_process set to False), the next request to the same address waits for the part of it that has not
+    elapsed yet.
+
+    All delays are measured with the given clock. With a VirtualClock, the delays do not take any real time, but the
+    delays of concurrent execute_async calls add up (see VirtualClock.sleep_async).
     """
-    def __init__(self, sensor_mock: I2cSensorMock) -> None:
+    #: the I2cChannel may keep track of the post processing times, see I2cChannel
+    defers_post_processing = True
+
+    def __init__(self, sensor_mock: I2cSensorMock, clock: Optional[Clock] = None) -> None:
         self._connected_sensor = sensor_mock
+        self._clock = clock if clock is not None else system_clock
+        self._busy = DeviceBusyTracker(self._clock)
 
-    def execute(self, address: int, tx_rx: TxRxRequest) -> Optional[Tuple[Any]]:
+    def execute(self, address: int, tx_rx: TxRxRequest, wait_post_process: bool = True) -> Optional[Tuple[Any]]:
         """
         Implement interface required by I2cChannel
 
@@ -27,19 +39,41 @@ class I2cConnectionMock:
             i2c slave address
         :param tx_rx:
             TxRxRequest object. The tx_rx is a container for the request and response data.
+        :param wait_post_process:
+            If True, the next request to the same address is delayed by the post processing time.
         :returns:
             A tuple containing the result of the request
         """
+        self._busy.wait_until_ready(address)
         if tx_rx.tx_data is not None:
             self._connected_sensor.write(address, tx_rx.tx_data)
             if tx_rx.read_delay > 0:
-                time.sleep(tx_rx.read_delay)
+                self._clock.sleep(tx_rx.read_delay)
+        response = self._read(address, tx_rx)
+        if wait_post_process:
+            self._busy.set_busy(address, tx_rx.post_processing_time)
+        return response
+
+    async def execute_async(self, address: int, tx_rx: TxRxRequest) -> Optional[Tuple[Any]]:
+        """
+        Implement interface required by AsyncI2cChannel
+
+        Same as execute, but the read delay and the post processing time are awaited.
+        """
+        await self._busy.wait_until_ready_async(address)
+        if tx_rx.tx_data is not None:
+            self._connected_sensor.write(address, tx_rx.tx_data)
+            if tx_rx.read_delay > 0:
+                await self._clock.sleep_async(tx_rx.read_delay)
+        response = self._read(address, tx_rx)
+        self._busy.set_busy(address, tx_rx.post_processing_time)
+        return response
+
+    def _read(self, address: int, tx_rx: TxRxRequest) -> Optional[Tuple[Any]]:
         response = None
         # we should always try to read even if the length is 0
         expected_length = tx_rx.rx_length if tx_rx.rx_length is not None else 0
         data = self._connected_sensor.read(address, expected_length)
         if tx_rx.rx_length:
             response = tx_rx.interpret_response(data)
-        if tx_rx.post_processing_time > 0:
-            time.sleep(tx_rx.post_processing_time)
         return response
@@ -89,6 +89,11 @@ class I2cSensorMock:
             return rx_data
         return I2cChannel.build_tx_data(rx_data, 0, self._crc)
 
+    def reset(self) -> None:
+        """Forget all pending requests, as the sensor does after an i2c general call reset."""
+        self._request_queue.clear()
+        self._last_command = None
+
     @staticmethod
     def command_template(cmd_width) -> str:
         return '>H' if cmd_width == 2 else '>B'
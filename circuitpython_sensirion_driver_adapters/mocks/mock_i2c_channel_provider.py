@@ -3,9 +3,11 @@
 
 from typing import Optional, Tuple
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel, TxRxChannel
+from circuitpython_sensirion_driver_adapters.clock import Clock
 from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
 from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.async_i2c_channel import AsyncI2cChannel
 from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
 from circuitpython_sensirion_driver_adapters.mocks.i2c_connection_mock import I2cConnectionMock
 from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
@@ -14,13 +16,16 @@ from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSen
 class MockI2cChannelProvider(I2cChannelProvider):
     """
     Create an i2c mock channel. This channel does not need hardware and can be used for testing.
+
+    All channels of the provider talk to the same sensor mock. Use the SimulatedI2cBusChannelProvider for several
+    sensors with different addresses.
     """
 
     def __init__(self,
                  command_width: int,
                  response_provider: Optional[ResponseProvider] = None,
                  mock_id: int = 0,
-                 *args, **kwargs) -> None:
+                 *args, clock: Optional[Clock] = None, **kwargs) -> None:
         """
         :param command_width:
             Nr of bytes that are used by the command
@@ -28,8 +33,12 @@ class MockI2cChannelProvider(I2cChannelProvider):
             A class that generates a response for a given command and parameters
         :param mock_id:
             A number that identifies the mock - used in logs.
+        :param clock:
+            The clock of the connection mocks and the channels, by default the system clock. In the time of a
+            VirtualClock, the async channels do not overlap.
         """
         super().__init__(*args, **kwargs)
+        self._clock = clock
 
         self._sensor_mock = I2cSensorMock(cmd_width=command_width, response_provider=response_provider, mock_id=mock_id)
 
@@ -50,10 +59,25 @@ class MockI2cChannelProvider(I2cChannelProvider):
         self._sensor_mock.update_channel_parameters(slave_address=slave_address,
                                                     crc=crc,
                                                     response_provider=response_provider)
-        connection_mock = I2cConnectionMock(self._sensor_mock)
+        connection_mock = I2cConnectionMock(self._sensor_mock, clock=self._clock)
         return I2cChannel(connection=connection_mock,
                           slave_address=slave_address,
-                          crc=crc)
+                          crc=crc,
+                          clock=self._clock)
+
+    def get_async_channel(self, slave_address: int,
+                          crc_parameters: Optional[Tuple[int, int, int, int]],
+                          response_provider: Optional[ResponseProvider] = None) -> AsyncTxRxChannel:
+        """Return the initialized asyncio channel."""
+
+        crc = self.try_create_crc_calculator(crc_parameters)
+        self._sensor_mock.update_channel_parameters(slave_address=slave_address,
+                                                    crc=crc,
+                                                    response_provider=response_provider)
+        connection_mock = I2cConnectionMock(self._sensor_mock, clock=self._clock)
+        return AsyncI2cChannel(connection=connection_mock,
+                               slave_address=slave_address,
+                               crc=crc)
 
     @property
     def sensor_mock(self):
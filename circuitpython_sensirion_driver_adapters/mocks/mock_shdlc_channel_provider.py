@@ -4,24 +4,29 @@
 from typing import Optional
 
 from circuitpython_sensirion_driver_adapters.channel_provider import ShdlcChannelProvider
+from circuitpython_sensirion_driver_adapters.clock import Clock
 from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
 from circuitpython_sensirion_driver_adapters.mocks.shdlc_sensor_mock import ShdlcSensorMock
 from circuitpython_sensirion_driver_adapters.mocks.shdlc_transceiver_mock import ShdlcTransceiverMock
-from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import ShdlcChannel
+from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import AsyncShdlcChannel, ShdlcChannel
 
 
 class ShdlcMockPortChannelProvider(ShdlcChannelProvider):
     """Create a channel that is using a I2cConnection to communicate with a sensor over the SensorBridgeShdlcDevice."""
 
-    def __init__(self, response_provider: Optional[ResponseProvider] = None):
+    def __init__(self, response_provider: Optional[ResponseProvider] = None, clock: Optional[Clock] = None):
         """
         Initialize additional members for shdlc channel.
 
         :param response_provider:
             The response provider will return a response for a specific request.
+        :param clock:
+            The clock of the channels, by default the system clock. The busy times of the async channels add up
+            in the time of a VirtualClock.
         """
         super().__init__()
         self.sensor_mock = ShdlcSensorMock(response_provider)
+        self._clock = clock
 
     def get_id(self) -> int:
         return self._id
@@ -41,4 +46,10 @@ class ShdlcMockPortChannelProvider(ShdlcChannelProvider):
 
         """
         self.sensor_mock.update_channel_parameters(response_provider=response_provider)
-        return ShdlcChannel(ShdlcTransceiverMock(self.sensor_mock))
+        return ShdlcChannel(ShdlcTransceiverMock(self.sensor_mock), clock=self._clock)
+
+    def get_async_channel(self, _: float = 0.1,
+                          response_provider: Optional[ResponseProvider] = None) -> AsyncShdlcChannel:
+        """Create and return an initialized asyncio SHDLC channel."""
+        self.sensor_mock.update_channel_parameters(response_provider=response_provider)
+        return AsyncShdlcChannel(ShdlcTransceiverMock(self.sensor_mock), clock=self._clock)
@@ -3,6 +3,11 @@
 
 import abc
 import random
+import threading
+from collections import deque
+from typing import BinaryIO, Deque, Dict, Iterable, List, Union
+
+from circuitpython_sensirion_driver_adapters.recording_channel import ChannelLogRecord, read_channel_log
 
 
 def random_bytes(data_length: int) -> bytes:
@@ -67,3 +72,52 @@ class RandomResponse(ResponseProvider):
         if response_length <= 0:
             return bytes()
         return random_bytes(response_length)
+
+
+class ReplayResponse(ResponseProvider):
+    """
+    Serves the responses of a channel log, e.g. to replay recorded production traffic with the mock channel
+    providers.
+
+    A command gets the next recorded response of the same command with the same parameters, or, if the parameters
+    were never recorded, of the same command. When all responses of a command are used, they are served again.
+    Commands that were never recorded get random data.
+    """
+
+    def __init__(self, records: Union[str, BinaryIO, Iterable[ChannelLogRecord]], provider_id: str = "replay") -> None:
+        """
+        :param records:
+            The records, or the path or binary file of a channel log written by a RecordingChannel.
+        :param provider_id:
+            The identifier of the response provider.
+        """
+        if isinstance(records, str) or hasattr(records, 'read'):
+            records = read_channel_log(records)
+        self._id = provider_id
+        self._responses: Dict[tuple, List[bytes]] = {}
+        self._queues: Dict[tuple, Deque[bytes]] = {}
+        self._lock = threading.Lock()
+        for record in records:
+            if record.rx_data is None:
+                continue
+            cmd_id = int.from_bytes(record.tx_bytes[:record.payload_offset], 'big')
+            data = bytes(record.tx_bytes[record.payload_offset:])
+            self._responses.setdefault((cmd_id, data), []).append(record.rx_data)
+            self._responses.setdefault((cmd_id,), []).append(record.rx_data)
+
+    def get_id(self) -> str:
+        return self._id
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        if response_length <= 0:
+            return bytes()
+        key = (cmd_id, bytes(data or b''))
+        if key not in self._responses:
+            key = (cmd_id,)
+        if key not in self._responses:
+            return random_bytes(response_length)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                queue = self._queues[key] = deque(self._responses[key])
+            return queue.popleft()[:response_length]
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from sensirion_shdlc_sensorbridge import SensorBridgePort
+from sensirion_shdlc_sensorbridge.device_errors import SensorBridgeI2cNackError
+
+from circuitpython_sensirion_driver_adapters.i2c_adapter.crc_engine import TableCrcCalculator
+from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import RandomResponse
+
+SensorFactory = Callable[[str, SensorBridgePort], I2cSensorMock]
+
+
+class SimulatedSerialPort:
+    """
+    Serial port of a simulated SensorBridge.
+
+    The port has the same constructor signature as ShdlcSerialPort. Only one SHDLC command can be on the line at any
+    time, hence the commands to both SensorBridge ports are serialized by the lock of the serial port.
+    """
+
+    # SHDLC frames have 6 bytes overhead for the request and 7 bytes overhead for the response
+    MOSI_FRAME_OVERHEAD = 6
+    MISO_FRAME_OVERHEAD = 7
+    # 8 data bits, one start bit and one stop bit
+    BITS_PER_BYTE = 10
+
+    def __init__(self, port: str, baudrate: int) -> None:
+        self.port = port
+        self.baudrate = baudrate
+        self.is_open = True
+        self.lock = threading.RLock()
+
+    @property
+    def description(self) -> str:
+        return f"simulated {self.port}@{self.baudrate}"
+
+    def frame_time(self, tx_length: int, rx_length: int) -> float:
+        """Time needed to transmit a request with tx_length data bytes and to receive its response."""
+        nr_of_bytes = tx_length + rx_length + self.MOSI_FRAME_OVERHEAD + self.MISO_FRAME_OVERHEAD
+        return nr_of_bytes * self.BITS_PER_BYTE / self.baudrate
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class SimulatedSensorBridge:
+    """
+    In process replacement of a SensorBridgeShdlcDevice with one I2cSensorMock attached to each of its two ports.
+
+    Every SHDLC command takes the time to transfer its frames at the baud rate of the serial port plus a fixed
+    processing time of the device. An i2c transfer additionally takes the time on the i2c bus. The sensor mocks do not
+    model their busy time; a command with a read part is assumed to keep the sensor busy for the read delay, which
+    the SensorBridge spends polling the sensor.
+    """
+
+    # the i2c transceive request contains port, address, tx length, rx length and the timeout
+    TRANSCEIVE_HEADER_LENGTH = 9
+
+    def __init__(self, serial: SimulatedSerialPort,
+                 sensors: Dict[SensorBridgePort, I2cSensorMock],
+                 command_time: float = 0.0005) -> None:
+        """
+        :param serial:
+            The simulated serial port that is used to talk to the device.
+        :param sensors:
+            The sensor mock attached to each port.
+        :param command_time:
+            The time the device needs to process a command. Time unit: seconds
+        """
+        self._serial = serial
+        self._sensors = sensors
+        self._command_time = command_time
+        self.i2c_frequency: Dict[SensorBridgePort, float] = {port: 400000 for port in sensors}
+        self.supply_voltage: Dict[SensorBridgePort, float] = {port: 0.0 for port in sensors}
+        self.supply_on: Dict[SensorBridgePort, bool] = {port: False for port in sensors}
+        self.command_count = 0
+
+    @property
+    def serial(self) -> SimulatedSerialPort:
+        return self._serial
+
+    def connect(self, serial: SimulatedSerialPort) -> None:
+        """Attach the device to a newly opened serial port."""
+        self._serial = serial
+
+    def sensor(self, port: SensorBridgePort) -> I2cSensorMock:
+        return self._sensors[port]
+
+    def set_i2c_frequency(self, port: SensorBridgePort, frequency: float) -> None:
+        self._execute(1, 0, self._apply, self.i2c_frequency, port, frequency)
+
+    def set_supply_voltage(self, port: SensorBridgePort, voltage: float) -> None:
+        self._execute(1, 0, self._apply, self.supply_voltage, port, voltage)
+
+    def switch_supply_on(self, port: SensorBridgePort) -> None:
+        self._execute(1, 0, self._apply, self.supply_on, port, True)
+
+    def switch_supply_off(self, port: SensorBridgePort) -> None:
+        self._execute(1, 0, self._apply, self.supply_on, port, False)
+
+    def transceive_i2c(self, port: SensorBridgePort, address: int, tx_data, rx_length: int, timeout_us: float) -> bytes:
+        """Same interface as SensorBridgeShdlcDevice.transceive_i2c"""
+        return self._execute(self.TRANSCEIVE_HEADER_LENGTH + len(tx_data), rx_length,
+                             self._transceive, port, address, bytes(tx_data), rx_length, timeout_us)
+
+    def _execute(self, tx_length: int, rx_length: int, action, *args):
+        with self._serial.lock:
+            assert self._serial.is_open, "Serial port is closed"
+            self.command_count += 1
+            time.sleep(self._serial.frame_time(tx_length, rx_length) + self._command_time)
+            return action(*args)
+
+    @staticmethod
+    def _apply(settings: Dict[SensorBridgePort, object], port: SensorBridgePort, value) -> None:
+        ports = settings.keys() if port == SensorBridgePort.ALL else (port,)
+        for p in ports:
+            settings[p] = value
+
+    def _transceive(self, port: SensorBridgePort, address: int, tx_data: bytes, rx_length: int,
+                    timeout_us: float) -> bytes:
+        sensor = self._sensors[port]
+        if not self.supply_on[port] or address not in (0, sensor.i2c_address):
+            raise SensorBridgeI2cNackError()
+        # address byte plus 9 bits per data byte, including the acknowledge
+        bus_bits = 9 * ((1 + len(tx_data) if tx_data else 0) + (1 + rx_length if rx_length else 0))
+        time.sleep(bus_bits / self.i2c_frequency[port])
+        if tx_data:
+            sensor.write(address, tx_data)
+        if not rx_length:
+            sensor.read(address, 0)
+            return b""
+        if tx_data:
+            time.sleep(timeout_us * 1e-6)
+        return sensor.read(address, rx_length)
+
+
+class SensorBridgeSimulator:
+    """
+    Simulates any number of SensorBridge devices in process.
+
+    The methods open_serial_port and create_device replace ShdlcSerialPort and the creation of the
+    SensorBridgeShdlcDevice in the I2cMultiSensorBridgeConnection:
+
+    .. code-block:: python
+
+        simulator = SensorBridgeSimulator()
+        with I2cMultiSensorBridgeConnection(configs, baud_rate=460800, i2c_frequency=400000, voltage=3.3,
+                                            serial_port_factory=simulator.open_serial_port,
+                                            device_factory=simulator.create_device) as connection:
+            channel = connection.get_multi_channel(0x59, crc)
+
+    A simulated SensorBridge is created for every serial port that is opened and keeps its state when the port is
+    closed and opened again.
+    """
+
+    def __init__(self, sensor_factory: Optional[SensorFactory] = None,
+                 i2c_address: int = 0x59,
+                 crc_parameters: Optional[Tuple[int, int, int, int]] = (8, 0x31, 0xFF, 0x00),
+                 command_time: float = 0.0005) -> None:
+        """
+        :param sensor_factory:
+            Creates the sensor mock for a port of a SensorBridge given the serial port name and the SensorBridge port.
+            By default the sensors return random data.
+        :param i2c_address:
+            The i2c address of the sensors that are created by default.
+        :param crc_parameters:
+            The CRC parameters of the sensors that are created by default.
+        :param command_time:
+            The time a SensorBridge needs to process a command. Time unit: seconds
+        """
+        self._sensor_factory = sensor_factory
+        self._i2c_address = i2c_address
+        self._crc = TableCrcCalculator.create(tuple(crc_parameters)) if crc_parameters is not None else None
+        self._command_time = command_time
+        self._bridges: Dict[str, SimulatedSensorBridge] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bridges(self) -> Dict[str, SimulatedSensorBridge]:
+        """The simulated SensorBridge devices by serial port name"""
+        return dict(self._bridges)
+
+    def open_serial_port(self, port: str, baudrate: int) -> SimulatedSerialPort:
+        return SimulatedSerialPort(port=port, baudrate=baudrate)
+
+    def create_device(self, serial: SimulatedSerialPort) -> SimulatedSensorBridge:
+        with self._lock:
+            bridge = self._bridges.get(serial.port)
+            if bridge is None:
+                sensors = {port: self._create_sensor(serial.port, port)
+                           for port in (SensorBridgePort.ONE, SensorBridgePort.TWO)}
+                bridge = SimulatedSensorBridge(serial, sensors, command_time=self._command_time)
+                self._bridges[serial.port] = bridge
+            else:
+                bridge.connect(serial)
+            return bridge
+
+    def _create_sensor(self, serial_port: str, port: SensorBridgePort) -> I2cSensorMock:
+        if self._sensor_factory is not None:
+            return self._sensor_factory(serial_port, port)
+        return I2cSensorMock(RandomResponse(), mock_id=2 * len(self._bridges) + port.value,
+                             i2c_address=self._i2c_address, crc=self._crc)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sensirion_i2c_driver.errors import I2cNackError
+from sensirion_i2c_driver.transceiver_v1 import I2cTransceiverV1
+
+from circuitpython_sensirion_driver_adapters.channel import DeviceBusyTracker
+from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters.clock import Clock, system_clock
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
+
+
+class SimulatedI2cBus(I2cTransceiverV1):
+    """
+    An i2c bus with any number of sensor mocks, each on its own slave address.
+
+    The bus can be used as transceiver of an I2cConnection or an I2cBusScheduler, or directly as connection of an
+    I2cChannel. Writes and reads to an address without sensor are not acknowledged. A general call reset (0x06 written
+    to address 0) resets all sensors.
+
+    Every transfer occupies the bus for the time needed to clock the address and data bytes (including the
+    acknowledge bits). Transfers are serialized, also in the time of a VirtualClock, such that scheduling code can be
+    load tested with hundreds of devices.
+    """
+
+    GENERAL_CALL_ADDRESS = 0x00
+    GENERAL_CALL_RESET = b'\x06'
+    #: an I2cChannel that uses the bus as connection may keep track of the post processing times, see I2cChannel
+    defers_post_processing = True
+    # time after which the reservations of the bus are forgotten. Time unit: seconds
+    reservation_horizon = 1.0
+
+    def __init__(self, frequency: float = 400000, byte_time: Optional[float] = None,
+                 clock: Optional[Clock] = None) -> None:
+        """
+        :param frequency:
+            The i2c clock frequency. Time unit: Hz
+        :param byte_time:
+            The time to transfer one byte including the acknowledge bit. By default, it is 9 clock cycles. Set it to
+            0 to ignore the bus timing. Time unit: seconds
+        :param clock:
+            The clock that measures the bus timing and the delays of the commands, by default the system clock.
+        """
+        super().__init__()
+        self._byte_time = byte_time if byte_time is not None else 9.0 / frequency
+        self._clock = clock if clock is not None else system_clock
+        self._sensors: Dict[int, I2cSensorMock] = {}
+        self._lock = threading.Lock()
+        # the reserved time slots (start, end) of the bus, sorted by the start time
+        self._reservations: List[Tuple[float, float]] = []
+        self._busy = DeviceBusyTracker(self._clock)
+        self.transfer_count = 0
+
+    @property
+    def description(self) -> str:
+        return f"simulated i2c bus with {len(self._sensors)} sensors"
+
+    @property
+    def channel_count(self):
+        return None
+
+    @property
+    def clock(self) -> Clock:
+        return self._clock
+
+    @property
+    def sensors(self) -> Dict[int, I2cSensorMock]:
+        """The sensor mocks by slave address"""
+        return dict(self._sensors)
+
+    def open(self) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+    def add_sensor(self, slave_address: int, sensor: Optional[I2cSensorMock] = None,
+                   response_provider: Optional[ResponseProvider] = None,
+                   cmd_width: int = 2,
+                   crc_parameters: Optional[Tuple[int, int, int, int]] = (8, 0x31, 0xFF, 0x00)) -> I2cSensorMock:
+        """
+        Attach a sensor mock to the bus.
+
+        :param slave_address:
+            The address of the sensor. An address can only be used once.
+        :param sensor:
+            The sensor mock. If None, a mock is created with the remaining parameters.
+        :param response_provider:
+            The response provider of the created mock; by default the mock returns random data.
+        :param cmd_width:
+            The number of bytes of a command of the created mock.
+        :param crc_parameters:
+            The CRC parameters of the created mock, or None if the sensor does not use CRCs.
+        :return:
+            The sensor mock.
+        """
+        assert slave_address != self.GENERAL_CALL_ADDRESS, "The general call address is reserved"
+        if sensor is None:
+            sensor = I2cSensorMock(response_provider, cmd_width=cmd_width, mock_id=slave_address,
+                                   crc=I2cChannelProvider.try_create_crc_calculator(crc_parameters))
+        sensor.i2c_address = slave_address
+        with self._lock:
+            assert slave_address not in self._sensors, f"Address 0x{slave_address:02X} is already used"
+            self._sensors[slave_address] = sensor
+        return sensor
+
+    def remove_sensor(self, slave_address: int) -> None:
+        with self._lock:
+            del self._sensors[slave_address]
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        """Transceive an i2c frame, see I2cTransceiverV1.transceive. The timeout is ignored."""
+        if tx_data is not None:
+            if not self._transfer(slave_address, tx_data, None, write_only=rx_length is None):
+                return self.STATUS_NACK, None, b""
+            if rx_length is None:
+                return self.STATUS_OK, None, b""
+            self._clock.sleep(read_delay)
+        rx_data = self._transfer(slave_address, None, rx_length)
+        if rx_data is None:
+            return self.STATUS_NACK, None, b""
+        return self.STATUS_OK, None, rx_data
+
+    def execute(self, slave_address: int, command, wait_post_process: bool = True):
+        """
+        Execute a command; same interface as I2cConnection.execute.
+
+        The post processing time is not waited for after the command, but before the next command to the same address.
+        After a general call, all sensors are busy.
+
+        :raise ~sensirion_i2c_driver.errors.I2cNackError:
+            If no sensor is attached at the address.
+        """
+        self._busy.wait_until_ready(slave_address)
+        status, error, rx_data = self.transceive(slave_address, command.tx_data, command.rx_length,
+                                                 command.read_delay, command.timeout)
+        if status != self.STATUS_OK:
+            raise I2cNackError(error, rx_data)
+        if wait_post_process:
+            addresses = self.sensors.keys() if slave_address == self.GENERAL_CALL_ADDRESS else (slave_address,)
+            for address in addresses:
+                self._busy.set_busy(address, command.post_processing_time)
+        if command.rx_length:
+            return command.interpret_response(rx_data)
+        return None
+
+    def _transfer(self, slave_address: int, tx_data: Optional[bytes], rx_length: Optional[int],
+                  write_only: bool = False):
+        """
+        Occupy the bus for one write or read transfer.
+
+        The sensor mocks handle a command when they are read. After a write that is not followed by a read, the
+        sensor is therefore read with length 0, as the I2cConnectionMock does.
+
+        :return:
+            None if the address was not acknowledged, otherwise True for a write and the read data for a read.
+        """
+        nr_of_bytes = 1 + (len(tx_data) if tx_data is not None else rx_length or 0)
+        with self._lock:
+            now = self._clock.monotonic()
+            end = self._reserve(now, nr_of_bytes * self._byte_time)
+            self._clock.sleep(end - now)
+            self.transfer_count += 1
+            if slave_address == self.GENERAL_CALL_ADDRESS:
+                return self._general_call(tx_data)
+            sensor = self._sensors.get(slave_address)
+            if sensor is None:
+                return None
+            if tx_data is not None:
+                if tx_data:
+                    sensor.write(slave_address, bytes(tx_data))
+                    if write_only:
+                        sensor.read(slave_address, 0)
+                return True
+            rx_data = sensor.read(slave_address, rx_length or 0)
+            # without a response, the sensor leaves the bus idle for the bytes that are read
+            return rx_data if rx_data is not None else b'\xff' * (rx_length or 0)
+
+    def _reserve(self, earliest_start: float, duration: float) -> float:
+        """
+        Reserve the first free time slot of the bus that starts at earliest_start or later.
+
+        With a VirtualClock, the worker threads of concurrent transfers do not run in the order of the virtual time.
+        Therefore, a transfer may take a gap before transfers that were reserved earlier. Reservations that ended more
+        than reservation_horizon before the new one are forgotten.
+
+        :return:
+            The end of the reserved time slot.
+        """
+        if duration <= 0:
+            return earliest_start
+        start = earliest_start
+        index = bisect.bisect_left(self._reservations, (start, start))
+        if index > 0 and self._reservations[index - 1][1] > start:
+            start = self._reservations[index - 1][1]
+        while index < len(self._reservations) and self._reservations[index][0] < start + duration:
+            start = max(start, self._reservations[index][1])
+            index += 1
+        self._reservations.insert(index, (start, start + duration))
+        horizon = start - self.reservation_horizon
+        if self._reservations[0][1] < horizon:
+            self._reservations = [slot for slot in self._reservations if slot[1] >= horizon]
+        return start + duration
+
+    def _general_call(self, tx_data: Optional[bytes]):
+        if tx_data is None:
+            return None  # nobody responds to a read from the general call address
+        if bytes(tx_data) == self.GENERAL_CALL_RESET:
+            for sensor in self._sensors.values():
+                sensor.reset()
+        return True
+
+
+class SimulatedI2cBusChannelProvider(I2cChannelProvider):
+    """
+    Provide channels to the sensors of a SimulatedI2cBus.
+
+    Unlike the MockI2cChannelProvider, every slave address gets its own sensor, so the channels of one provider do
+    not share the same mock.
+    """
+
+    def __init__(self, bus: Optional[SimulatedI2cBus] = None, *args, **kwargs) -> None:
+        """
+        :param bus:
+            The simulated bus. By default, an empty bus is created; sensors are added with bus.add_sensor.
+        """
+        super().__init__(*args, **kwargs)
+        self.bus = bus if bus is not None else SimulatedI2cBus()
+        # the channels keep track of the post processing times in the time of the bus
+        self._busy_tracker = DeviceBusyTracker(self.bus.clock)
+
+    def release_channel_resources(self):
+        """Nothing needs to be done"""
+
+    def prepare_channel(self):
+        """Nothing needs to be done"""
+
+    def get_channel(self, slave_address: int,
+                    crc_parameters: Optional[Tuple[int, int, int, int]]) -> I2cChannel:
+        """Return a channel to the sensor at slave_address. The sensor does not have to be attached yet."""
+        return I2cChannel(connection=self.bus,
+                          slave_address=slave_address,
+                          crc=self.try_create_crc_calculator(crc_parameters),
+                          busy_tracker=self._busy_tracker)
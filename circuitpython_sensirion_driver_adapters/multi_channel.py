@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
-from typing import Tuple, Optional, Iterator, Any
+from typing import TYPE_CHECKING, Tuple, Optional, Iterator, Any
 
 from circuitpython_sensirion_driver_adapters.channel import TxRxChannel, AbstractMultiChannel
 
+if TYPE_CHECKING:
+    from circuitpython_sensirion_driver_adapters.instrumentation import Instrumentation
+
 
 class MultiChannel(AbstractMultiChannel):
 
@@ -54,6 +57,12 @@ class MultiChannel(AbstractMultiChannel):
     def strip_protocol(self, data) -> None:
         self._active_channel.strip_protocol(data)
 
+    def set_instrumentation(self, instrumentation: Optional["Instrumentation"]) -> None:
+        """Instrument all contained channels. The events name the contained channel that executed the transfer."""
+        self.instrumentation = instrumentation
+        for channel in self._channels:
+            channel.set_instrumentation(instrumentation)
+
     @property
     def timeout(self) -> float:
         # this function may be called outside a write_read 'transaction'
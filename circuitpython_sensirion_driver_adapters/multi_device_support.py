@@ -1,25 +1,94 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2022 Sensirion AG, Switzerland
 
+import inspect
+import threading
 from abc import ABC
-from concurrent.futures import ThreadPoolExecutor
-from functools import partial, partialmethod
-from typing import TypeVar, Callable, Type
+from concurrent.futures import Executor, ThreadPoolExecutor, wait, as_completed as futures_as_completed
+from functools import partialmethod, wraps
+from typing import Any, TypeVar, Callable, Dict, Iterator, Optional, Tuple, Type
 
 from circuitpython_sensirion_driver_adapters.channel import AbstractMultiChannel
+from circuitpython_sensirion_driver_adapters.clock import Clock, system_clock
 
 T1 = TypeVar("T1")
 T2 = TypeVar("T2")
 
 
+class ChannelFailure:
+    """
+    Result of a channel whose driver method raised an exception or that is quarantined.
+
+    Multi drivers with fault isolation return a ChannelFailure in place of the result of a failing channel, instead
+    of raising the exception. A ChannelFailure evaluates to False.
+    """
+
+    def __init__(self, channel_index: int, error: Exception, quarantined: bool = False) -> None:
+        """
+        :param channel_index: Index of the failing channel
+        :param error: The exception raised by the channel. For a quarantined channel, this is the last error.
+        :param quarantined: True if the channel was not called because it is quarantined.
+        """
+        self.channel_index = channel_index
+        self.error = error
+        self.quarantined = quarantined
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        state = 'quarantined' if self.quarantined else 'failed'
+        return f'ChannelFailure(channel {self.channel_index} {state}: {self.error!r})'
+
+
+class QuarantineBackoff:
+    """
+    Exponential back-off for channels that failed.
+
+    After n consecutive failures, a channel is not called for min(initial_delay * factor ** (n - 1), max_delay)
+    seconds. The first successful call ends the quarantine.
+    """
+
+    def __init__(self, initial_delay: float = 1.0, factor: float = 2.0, max_delay: float = 60.0) -> None:
+        self.initial_delay = initial_delay
+        self.factor = factor
+        self.max_delay = max_delay
+
+    def delay(self, nr_of_failures: int) -> float:
+        return min(self.initial_delay * self.factor ** (nr_of_failures - 1), self.max_delay)
+
+
+class _ChannelHealth:
+    """Failure statistic of one channel of a multi driver."""
+
+    __slots__ = ('failures', 'retry_time', 'last_error')
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.retry_time = 0.0
+        self.last_error: Optional[Exception] = None
+
+
 class MultiChannelWrapper(ABC):
+    #: the methods that are added to a multi driver unless the driver class or the wrapped type define them
+    _PUBLIC_METHODS = ('as_completed', 'quarantined_channels', 'close')
 
-    def __init__(self, driver_type: type, execute_parallel: bool) -> None:
+    def __init__(self, driver_type: type, execute_parallel: bool, executor: Optional[Executor] = None,
+                 isolate_faults: bool = False, backoff: Optional[QuarantineBackoff] = None,
+                 clock: Optional[Clock] = None) -> None:
         self._current_fun = None
         self._wrap_fun = MultiChannelWrapper.__co_repeat__ if execute_parallel else MultiChannelWrapper.__repeat__
         self._driver_type = driver_type
         self._drivers = []
+        self._shared_executor = executor
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._backoff = backoff
+        self._clock = clock if clock is not None else system_clock
+        self._channel_health = None
         assert isinstance(self._channel, AbstractMultiChannel), "Multi Drivers must be used with AbstractMultiChannel"
+        if isolate_faults or backoff is not None:
+            self._channel_health = [_ChannelHealth() for _ in range(self._channel.channel_count)]
         for i in range(self._channel.channel_count):
             driver = object.__new__(driver_type)
             driver.__init__(self.channel.get_channel(i))
@@ -29,42 +98,189 @@ class MultiChannelWrapper(ABC):
     def __repeat__(*args, me, fun_name, **kwargs):
         results = []
         with me.channel:
-            for driver in me._drivers:
+            for i, driver in enumerate(me._drivers):
                 fun = getattr(driver, fun_name)
-                results.append(fun(*args, **kwargs))
+                results.append(MultiChannelWrapper._invoke(me, i, fun, args, kwargs))
         return tuple(results)
 
     @staticmethod
     def __co_repeat__(*args, me, fun_name, **kwargs):
         calls = [getattr(driver, fun_name) for driver in me._drivers]
+        executor = MultiChannelWrapper._worker_pool(me)
         with me.channel:
-            with ThreadPoolExecutor(max_workers=me.channel.channel_count) as executor:
-                futures = [executor.submit(fun, *args, **kwargs) for fun in calls]
-                return tuple(map(lambda x: x.result(), futures))
+            branches = [me._clock.branch(MultiChannelWrapper._invoke) for _ in calls]
+            futures = [executor.submit(branch, me, i, fun, args, kwargs)
+                       for i, (branch, fun) in enumerate(zip(branches, calls))]
+            wait(futures)
+            me._clock.join(branches)
+            return tuple(map(lambda x: x.result(), futures))
+
+    @staticmethod
+    def _invoke(me, channel_index: int, fun: Callable, args, kwargs) -> Any:
+        """
+        Call the driver method of one channel.
 
-    def __getattribute__(self, item):
-        attr = object.__getattribute__(self, item)
-        # for these attributes we want to have normal attribute behavior
-        if not callable(attr) or item in ['__repeat__', '__co_repeat__', '__wrapped_type__', '_wrap_fun']:
-            return attr
-        # calls to methods of the new type do not need to be wrapped!
-        if item in self.__wrapped_type__.__dict__:
-            return attr
+        With fault isolation, an exception is returned as ChannelFailure and quarantined channels are not called.
+        """
+        health = me._channel_health[channel_index] if me._channel_health is not None else None
+        if health is None:
+            return fun(*args, **kwargs)
+        if health.failures and me._backoff is not None and me._clock.monotonic() < health.retry_time:
+            return ChannelFailure(channel_index, health.last_error, quarantined=True)
+        try:
+            result = fun(*args, **kwargs)
+        except Exception as error:
+            health.failures += 1
+            health.last_error = error
+            if me._backoff is not None:
+                health.retry_time = me._clock.monotonic() + me._backoff.delay(health.failures)
+            return ChannelFailure(channel_index, error)
+        health.failures = 0
+        health.last_error = None
+        return result
+
+    @staticmethod
+    def _worker_pool(me) -> Executor:
+        """Return the shared executor or the worker pool owned by the multi driver. The pool is created lazily."""
+        if me._shared_executor is not None:
+            return me._shared_executor
+        with me._executor_lock:
+            if me._executor is None:
+                me._executor = ThreadPoolExecutor(max_workers=me.channel.channel_count)
+            return me._executor
+
+    def as_completed(self, fun_name: str, *args, **kwargs) -> Iterator[Tuple[int, Any]]:
+        """
+        Invoke a driver method on all channels and yield the result of each channel as soon as it is available.
+
+        With execute_concurrent set to True, the results are yielded in the order in which the channels finish.
+        Otherwise, the channels are called one after the other and each result is yielded right after the call.
+        With a virtual clock, the order in which the channels finish is determined by the virtual time. Therefore,
+        all channels have to finish before the first result is yielded; the results are then yielded in the order
+        of their virtual end times.
+
+        :param fun_name: The name of the driver method to invoke.
+        :param args: Positional arguments of the driver method.
+        :param kwargs: Keyword arguments of the driver method.
+        :return: An iterator over tuples (channel index, result). If the driver method raised an exception on a
+            channel, the exception is yielded instead of the result.
+        """
+        calls = [getattr(driver, fun_name) for driver in self._drivers]
+        with self.channel:
+            if self._wrap_fun is not MultiChannelWrapper.__co_repeat__:
+                for i, fun in enumerate(calls):
+                    try:
+                        result = MultiChannelWrapper._invoke(self, i, fun, args, kwargs)
+                    except Exception as error:
+                        result = error
+                    yield i, result
+                return
+            executor = MultiChannelWrapper._worker_pool(self)
+            branches = [self._clock.branch(MultiChannelWrapper._invoke) for _ in calls]
+            futures = {executor.submit(branch, self, i, fun, args, kwargs): i
+                       for i, (branch, fun) in enumerate(zip(branches, calls))}
+            if self._clock.virtual:
+                # the worker threads finish in arbitrary order, since the virtual time does not pass while they run
+                wait(futures)
+                completed = sorted(futures, key=lambda future: branches[futures[future]].end_time)
+            else:
+                completed = futures_as_completed(futures)
+            for future in completed:
+                self._clock.join([branches[futures[future]]])
+                error = future.exception()
+                yield futures[future], error if error is not None else future.result()
+
+    def quarantined_channels(self) -> Tuple[int, ...]:
+        """Return the indices of the channels that are currently quarantined."""
+        if self._channel_health is None or self._backoff is None:
+            return tuple()
+        now = self._clock.monotonic()
+        return tuple(i for i, health in enumerate(self._channel_health) if health.failures and now < health.retry_time)
+
+    def close(self) -> None:
+        """
+        Shut down the worker pool that is owned by the multi driver.
+
+        An executor that was passed to the multi_driver decorator is shared and therefore not shut down. The multi
+        driver can still be used after close; a new worker pool is created when needed.
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.close()
+        return False
+
+    @staticmethod
+    def __fan_out__(fun_name: str, fun: Callable) -> Callable:
+        """Create a method that invokes the driver method fun_name on all drivers of the multi driver."""
+
+        @wraps(fun)
+        def fan_out(self, *args, **kwargs):
+            return self._wrap_fun(*args, me=self, fun_name=fun_name, **kwargs)
+
+        return fan_out
+
+    @staticmethod
+    def __chained_close__(driver_close: Callable) -> Callable:
+        """Create a close method that closes the drivers of all channels and then the multi driver itself."""
+        fan_out = MultiChannelWrapper.__fan_out__('close', driver_close)
+
+        @wraps(driver_close)
+        def close(self, *args, **kwargs):
+            try:
+                return fan_out(self, *args, **kwargs)
+            finally:
+                MultiChannelWrapper.close(self)
+
+        return close
+
+    @staticmethod
+    def __dispatch_table__(driver_class: type, wrapped_type: type) -> Dict[str, Callable]:
+        """
+        Create the fan-out methods for all methods of the driver class.
 
-        return partial(self._wrap_fun, me=self, fun_name=item)
+        Special methods, methods defined by the wrapped type and the internal methods of the MultiChannelWrapper are not
+        wrapped. Driver methods with the same name as a public method of the MultiChannelWrapper are wrapped as well.
+        """
+        table = {}
+        for cls in reversed(driver_class.__mro__[:-1]):  # skip object
+            for name, attr in cls.__dict__.items():
+                if name.startswith('__') and name.endswith('__'):
+                    continue
+                if name in wrapped_type.__dict__:
+                    continue
+                if name in MultiChannelWrapper.__dict__ and name not in MultiChannelWrapper._PUBLIC_METHODS:
+                    continue
+                if isinstance(attr, (staticmethod, classmethod)):
+                    attr = attr.__func__
+                elif not inspect.isfunction(attr):
+                    continue
+                table[name] = MultiChannelWrapper.__fan_out__(name, attr)
+        return table
 
 
-def __init_wrapped__(self, *args, wrapped_type, driver_type, execute_concurrent, **kwargs):
+def __init_wrapped__(self, *args, wrapped_type, driver_type, execute_concurrent, executor, isolate_faults, backoff,
+                     clock, **kwargs):
     if '__init__' in wrapped_type.__dict__:
         wrapped_type.__init__(self, **kwargs)  # it has a __init__ method
     if 'channel' in kwargs:
         driver_type.__init__(self, kwargs['channel'])
     else:
         driver_type.__init__(self, *args)
-    MultiChannelWrapper.__init__(self, driver_type, execute_concurrent)
+    MultiChannelWrapper.__init__(self, driver_type, execute_concurrent, executor, isolate_faults, backoff, clock)
 
 
-def multi_driver(driver_class: Type[T2], execute_concurrent=False) -> Callable[[Type[T1]], Type[T2]]:
+def multi_driver(driver_class: Type[T2], execute_concurrent=False,
+                 executor: Optional[Executor] = None,
+                 isolate_faults: bool = False,
+                 backoff: Optional[QuarantineBackoff] = None,
+                 clock: Optional[Clock] = None) -> Callable[[Type[T1]], Type[T2]]:
     """
     Decorator to define a driver for multiple sensors.
 
@@ -79,15 +295,34 @@ def multi_driver(driver_class: Type[T2], execute_concurrent=False) -> Callable[[
     channel in the AbstractMultiChannel.
     The wrapped class my_multi_driver may contain methods by its own. These methods will not be wrapped but executed
     like normal python methods.
+    The wrapping methods are generated once when the new class is created. Attribute access on a multi driver has no
+    overhead.
+    The method as_completed(fun_name, *args, **kwargs) of the new class yields the result of each channel as soon as it
+    is available instead of waiting for all channels. A driver method with the same name as a method of the multi
+    driver, e.g. as_completed, takes precedence and is invoked on all channels. If the driver class has a close method,
+    close() of the multi driver invokes it on all channels before the worker pool is shut down.
     In case a __init__ method is needed, it has to contain a ** argument and the constructor of the wrapped type has to
     be called with named arguments including the channel argument of the driver_class constructor.
 
     :param driver_class: driver class to be wrapped in the new multi-driver class.
     :param execute_concurrent: Two modes of operation are possible. Whe executing a driver function, each driver is
     called sequentially when execute_concurrent is set to False.
-    When execute_concurrent is set to True, a worker thread is
-    spawned for each channel and the function is invoked on each thread individually. This method is appropriate when
-    the commands to be executed may contain a long wait time before reading the response.
+    When execute_concurrent is set to True, the function is invoked for each channel on a worker thread. This method is
+    appropriate when the commands to be executed may contain a long wait time before reading the response.
+    The worker threads are kept alive between calls. Each multi driver instance creates its own pool with one
+    worker per channel on first usage. The pool is shut down by calling close() or by using the multi driver as
+    context manager.
+    :param executor: An executor that is shared by all instances of the new type, instead of a worker pool per
+    instance. The same executor may be passed to several multi_driver decorators. It is never shut down by the multi
+    drivers.
+    :param isolate_faults: If True, an exception of one channel does not abort the call. Instead, a ChannelFailure
+    object is returned as result of the failing channel.
+    :param backoff: If set, fault isolation is enabled and failing channels are quarantined: They are not called until
+    the back-off delay is over, and a ChannelFailure with quarantined set to True is returned for them. The healthy
+    channels are not affected.
+    :param clock: The clock that measures the quarantine times. With execute_concurrent set to True, the worker threads
+    run as branches of the clock, such that the channels also run concurrently in the time of a VirtualClock. The
+    system clock is used by default.
 
     :return: a new type that provides the above described functionalities.
     """
@@ -97,8 +332,22 @@ def multi_driver(driver_class: Type[T2], execute_concurrent=False) -> Callable[[
         namespace = dict(__init__=partialmethod(__init_wrapped__,
                                                 wrapped_type=new_class,
                                                 driver_type=driver_class,
-                                                execute_concurrent=execute_concurrent),
+                                                execute_concurrent=execute_concurrent,
+                                                executor=executor,
+                                                isolate_faults=isolate_faults,
+                                                backoff=backoff,
+                                                clock=clock),
                          __wrapped_type__=new_class)
+        # the wrapper methods do not hide methods of the driver class or the wrapped type with the same name
+        namespace.update({name: MultiChannelWrapper.__dict__[name]
+                          for name in MultiChannelWrapper._PUBLIC_METHODS + ('__enter__', '__exit__')
+                          if name not in new_class.__dict__ and not hasattr(driver_class, name)})
+        # the methods of the driver class are replaced once by methods that invoke them on all channels
+        namespace.update(MultiChannelWrapper.__dispatch_table__(driver_class, new_class))
+        # a close method of the driver class is invoked on all channels before the worker pool is shut down
+        driver_close = getattr(driver_class, 'close', None)
+        if 'close' not in new_class.__dict__ and callable(driver_close):
+            namespace['close'] = MultiChannelWrapper.__chained_close__(driver_close)
         new_type = type(new_class.__name__, (new_class, driver_class, MultiChannelWrapper), namespace)
         return new_type
 
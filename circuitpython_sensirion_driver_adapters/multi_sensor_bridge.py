@@ -2,20 +2,33 @@
 # (c) Copyright 2022 Sensirion AG, Switzerland
 
 
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntFlag
-from typing import Iterable, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple
 from typing import List
 
 from sensirion_i2c_driver import I2cConnection, CrcCalculator
-from sensirion_shdlc_driver import ShdlcSerialPort, ShdlcConnection
-from sensirion_shdlc_sensorbridge import (SensorBridgePort,
-                                          SensorBridgeShdlcDevice,
-                                          SensorBridgeI2cProxy)
 
+from circuitpython_sensirion_driver_adapters import lazy_import
 from circuitpython_sensirion_driver_adapters.channel import AbstractMultiChannel
 from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
 from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
 
+if TYPE_CHECKING:
+    from sensirion_shdlc_driver import ShdlcSerialPort, ShdlcConnection
+    from sensirion_shdlc_sensorbridge import SensorBridgePort, SensorBridgeShdlcDevice, SensorBridgeI2cProxy
+
+# The SHDLC and SensorBridge drivers (and thereby pyserial) are imported when the first connection is created
+_lazy_attributes = {
+    'ShdlcSerialPort': 'sensirion_shdlc_driver',
+    'ShdlcConnection': 'sensirion_shdlc_driver',
+    'SensorBridgePort': 'sensirion_shdlc_sensorbridge',
+    'SensorBridgeShdlcDevice': 'sensirion_shdlc_sensorbridge',
+    'SensorBridgeI2cProxy': 'sensirion_shdlc_sensorbridge',
+}
+
+__getattr__ = lazy_import.lazy_attributes(globals(), _lazy_attributes)
+
 
 class UsedPorts(IntFlag):
     """Flag to indicate which ports being used."""
@@ -35,10 +48,25 @@ class Config:
         self.selected_ports: UsedPorts = ports
 
 
+class SensorBridgeBringUpError(Exception):
+    """Raised when one or several SensorBridge devices could not be configured.
+
+    :param errors: The exception of each failing SensorBridge, keyed by the index of its configuration. Several
+        configurations may use the same serial port.
+    :param configs: The configurations of all SensorBridge devices.
+    """
+    def __init__(self, errors: Dict[int, BaseException], configs: List[Config]) -> None:
+        super().__init__("Bring-up of SensorBridge(s) failed: " +
+                         ", ".join(f"config {index} ({configs[index].serial_port}): {error!r}"
+                                   for index, error in errors.items()))
+        self.errors = errors
+        self.configs = configs
+
+
 class SensorBridgeLiveInfo:
-    def __init__(self, sensor_bridge: SensorBridgeShdlcDevice, ports: Optional[List[SensorBridgePort]]) -> None:
+    def __init__(self, sensor_bridge: "SensorBridgeShdlcDevice", ports: Optional[List["SensorBridgePort"]]) -> None:
         self.sensor_bridge = sensor_bridge
-        self.ports: List[SensorBridgePort] = ports if ports is not None else list()
+        self.ports: List["SensorBridgePort"] = ports if ports is not None else list()
 
 
 class I2cMultiSensorBridgeConnection:
@@ -52,35 +80,99 @@ class I2cMultiSensorBridgeConnection:
         devices.
     :param i2c_frequency: The I2c frequency used for communication with the sensors.
     :param voltage: The supply voltage used by the attached sensors.
+    :param serial_port_factory: Opens the serial port of a SensorBridge given the port name and the baud rate. By
+        default a ShdlcSerialPort is opened.
+    :param device_factory: Creates the SensorBridge device for an opened serial port. By default a
+        SensorBridgeShdlcDevice is created. Together with the serial_port_factory this allows to replace the
+        SensorBridge devices, e.g. by the SensorBridgeSimulator.
     """
-    def __init__(self, config_list: Iterable[Config], baud_rate: int, i2c_frequency: int, voltage: float) -> None:
+    def __init__(self, config_list: Iterable[Config], baud_rate: int, i2c_frequency: int, voltage: float,
+                 serial_port_factory: Optional[Callable[..., "ShdlcSerialPort"]] = None,
+                 device_factory: Optional[Callable[["ShdlcSerialPort"], "SensorBridgeShdlcDevice"]] = None) -> None:
+        lazy_import.import_lazy_attributes(globals(), _lazy_attributes)
         self._config_list = config_list
         self._baud_rate = baud_rate
         self._i2c_frequency = i2c_frequency
         self._voltage = voltage
-        self._serial_ports: List[ShdlcSerialPort] = []
-        self._proxies: List[SensorBridgeI2cProxy] = []
+        self._serial_port_factory = serial_port_factory if serial_port_factory is not None else ShdlcSerialPort
+        self._device_factory = device_factory if device_factory is not None else self._create_device
+        self._serial_ports: List["ShdlcSerialPort"] = []
+        self._proxies: List["SensorBridgeI2cProxy"] = []
         self._sensor_bridges: List[SensorBridgeLiveInfo] = []
 
-    def _create_proxies(self, serial: ShdlcSerialPort, selected_ports: UsedPorts) -> None:
-        bridge = SensorBridgeShdlcDevice(ShdlcConnection(serial), slave_address=0)
+    def _create_proxies(self, serial: "ShdlcSerialPort",
+                        selected_ports: UsedPorts) -> Tuple[SensorBridgeLiveInfo, List["SensorBridgeI2cProxy"]]:
+        bridge = self._device_factory(serial)
 
         sensor_bridge_port_list = [SensorBridgePort(i) for i in range(2) if selected_ports.value & (1 << i) != 0]
         # we need this information in order to power off an on the different channels later on!
-        self._sensor_bridges.append(SensorBridgeLiveInfo(sensor_bridge=bridge, ports=sensor_bridge_port_list))
-        for sensor_bridge_port in sensor_bridge_port_list:
-            bridge.set_i2c_frequency(sensor_bridge_port, self._i2c_frequency)
-            bridge.set_supply_voltage(sensor_bridge_port, self._voltage)
-            bridge.switch_supply_on(sensor_bridge_port)
-            self._proxies.append(SensorBridgeI2cProxy(bridge, sensor_bridge_port))
+        live_info = SensorBridgeLiveInfo(sensor_bridge=bridge, ports=sensor_bridge_port_list)
+        proxies = []
+        try:
+            for sensor_bridge_port in sensor_bridge_port_list:
+                bridge.set_i2c_frequency(sensor_bridge_port, self._i2c_frequency)
+                bridge.set_supply_voltage(sensor_bridge_port, self._voltage)
+                bridge.switch_supply_on(sensor_bridge_port)
+                proxies.append(SensorBridgeI2cProxy(bridge, sensor_bridge_port))
+        except BaseException:
+            self._try_switch_supply_off(live_info)
+            raise
+        return live_info, proxies
+
+    def _bring_up(self, config: Config) -> Tuple["ShdlcSerialPort", SensorBridgeLiveInfo,
+                                                 List["SensorBridgeI2cProxy"]]:
+        """Open the serial port of one SensorBridge and configure the selected ports."""
+        serial = self._serial_port_factory(port=config.serial_port, baudrate=self._baud_rate)
+        try:
+            live_info, proxies = self._create_proxies(serial, config.selected_ports)
+        except BaseException:
+            serial.close()
+            raise
+        return serial, live_info, proxies
 
     def __enter__(self) -> "I2cMultiSensorBridgeConnection":
-        for config in self._config_list:
-            serial = ShdlcSerialPort(port=config.serial_port, baudrate=self._baud_rate)
+        """
+        Open and configure all SensorBridge devices.
+
+        The SensorBridge devices are independent and are therefore configured concurrently, one worker per serial port.
+        If any of them fails, the others are switched off and closed again and a SensorBridgeBringUpError is raised.
+        """
+        configs = list(self._config_list)
+        with ThreadPoolExecutor(max_workers=max(len(configs), 1)) as executor:
+            futures = [executor.submit(self._bring_up, config) for config in configs]
+        errors: Dict[int, BaseException] = {}
+        for index, future in enumerate(futures):
+            error = future.exception()
+            if error is not None:
+                errors[index] = error
+                continue
+            serial, live_info, proxies = future.result()
             self._serial_ports.append(serial)
-            self._create_proxies(serial, config.selected_ports)
+            self._sensor_bridges.append(live_info)
+            self._proxies.extend(proxies)
+        if errors:
+            for live_info in self._sensor_bridges:
+                self._try_switch_supply_off(live_info)
+            [port.close() for port in self._serial_ports]
+            self._serial_ports.clear()
+            self._sensor_bridges.clear()
+            self._proxies.clear()
+            raise SensorBridgeBringUpError(errors, configs)
         return self
 
+    @staticmethod
+    def _create_device(serial: "ShdlcSerialPort") -> "SensorBridgeShdlcDevice":
+        return SensorBridgeShdlcDevice(ShdlcConnection(serial), slave_address=0)
+
+    @staticmethod
+    def _try_switch_supply_off(live_info: SensorBridgeLiveInfo) -> None:
+        """Switch the supply off on a best effort basis; used for the clean-up after a failed bring-up."""
+        for port in live_info.ports:
+            try:
+                live_info.sensor_bridge.switch_supply_off(port)
+            except Exception:
+                pass
+
     def get_multi_channel(self, i2c_address, crc: CrcCalculator) -> AbstractMultiChannel:
         """Create a multi-channel object for the configured SensorBridge devices and selected SensorBridge ports.
         """
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import math
+import struct
+import threading
+from collections import deque
+from typing import Any, BinaryIO, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, \
+    Union
+
+from circuitpython_sensirion_driver_adapters.channel import TxRxChannel, WriteReadRequest
+from circuitpython_sensirion_driver_adapters.clock import Clock, system_clock
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
+
+
+class ChannelLogRecord(NamedTuple):
+    """One write_read of a channel, as stored in a channel log"""
+    tx_bytes: bytes
+    payload_offset: int
+    #: the received data after the protocol was stripped, i.e. the data that was unpacked; None without response
+    rx_data: Optional[bytes]
+    slave_address: Optional[int]
+    #: the time of the clock of the RecordingChannel when the transfer started. Time unit: seconds
+    start_time: float
+    #: Time unit: seconds
+    duration: float
+    device_busy_delay: float
+    post_processing_delay: Optional[float]
+    #: type and message of the exception raised by the channel, e.g. "I2cNackError: ..."
+    error: Optional[str] = None
+    #: True if the response was unpacked with RxData.unpack_dynamic_sized
+    dynamic_sized: bool = False
+    #: the received frame before the protocol was stripped, e.g. with the CRCs of an i2c response; None if the
+    #: channel does not pass it, e.g. the ShdlcChannel, whose port strips the protocol
+    raw_rx_data: Optional[bytes] = None
+
+
+class ChannelLogWriter:
+    """
+    Appends ChannelLogRecords to a binary log.
+
+    The log starts with the MAGIC bytes and contains the records back to back. Each record consists of a fixed size
+    header (see RECORD_HEADER) followed by the transmitted bytes, the received bytes, the utf-8 encoded error
+    message and the raw received frame. A record that is only partially written, e.g. because the process was
+    killed, is ignored by the reader.
+    """
+
+    MAGIC = b'SDALOG02'
+    # flags, payload offset, slave address (-1 for None), start time, duration, device busy delay,
+    # post processing delay (NaN for None), length of the tx data, the rx data, the error message and the raw rx data
+    RECORD_HEADER = struct.Struct('<BBhdfffHHHH')
+    FLAG_RESPONSE = 0x01
+    FLAG_ERROR = 0x02
+    FLAG_DYNAMIC_SIZED = 0x04
+    FLAG_RAW_RESPONSE = 0x08
+
+    def __init__(self, file: Union[str, BinaryIO], flush: bool = False) -> None:
+        """
+        :param file:
+            The path of the log or a binary file object that is opened for appending.
+        :param flush:
+            Flush the file after every record.
+        """
+        self._file: BinaryIO = open(file, 'ab') if isinstance(file, str) else file
+        self._owns_file = isinstance(file, str)
+        self._flush = flush
+        self._lock = threading.Lock()
+        if self._file.tell() == 0:
+            self._file.write(self.MAGIC)
+
+    def write(self, record: ChannelLogRecord) -> None:
+        flags = ((self.FLAG_RESPONSE if record.rx_data is not None else 0) |
+                 (self.FLAG_ERROR if record.error is not None else 0) |
+                 (self.FLAG_DYNAMIC_SIZED if record.dynamic_sized else 0) |
+                 (self.FLAG_RAW_RESPONSE if record.raw_rx_data is not None else 0))
+        rx_data = record.rx_data if record.rx_data is not None else b''
+        error = record.error.encode('utf-8') if record.error is not None else b''
+        raw_rx_data = record.raw_rx_data if record.raw_rx_data is not None else b''
+        header = self.RECORD_HEADER.pack(
+            flags, record.payload_offset, record.slave_address if record.slave_address is not None else -1,
+            record.start_time, record.duration, record.device_busy_delay,
+            record.post_processing_delay if record.post_processing_delay is not None else math.nan,
+            len(record.tx_bytes), len(rx_data), len(error), len(raw_rx_data))
+        with self._lock:
+            self._file.write(b''.join((header, record.tx_bytes, rx_data, error, raw_rx_data)))
+            if self._flush:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+
+    def __enter__(self) -> "ChannelLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def read_channel_log(file: Union[str, BinaryIO]) -> Iterator[ChannelLogRecord]:
+    """
+    Read the records of a channel log.
+
+    :param file:
+        The path of the log or a binary file object.
+    :return:
+        An iterator over the records.
+    :raise ValueError:
+        If the file is not a channel log.
+    """
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            yield from read_channel_log(f)
+        return
+    if file.read(len(ChannelLogWriter.MAGIC)) != ChannelLogWriter.MAGIC:
+        raise ValueError("Not a channel log")
+    header_struct = ChannelLogWriter.RECORD_HEADER
+    while True:
+        header = file.read(header_struct.size)
+        if len(header) < header_struct.size:
+            return
+        flags, payload_offset, slave_address, start_time, duration, device_busy_delay, post_processing_delay, \
+            tx_length, rx_length, error_length, raw_rx_length = header_struct.unpack(header)
+        body = file.read(tx_length + rx_length + error_length + raw_rx_length)
+        if len(body) < tx_length + rx_length + error_length + raw_rx_length:
+            return
+        error_end = tx_length + rx_length + error_length
+        error = body[tx_length + rx_length:error_end].decode('utf-8') if flags & ChannelLogWriter.FLAG_ERROR else None
+        yield ChannelLogRecord(tx_bytes=body[:tx_length],
+                               payload_offset=payload_offset,
+                               rx_data=body[tx_length:tx_length + rx_length]
+                               if flags & ChannelLogWriter.FLAG_RESPONSE else None,
+                               slave_address=slave_address if slave_address >= 0 else None,
+                               start_time=start_time,
+                               duration=duration,
+                               device_busy_delay=device_busy_delay,
+                               post_processing_delay=None if math.isnan(post_processing_delay)
+                               else post_processing_delay,
+                               error=error,
+                               dynamic_sized=bool(flags & ChannelLogWriter.FLAG_DYNAMIC_SIZED),
+                               raw_rx_data=body[error_end:]
+                               if flags & ChannelLogWriter.FLAG_RAW_RESPONSE else None)
+
+
+class _RecordingResponse:
+    """Passes the data that is unpacked to the RxData and keeps a copy of it and of the received frame."""
+
+    def __init__(self, response: RxData) -> None:
+        self._response = response
+        self.data: Optional[bytes] = None
+        self.raw_data: Optional[bytes] = None
+        self.dynamic_sized = False
+
+    def record_frame(self, data):
+        """Called by the TxRxRequest with the received frame, before the protocol is stripped"""
+        self.raw_data = bytes(data) if data is not None else None
+
+    def unpack(self, data):
+        self.data = bytes(data)
+        return self._response.unpack(data)
+
+    def unpack_dynamic_sized(self, data):
+        self.data = bytes(data)
+        self.dynamic_sized = True
+        return self._response.unpack_dynamic_sized(data)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class RecordingChannel(TxRxChannel):
+    """
+    Channel that passes all transfers to another channel and writes them to a channel log.
+
+    The log contains the transmitted bytes, the received data, the timings and the errors of every write_read. The
+    received data is stored as it was unpacked and, if the wrapped channel passes it (as the I2cChannel does), as the
+    raw frame with the protocol, including frames whose CRC check failed. The log can be replayed with the
+    ReplayChannel or with the ReplayResponse of a sensor mock.
+    """
+
+    def __init__(self, channel: TxRxChannel, log: Union[str, BinaryIO, ChannelLogWriter],
+                 clock: Optional[Clock] = None) -> None:
+        """
+        :param channel:
+            The channel that executes the transfers.
+        :param log:
+            The ChannelLogWriter, or the path or binary file of the log to which the records are appended.
+        :param clock:
+            The clock that measures the timings, by default the system clock.
+        """
+        self._channel = channel
+        self._log = log if isinstance(log, ChannelLogWriter) else ChannelLogWriter(log)
+        self._clock = clock if clock is not None else system_clock
+
+    @property
+    def channel(self) -> TxRxChannel:
+        return self._channel
+
+    def write_read(self, tx_bytes: Iterable, payload_offset: int,
+                   response: RxData,
+                   device_busy_delay: float = 0.0,
+                   post_processing_delay: Optional[float] = None,
+                   slave_address: Optional[int] = None,
+                   ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
+        """Transfers the data to and from sensor with the wrapped channel and records the transfer."""
+        request = WriteReadRequest(tx_bytes, payload_offset, response, device_busy_delay, post_processing_delay,
+                                   slave_address, ignore_errors)
+        return self.write_read_batch((request,))[0]
+
+    def write_read_batch(self, requests: Sequence[WriteReadRequest]) -> Tuple[Optional[Tuple[Any, ...]], ...]:
+        """
+        Transfers the requests with write_read_batch of the wrapped channel, such that the channel can still combine
+        them. The records of a batch get the duration of the whole batch.
+
+        If the batch fails, the error is recorded for the first request that is not known to have succeeded: the
+        request after the last received response, or an earlier request that did not get its response. The later
+        requests are recorded only if they got their response, since the others were probably not executed.
+        """
+        recorders = [_RecordingResponse(request.response) if request.response is not None else None
+                     for request in requests]
+        start = self._clock.monotonic()
+        error = None
+        try:
+            return self._channel.write_read_batch(tuple(request._replace(response=recorder)
+                                                        for request, recorder in zip(requests, recorders)))
+        except Exception as exception:
+            error = f'{type(exception).__name__}: {exception}'
+            raise
+        finally:
+            duration = self._clock.monotonic() - start
+            answered = [recorder is not None and recorder.data is not None for recorder in recorders]
+            failed_index = len(requests)
+            if error is not None and requests:
+                failed_index = self._failed_index(recorders, answered)
+            for index, (request, recorder, has_data) in enumerate(zip(requests, recorders, answered)):
+                if index > failed_index and not has_data:
+                    continue
+                self._log.write(ChannelLogRecord(
+                    tx_bytes=bytes(request.tx_bytes) if request.tx_bytes is not None else b'',
+                    payload_offset=request.payload_offset,
+                    rx_data=recorder.data if has_data else None,
+                    slave_address=request.slave_address,
+                    start_time=start,
+                    duration=duration,
+                    device_busy_delay=request.device_busy_delay,
+                    post_processing_delay=request.post_processing_delay,
+                    error=error if index == failed_index else None,
+                    dynamic_sized=has_data and recorder.dynamic_sized,
+                    raw_rx_data=recorder.raw_data if recorder is not None else None))
+
+    @staticmethod
+    def _failed_index(recorders, answered) -> int:
+        candidates = [len(recorders) - 1]
+        candidates.extend(index for index, has_data in enumerate(answered)
+                          if recorders[index] is not None and not has_data)
+        last_answered = max((index for index, has_data in enumerate(answered) if has_data), default=-1)
+        candidates.append(last_answered + 1)
+        return min(candidates)
+
+    def strip_protocol(self, data):
+        return self._channel.strip_protocol(data)
+
+    @property
+    def timeout(self) -> float:
+        return self._channel.timeout
+
+    def close(self) -> None:
+        """Close the log"""
+        self._log.close()
+
+    def __enter__(self) -> "RecordingChannel":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class ReplayError(Exception):
+    """Raised by the ReplayChannel for a recorded error or if there is no record for a request."""
+
+
+class ReplayChannel(TxRxChannel):
+    """
+    Channel that serves the responses of a channel log without any delay.
+
+    Each request gets the next recorded response with the same slave address and transmitted bytes. Responses are
+    unpacked with the RxData of the request, so the decoding is executed as with a real channel. If a protocol
+    channel is given, the recorded raw frames are passed through its strip_protocol, such that the CRCs are checked
+    and a CRC error of the recording is raised again. Other recorded errors are raised as ReplayError, unless the
+    request ignores errors.
+    """
+
+    def __init__(self, records: Union[str, BinaryIO, Iterable[ChannelLogRecord]], loop: bool = True,
+                 protocol: Optional[TxRxChannel] = None) -> None:
+        """
+        :param records:
+            The records, or the path or binary file of a channel log.
+        :param loop:
+            Start over with the first matching record, when all matching records have been used. Otherwise, a
+            ReplayError is raised.
+        :param protocol:
+            The channel whose strip_protocol is applied to the raw frames, e.g. an I2cChannel with the CRC parameters
+            of the recorded sensor. It is not used for any transfer. Without it, the recorded stripped data is
+            unpacked.
+        """
+        if isinstance(records, str) or hasattr(records, 'read'):
+            records = read_channel_log(records)
+        self._loop = loop
+        self._protocol = protocol
+        self._records: Dict[Tuple[Optional[int], bytes], List[ChannelLogRecord]] = {}
+        self._queues: Dict[Tuple[Optional[int], bytes], Deque[ChannelLogRecord]] = {}
+        for record in records:
+            self._records.setdefault((record.slave_address, record.tx_bytes), []).append(record)
+        self._lock = threading.Lock()
+
+    def next_record(self, tx_bytes: bytes, slave_address: Optional[int] = None) -> ChannelLogRecord:
+        """
+        Return the next record for a request.
+
+        :raise ReplayError:
+            If there is no (more) record for the request.
+        """
+        key = (slave_address, tx_bytes)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                records = self._records.get(key)
+                if records is None or (queue is not None and not self._loop):
+                    raise ReplayError(f"No recorded response for {tx_bytes.hex()} to address {slave_address}")
+                queue = self._queues[key] = deque(records)
+            return queue.popleft()
+
+    def write_read(self, tx_bytes: Iterable, payload_offset: int,
+                   response: RxData,
+                   device_busy_delay: float = 0.0,
+                   post_processing_delay: Optional[float] = None,
+                   slave_address: Optional[int] = None,
+                   ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
+        """Return the recorded response"""
+        record = self.next_record(bytes(tx_bytes) if tx_bytes is not None else b'', slave_address)
+        try:
+            rx_data = record.rx_data
+            if self._protocol is not None and record.raw_rx_data is not None:
+                rx_data = self._protocol.strip_protocol(record.raw_rx_data)
+            if record.error is not None:
+                raise ReplayError(record.error)
+        except Exception:
+            if ignore_errors:
+                return None
+            raise
+        if response is None or rx_data is None:
+            return None
+        if record.dynamic_sized:
+            return response.unpack_dynamic_sized(rx_data)
+        return response.unpack(rx_data)
+
+    def strip_protocol(self, data):
+        """Strip the protocol with the protocol channel; without it, the data is returned as is"""
+        if self._protocol is not None:
+            return self._protocol.strip_protocol(data)
+        return data
+
+    @property
+    def timeout(self) -> float:
+        return 0.0
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
+import array
+import itertools
 import logging
 import re
 import struct
 from functools import reduce
-from typing import Iterable
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from circuitpython_sensirion_driver_adapters import lazy_import
 
 log = logging.getLogger(__name__)
 
@@ -30,6 +34,7 @@ class TxData:
         if descriptor.startswith('>B'):
             self._command_width = 1
         self._descriptor = descriptor
+        self._struct = struct.Struct(descriptor)
         self._slave_address = slave_address
         self._device_busy_delay = device_busy_delay
         self._ignore_acknowledge = ignore_ack
@@ -42,15 +47,30 @@ class TxData:
         self._string_len = int(string_fields[0][0])
 
     def pack(self, argument_list=[]):
-        data_to_pack = [self._cmd_id]
-        for arg in argument_list:
-            if isinstance(arg, str):
-                data_to_pack.append(self._string_to_bytes(arg))
-            elif isinstance(arg, (list, tuple)):
-                data_to_pack.extend(arg)
-            else:
-                data_to_pack.append(arg)
-        return bytearray(struct.pack(self._descriptor, *data_to_pack))
+        data = bytearray(self._struct.size)
+        self._struct.pack_into(data, 0, *self._values_to_pack(argument_list))
+        return data
+
+    def pack_into(self, buffer, offset=0, argument_list=[]) -> int:
+        """
+        Pack command and arguments directly into a writable buffer.
+
+        :param buffer:
+            A writable buffer like a bytearray or a memoryview. It must provide at least size bytes after offset.
+        :param offset:
+            The position in the buffer where the command starts.
+        :param argument_list:
+            The arguments of the command, as for pack.
+        :return:
+            The number of bytes written.
+        """
+        self._struct.pack_into(buffer, offset, *self._values_to_pack(argument_list))
+        return self._struct.size
+
+    @property
+    def size(self) -> int:
+        """Number of bytes of the packed command including the arguments"""
+        return self._struct.size
 
     @property
     def command_width(self):
@@ -68,6 +88,17 @@ class TxData:
     def ignore_acknowledge(self):
         return self._ignore_acknowledge
 
+    def _values_to_pack(self, argument_list):
+        data_to_pack = [self._cmd_id]
+        for arg in argument_list:
+            if isinstance(arg, str):
+                data_to_pack.append(self._string_to_bytes(arg))
+            elif isinstance(arg, (list, tuple)):
+                data_to_pack.extend(arg)
+            else:
+                data_to_pack.append(arg)
+        return data_to_pack
+
     def _string_to_bytes(self, string_param):
         assert self._string_len > 0, "Invalid string descriptor"
         if len(string_param) > self._string_len:
@@ -76,11 +107,29 @@ class TxData:
         return string_param.encode()
 
 
+class RxField(NamedTuple):
+    """Precompiled unpack instruction for one array field or a run of consecutive scalar fields of a rx descriptor."""
+    offset: int
+    unpacker: struct.Struct
+    type_code: str
+    elem_size: int
+    count: int
+    is_array: bool
+    is_string: bool
+
+    @property
+    def size(self) -> int:
+        return self.elem_size * self.count
+
+
 class RxData:
     """Descriptor for data to be received"""
 
     field_match = re.compile(r'(?P<length>\d*)(?P<descriptor>(h|H|b|B|i|I|\?|s|q|Q|f|d))')
     element_size_map = {'B': 8, 'I': 32, 'H': 16}
+    # array.array does not know the type code of bool
+    array_type_map = {'?': 'B'}
+    numpy_byte_order_map = {'>': '>', '!': '>', '<': '<', '=': '=', '@': '='}
 
     def __init__(self, descriptor=None, convert_to_int=False):
         self._descriptor = descriptor
@@ -89,17 +138,72 @@ class RxData:
         if self._descriptor is None:
             return
         self._rx_length = struct.calcsize(self._descriptor)
-        self._contains_array = RxData.field_match.search(descriptor) is not None
+        self._byte_order = descriptor[0]
+        self._plan: Tuple[RxField, ...] = self.compile_plan(descriptor)
+        self._contains_array = any(field.is_array for field in self._plan)
+        self._struct = struct.Struct(descriptor)
         self._convert_to_int = convert_to_int
 
     @property
     def rx_length(self):
         return self._rx_length
 
+    @property
+    def plan(self) -> Tuple[RxField, ...]:
+        return self._plan
+
+    @classmethod
+    def compile_plan(cls, descriptor: str) -> Tuple[RxField, ...]:
+        """
+        Translate a descriptor into an immutable list of unpack instructions.
+
+        Consecutive scalar fields are merged into one instruction with a single struct.Struct object. Each field
+        with a length specifier (array or string) gets an instruction of its own, since the number of
+        elements that are actually received may be smaller than the upper bound given in the descriptor.
+        With native alignment ('@'), every field starts at a multiple of its element size and the scalar fields are
+        not merged, since the padding depends on their absolute position.
+        """
+        byte_order = descriptor[0]
+        native = byte_order == '@'
+        plan = []
+        descriptor_pos, data_pos = 1, 0
+        scalar_codes, scalar_offset = '', 0
+
+        def flush_scalars():
+            if scalar_codes:
+                unpacker = struct.Struct(f'{byte_order}{scalar_codes}')
+                plan.append(RxField(scalar_offset, unpacker, scalar_codes, unpacker.size, 1, False, False))
+
+        match = cls.field_match.match(descriptor, descriptor_pos)
+        while match:
+            type_code = match.group('descriptor')
+            length = match.group('length')
+            descriptor_pos = match.end()
+            elem_size = struct.calcsize(f'{byte_order}{type_code}')
+            if native:
+                flush_scalars()
+                scalar_codes = ''
+                data_pos = -(-data_pos // elem_size) * elem_size
+            if length:
+                flush_scalars()
+                scalar_codes = ''
+                count = int(length)
+                plan.append(RxField(data_pos, struct.Struct(f'{byte_order}{count}{type_code}'), type_code,
+                                    elem_size, count, True, type_code == 's'))
+                data_pos += elem_size * count
+            else:
+                if not scalar_codes:
+                    scalar_offset = data_pos
+                scalar_codes += type_code
+                data_pos += elem_size
+            match = cls.field_match.match(descriptor, descriptor_pos)
+        flush_scalars()
+        return tuple(plan)
+
     def unpack(self, data):
         if self._contains_array:
             return self.unpack_dynamic_sized(data)
-        return struct.unpack(self._descriptor, data)
+        return self._struct.unpack_from(data)
 
     def unpack_dynamic_sized(self, data):
         """
@@ -112,33 +216,143 @@ class RxData:
             descriptor in the form I8b would be unpacked as a tuple with 9 values but the driver would expect only
             two return values, an integer and an array containing the 8 bytes.
         """
-        byte_order_specifier = self._descriptor[0]
-        descriptor_pos, data_pos = 1, 0
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
         unpacked = []
-        match = self.field_match.match(self._descriptor, descriptor_pos)
-        while match:
-            descriptor = match.group('descriptor')
-            elem_size = struct.calcsize(descriptor)
-            elem_bit_width = elem_size * 8
-            length = match.group('length')
-            descriptor_pos += len(length) + len(descriptor)
-            if length:
-                field_len = 0
-                is_string = descriptor == 's'
-                for i in range(data_pos, min(data_pos + elem_size * int(length), len(data))):
-                    if data[i] == 0 and is_string:  # in SHDLC we have 0 delimeted arrays
-                        break
-                    field_len += 1
-                descriptor = f'{byte_order_specifier}{field_len // elem_size}{descriptor}'
-                val = struct.unpack_from(descriptor, data, data_pos)
-                if self._convert_to_int:
-                    val = array_to_integer(elem_bit_width, val)
-                elif is_string:  # a string
-                    val = val[0].decode()
-                unpacked.append(val)
+        for field in self._plan:
+            if not field.is_array:
+                unpacked.extend(field.unpacker.unpack_from(data, field.offset))
+                continue
+            # the received data may be shorter than the upper bound given in the descriptor
+            end = min(field.offset + field.size, len(data))
+            if field.is_string:
+                terminator = data.find(0, field.offset, end)  # in SHDLC we have 0 delimited arrays
+                if terminator >= 0:
+                    end = terminator
+            count = max(end - field.offset, 0) // field.elem_size
+            if count == field.count:
+                val = field.unpacker.unpack_from(data, field.offset)
             else:
-                descriptor = f"{byte_order_specifier} {descriptor}"
-                unpacked.extend(struct.unpack_from(descriptor, data, data_pos))
-            data_pos += elem_size
-            match = self.field_match.match(self._descriptor, descriptor_pos)
+                val = struct.unpack_from(f'{self._byte_order}{count}{field.type_code}', data, field.offset)
+            if self._convert_to_int:
+                val = array_to_integer(field.elem_size * 8, val)
+            elif field.is_string:
+                val = val[0].decode()
+            unpacked.append(val)
         return tuple(unpacked)
+
+    def unpack_many(self, data, count: Optional[int] = None, use_numpy: Optional[bool] = None) -> Tuple:
+        """
+        Unpacks many consecutive frames of the same format into one column per value.
+
+        This is meant for large amounts of data like log replays and FIFO reads, where a tuple per frame would be
+        too expensive. All frames must have the full size given by the descriptor.
+
+        The columns are in the same order as the values returned by unpack:
+            - scalar fields become an array.array or a one dimensional numpy array
+            - array fields become a flat array.array resp. a one dimensional numpy array with the elements of all
+              frames in a row, i.e. the elements of frame i are at [i * n:(i + 1) * n] for an array of n elements
+            - string fields become a list of str, single character fields ('s' without length) a list of bytes
+            - if convert_to_int is set, array fields become an array.array('Q') resp. a numpy uint64 array if the
+              integers fit in 64 bits, a list of int otherwise
+
+        :param data:
+            A bytes-like object with the raw frames.
+        :param count:
+            The number of frames to unpack. By default all complete frames of data are unpacked.
+        :param use_numpy:
+            Return numpy arrays. By default numpy is used if it is available.
+        :return:
+            A tuple of columns
+        :raise ValueError:
+            If the descriptor is empty or data contains less than count frames.
+        """
+        if not self._rx_length:
+            raise ValueError("an empty descriptor has no frames to unpack")
+        frame_count = len(data) // self._rx_length
+        if count is None:
+            count = frame_count
+        elif count > frame_count:
+            raise ValueError(f"data contains only {frame_count} frames, not {count}")
+        frames = memoryview(data).cast('B')[:count * self._rx_length]
+        if use_numpy is None:
+            use_numpy = lazy_import.numpy() is not None
+        if use_numpy:
+            return self._unpack_many_numpy(frames, count)
+        columns = []
+        for field in self._plan:
+            if not field.is_array:
+                offset = field.offset
+                for code in field.type_code:
+                    size = struct.calcsize(f'{self._byte_order}{code}')
+                    rows = self._field_struct(offset, code, size).iter_unpack(frames)
+                    if code == 's':
+                        columns.append([row[0] for row in rows])
+                    else:
+                        code = self.array_type_map.get(code, code)
+                        columns.append(array.array(code, itertools.chain.from_iterable(rows)))
+                    offset += size
+                continue
+            rows = self._field_struct(field.offset, f'{field.count}{field.type_code}', field.size).iter_unpack(frames)
+            if field.is_string:
+                columns.append([row[0].split(b'\0', 1)[0].decode() for row in rows])
+            elif self._convert_to_int:
+                integers = (array_to_integer(field.elem_size * 8, row) for row in rows)
+                columns.append(array.array('Q', integers) if field.size <= 8 else list(integers))
+            else:
+                code = self.array_type_map.get(field.type_code, field.type_code)
+                columns.append(array.array(code, itertools.chain.from_iterable(rows)))
+        return tuple(columns)
+
+    def _field_struct(self, offset: int, codes: str, size: int) -> struct.Struct:
+        """Struct that unpacks one field of a frame; all other bytes of the frame are skipped as pad bytes."""
+        return struct.Struct(f'{self._byte_order}{offset}x{codes}{self._rx_length - offset - size}x')
+
+    def _unpack_many_numpy(self, frames, count: int) -> Tuple:
+        np = lazy_import.numpy()
+        byte_order = self.numpy_byte_order_map[self._byte_order]
+        names, formats, offsets, outputs = [], [], [], []
+        for field in self._plan:
+            if field.is_string:
+                formats.append(f'S{field.count}')
+                offsets.append(field.offset)
+            elif field.is_array:
+                formats.append((f'{byte_order}{field.type_code}', (field.count,)))
+                offsets.append(field.offset)
+            else:
+                offset = field.offset
+                for code in field.type_code:
+                    names.append(f'f{len(names)}')
+                    # numpy strips trailing zeros of strings, hence single characters are read as bytes
+                    formats.append('u1' if code == 's' else f'{byte_order}{code}')
+                    offsets.append(offset)
+                    outputs.append((field, code))
+                    offset += struct.calcsize(f'{self._byte_order}{code}')
+                continue
+            names.append(f'f{len(names)}')
+            outputs.append((field, field.type_code))
+        dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self._rx_length})
+        records = np.frombuffer(frames, dtype=dtype, count=count)
+        columns = []
+        for name, (field, code) in zip(names, outputs):
+            column = records[name]
+            if field.is_string:
+                column = [val.decode() for val in column.tolist()]
+            elif code == 's':
+                column = [bytes((val,)) for val in column.tolist()]
+            elif field.is_array and self._convert_to_int:
+                column = self._column_to_integer(column, field)
+            else:
+                # copy to a contiguous array in native byte order, array fields are flattened as by array.array
+                column = column.astype(column.dtype.newbyteorder('=')).reshape(-1)
+            columns.append(column)
+        return tuple(columns)
+
+    @staticmethod
+    def _column_to_integer(column, field: RxField):
+        if field.size > 8:
+            return [array_to_integer(field.elem_size * 8, row) for row in column.tolist()]
+        np = lazy_import.numpy()
+        shifts = np.arange(field.count - 1, -1, -1, dtype=np.uint64) * np.uint64(field.elem_size * 8)
+        mask = np.uint64((1 << (field.elem_size * 8)) - 1)
+        return np.bitwise_or.reduce((column.astype(np.uint64) & mask) << shifts, axis=1)
@@ -3,15 +3,20 @@
 import abc
 import logging
 import struct
-import time
-from typing import Any, Iterable, Optional, Tuple, Union
+from functools import partial
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Tuple, Union
 
 from sensirion_shdlc_driver.errors import ShdlcDeviceError, ShdlcResponseError
 from sensirion_shdlc_driver.port import ShdlcPort
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel, DeviceBusyTracker, TxRxChannel
+from circuitpython_sensirion_driver_adapters.clock import Clock
+from circuitpython_sensirion_driver_adapters.instrumentation import TransferEvent, command_id
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
 
+if TYPE_CHECKING:
+    import asyncio
+
 log = logging.getLogger(__name__)
 
 
@@ -55,14 +60,36 @@ class ShdlcPortWrapper(ShdlcTransceiver):
 
 
 class ShdlcChannel(TxRxChannel):
+    """
+    Channel to a device with SHDLC interface.
+
+    The post processing delay of a command is not slept after the command. The channel records until when the device
+    is busy and the next command to the same device waits for the remaining time only.
+    """
 
     def __init__(self, transceiver: Union[ShdlcTransceiver, ShdlcPort],
-                 channel_delay: float = 0.05, shdlc_address: int = 0) -> None:
+                 channel_delay: float = 0.05, shdlc_address: int = 0,
+                 busy_tracker: Optional[DeviceBusyTracker] = None,
+                 clock: Optional[Clock] = None) -> None:
+        """
+        :param transceiver:
+            The transceiver or the ShdlcPort that is used to talk to the device.
+        :param channel_delay:
+            The minimal response timeout. Time unit: seconds
+        :param shdlc_address:
+            The default shdlc address of the device.
+        :param busy_tracker:
+            Keeps track of the post processing delays. Channels that talk to the same devices may share a tracker.
+        :param clock:
+            The clock that measures the post processing delays, if no busy_tracker is given. By default the system
+            clock is used.
+        """
 
         # needed for backwards compatibility
         self._port: ShdlcTransceiver = self._make_transceiver(transceiver)
         self._channel_delay = channel_delay
         self._address = shdlc_address
+        self._busy = busy_tracker if busy_tracker is not None else DeviceBusyTracker(clock)
 
     def write_read(self, tx_bytes: Iterable, payload_offset: int,
                    response: RxData,
@@ -85,7 +112,8 @@ class ShdlcChannel(TxRxChannel):
             Indication how long the receiver of the message will be busy until processing of the data has been
             completed.
         :param post_processing_delay:
-            This is the time one has to wait for until the next communication with the device can take place.
+            This is the time one has to wait for until the next communication with the device can take place. The
+            wait is deferred to the next command to the same device.
         :param slave_address:
             Used for shdlc address
         :param ignore_errors:
@@ -94,7 +122,72 @@ class ShdlcChannel(TxRxChannel):
         :return:
             Return a tuple of the interpreted data or None if there is no response at all
         """
-        shdlc_address = slave_address or self._address
+        if self.instrumentation is not None:
+            return self._write_read_instrumented(tx_bytes, payload_offset, response, device_busy_delay,
+                                                 post_processing_delay, slave_address)
+        shdlc_address = self._address if slave_address is None else slave_address
+        self._busy.wait_until_ready(shdlc_address)
+        try:
+            rx_data = self._transceive(tx_bytes, payload_offset, response, device_busy_delay, shdlc_address)
+            if response:
+                # The size of strings (and arrays?) is not known before receiving the response. The indications
+                # in the rx descriptor are only the upper bounds. Therefore, each field is unpacked individually
+                # and the position in the result frame is computed online.
+                rx_data = response.unpack_dynamic_sized(rx_data)
+        finally:
+            # the device does its post processing even if the transfer failed
+            self._busy.set_busy(shdlc_address, post_processing_delay)
+        return rx_data
+
+    def _write_read_instrumented(self, tx_bytes, payload_offset, response, device_busy_delay,
+                                 post_processing_delay, slave_address):
+        """
+        Same as write_read, but the phases of the transfer are measured. The busy wait time is the wait for the post
+        processing of the previous command; the time the device needs for the command itself is part of the bus time,
+        since the device answers only when it is done. The checksums are handled by the transceiver, hence they count
+        as bus time as well.
+        """
+        instrumentation = self.instrumentation
+        timer = instrumentation.timer
+        shdlc_address = self._address if slave_address is None else slave_address
+        start = timer()
+        self._busy.wait_until_ready(shdlc_address)
+        busy_wait_time = timer() - start
+        unpack_time = 0.0
+        error_type = None
+        rx_length = 0
+        try:
+            rx_data = self._transceive(tx_bytes, payload_offset, response, device_busy_delay, shdlc_address)
+            rx_length = len(rx_data) if rx_data is not None else 0
+            if response:
+                unpack_start = timer()
+                try:
+                    rx_data = response.unpack_dynamic_sized(rx_data)
+                finally:
+                    unpack_time = timer() - unpack_start
+        except Exception as error:
+            error_type = type(error).__name__
+            raise
+        finally:
+            self._busy.set_busy(shdlc_address, post_processing_delay)
+            total_time = timer() - start
+            instrumentation.emit(TransferEvent(channel=self,
+                                               command_id=command_id(tx_bytes, payload_offset),
+                                               slave_address=shdlc_address,
+                                               tx_bytes=len(tx_bytes),
+                                               rx_bytes=rx_length,
+                                               start_time=start,
+                                               total_time=total_time,
+                                               bus_time=max(0.0, total_time - busy_wait_time - unpack_time),
+                                               busy_wait_time=busy_wait_time,
+                                               crc_time=0.0,
+                                               unpack_time=unpack_time,
+                                               error_type=error_type))
+        return rx_data
+
+    def _transceive(self, tx_bytes, payload_offset: int, response: Optional[RxData], device_busy_delay: float,
+                    shdlc_address: int) -> bytes:
+        """Send the command and check the header of the response. The received data is returned as is."""
         cmd_id = struct.unpack('>B', tx_bytes[0:payload_offset])[0]
         data = tx_bytes[payload_offset:]
         timeout = max(self._channel_delay, device_busy_delay)
@@ -118,13 +211,6 @@ class ShdlcChannel(TxRxChannel):
             log.warning("SHDLC device with address {} returned error {}."
                         .format(shdlc_address, error_code))
             raise ShdlcDeviceError(error_code)  # Command failed to execute
-        if response:
-            # The size of strings (and arrays?) is not known before receiving the response. The indications
-            # in the rx descriptor are only the upper bounds. Therefore, each field is unpacked individually
-            # and the position in the result frame is computed online.
-            rx_data = response.unpack_dynamic_sized(rx_data)
-        if post_processing_delay is not None:
-            time.sleep(post_processing_delay)
         return rx_data
 
     def strip_protocol(self, data) -> None:
@@ -135,8 +221,68 @@ class ShdlcChannel(TxRxChannel):
     def timeout(self) -> float:
         return self._channel_delay
 
+    @property
+    def busy_tracker(self) -> DeviceBusyTracker:
+        return self._busy
+
+    @property
+    def address(self) -> int:
+        return self._address
+
     @staticmethod
     def _make_transceiver(transceiver: Union[ShdlcTransceiver, ShdlcPort]) -> ShdlcTransceiver:
         if isinstance(transceiver, ShdlcTransceiver):
             return transceiver
         return ShdlcPortWrapper(transceiver)
+
+
+class AsyncShdlcChannel(AsyncTxRxChannel):
+    """
+    This is the asyncio counterpart of the ShdlcChannel.
+
+    The SHDLC transceivers block until the response is received. Therefore, the transceive is executed in an executor
+    and only the post processing delay is awaited with asyncio.sleep, when the next command is sent to the device. The
+    transfers over one channel are serialized. With a VirtualClock, the delays of concurrent channels add up, see
+    VirtualClock.sleep_async.
+    """
+
+    def __init__(self, transceiver: Union[ShdlcTransceiver, ShdlcPort],
+                 channel_delay: float = 0.05, shdlc_address: int = 0,
+                 busy_tracker: Optional[DeviceBusyTracker] = None,
+                 clock: Optional[Clock] = None) -> None:
+        self._channel = ShdlcChannel(transceiver, channel_delay=channel_delay, shdlc_address=shdlc_address,
+                                     busy_tracker=busy_tracker, clock=clock)
+        self._lock: Optional["asyncio.Lock"] = None
+
+    async def write_read(self, tx_bytes: Iterable, payload_offset: int,
+                         response: RxData,
+                         device_busy_delay: float = 0.0,
+                         post_processing_delay: Optional[float] = None,
+                         slave_address: Optional[int] = None,
+                         ignore_errors: bool = False) -> Optional[Tuple[Any, ...]]:
+        """Transfers the data to and from sensor. See ShdlcChannel.write_read"""
+        # asyncio is imported only here, since it is costly to import and not needed by synchronous applications
+        import asyncio
+        if self._lock is None:
+            self._lock = asyncio.Lock()  # the lock must be created within the event loop
+        shdlc_address = self._channel.address if slave_address is None else slave_address
+        busy_tracker = self._channel.busy_tracker
+        async with self._lock:
+            await busy_tracker.wait_until_ready_async(shdlc_address)
+            transfer = partial(self._channel.write_read, tx_bytes, payload_offset, response,
+                               device_busy_delay=device_busy_delay,
+                               slave_address=slave_address,
+                               ignore_errors=ignore_errors)
+            try:
+                rx_data = await asyncio.get_event_loop().run_in_executor(None, transfer)
+            finally:
+                busy_tracker.set_busy(shdlc_address, post_processing_delay)
+        return rx_data
+
+    def strip_protocol(self, data) -> None:
+        """The protocol is already stripped by the connection"""
+        return data
+
+    @property
+    def timeout(self) -> float:
+        return self._channel.timeout
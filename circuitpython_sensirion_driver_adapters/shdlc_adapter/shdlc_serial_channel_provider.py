@@ -5,8 +5,10 @@ from typing import Optional
 
 from sensirion_shdlc_driver.port import ShdlcSerialPort
 
+from circuitpython_sensirion_driver_adapters.channel import DeviceBusyTracker
 from circuitpython_sensirion_driver_adapters.channel_provider import ShdlcChannelProvider
-from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import ShdlcPortWrapper, ShdlcChannel
+from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import AsyncShdlcChannel, ShdlcPortWrapper, \
+    ShdlcChannel
 
 
 class ShdlcSerialPortChannelProvider(ShdlcChannelProvider):
@@ -27,6 +29,8 @@ class ShdlcSerialPortChannelProvider(ShdlcChannelProvider):
         self.serial_port = serial_port
         self.serial_baud_rate = serial_baud_rate
         self._shdlc_port: Optional[ShdlcSerialPort] = None
+        # all channels talk to the devices on the same serial port
+        self._busy_tracker = DeviceBusyTracker()
 
     def release_channel_resources(self):
         """
@@ -52,4 +56,11 @@ class ShdlcSerialPortChannelProvider(ShdlcChannelProvider):
 
         """
         assert self._shdlc_port is not None, "Port not initialized!"
-        return ShdlcChannel(ShdlcPortWrapper(self._shdlc_port), channel_delay=channel_delay)
+        return ShdlcChannel(ShdlcPortWrapper(self._shdlc_port), channel_delay=channel_delay,
+                            busy_tracker=self._busy_tracker)
+
+    def get_async_channel(self, channel_delay: float) -> AsyncShdlcChannel:
+        """Create and return an initialized asyncio channel based on an ShdlcSerialPort."""
+        assert self._shdlc_port is not None, "Port not initialized!"
+        return AsyncShdlcChannel(ShdlcPortWrapper(self._shdlc_port), channel_delay=channel_delay,
+                                 busy_tracker=self._busy_tracker)
@@ -3,14 +3,100 @@
 from __future__ import absolute_import, division, print_function
 
 import abc
-from typing import Optional
+from typing import Any, ClassVar, Iterable, Optional, Tuple
 
-from circuitpython_sensirion_driver_adapters.channel import TxRxChannel
+from circuitpython_sensirion_driver_adapters.channel import AsyncTxRxChannel, TxRxChannel, WriteReadRequest
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
 
 
-class Transfer(abc.ABC):
-    """A transfer abstracts the data that is exchanged between host and sensor"""
+class TransferMetadata:
+    """The properties of a transfer that are needed to execute it."""
+
+    __slots__ = ('tx_data', 'rx_data', 'command_width', 'device_busy_delay', 'post_processing_delay',
+                 'slave_address', 'ignore_error')
+
+    def __init__(self, tx_data: Optional[TxData],
+                 rx_data: Optional[RxData],
+                 post_processing_delay: Optional[float]) -> None:
+        self.tx_data = tx_data
+        self.rx_data = rx_data
+        self.post_processing_delay = post_processing_delay
+        self.command_width = tx_data.command_width if tx_data is not None else 0
+        self.device_busy_delay = tx_data.device_busy_delay if tx_data is not None else 0.0
+        self.slave_address = tx_data.slave_address if tx_data is not None else None
+        self.ignore_error = tx_data.ignore_acknowledge if tx_data is not None else False
+
+    @classmethod
+    def from_class(cls, transfer_class) -> "TransferMetadata":
+        """Resolve the metadata from the class attributes tx, rx and post_processing_time."""
+        return cls(getattr(transfer_class, 'tx', None), getattr(transfer_class, 'rx', None),
+                   getattr(transfer_class, 'post_processing_time', None))
+
+    @classmethod
+    def from_properties(cls, transfer: "Transfer") -> "TransferMetadata":
+        """Resolve the metadata from the properties of a transfer object."""
+        metadata = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(metadata, name, getattr(transfer, name))
+        return metadata
+
+
+# the metadata of transfer classes that override one of the properties of Transfer is resolved per object
+_RESOLVE_PER_OBJECT = object()
+
+
+class _TransferMeta(abc.ABCMeta):
+    """Invalidates the cached metadata of a transfer class and its subclasses when an attribute of the class changes"""
+
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        if name != '_metadata':
+            cls._invalidate_metadata()
+
+    def __delattr__(cls, name):
+        super().__delattr__(name)
+        cls._invalidate_metadata()
+
+    def _invalidate_metadata(cls):
+        pending = [cls]
+        while pending:
+            transfer_class = pending.pop()
+            type.__setattr__(transfer_class, '_metadata', None)
+            pending.extend(transfer_class.__subclasses__())
+
+
+class Transfer(abc.ABC, metaclass=_TransferMeta):
+    """A transfer abstracts the data that is exchanged between host and sensor
+
+    The class attributes tx, rx and post_processing_time are resolved when the first transfer of a class is executed
+    and cached per class; assigning a class attribute later invalidates the cache. Subclasses that override one of the
+    properties below are resolved on every execution instead.
+    """
+
+    _metadata: ClassVar[Any] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._metadata = None
+
+    @property
+    def metadata(self) -> TransferMetadata:
+        """The properties of this transfer that are used to execute it."""
+        metadata = self._metadata
+        if metadata is None:
+            metadata = self._resolve_metadata()
+        if metadata is _RESOLVE_PER_OBJECT:
+            return TransferMetadata.from_properties(self)
+        return metadata
+
+    @classmethod
+    def _resolve_metadata(cls) -> Any:
+        if all(getattr(cls, name) is getattr(Transfer, name) for name in TransferMetadata.__slots__):
+            metadata = TransferMetadata.from_class(cls)
+        else:
+            metadata = _RESOLVE_PER_OBJECT
+        cls._metadata = metadata
+        return metadata
 
     @property
     def ignore_error(self) -> bool:
@@ -70,16 +156,52 @@ def execute_transfer(channel: TxRxChannel, *args):
     :param args: a variable list of transfers to be transmitted
     :return: a tuple of data if the last transfer has a response
     """
-    transfers = list(args)
-    for t in transfers[:-1]:
-        channel.write_read(t.pack(), t.command_width,
-                           t.rx_data,
-                           device_busy_delay=t.device_busy_delay,
-                           post_processing_delay=t.post_processing_delay,
-                           slave_address=t.slave_address, ignore_errors=t.ignore_error)
-    t = transfers[-1]
-    return channel.write_read(t.pack(), t.command_width,
-                              t.rx_data,
-                              device_busy_delay=t.device_busy_delay,
-                              post_processing_delay=t.post_processing_delay,
-                              slave_address=t.slave_address, ignore_errors=t.ignore_error)
+    result = None
+    for t in args:
+        m = t.metadata
+        result = channel.write_read(t.pack(), m.command_width,
+                                    m.rx_data,
+                                    device_busy_delay=m.device_busy_delay,
+                                    post_processing_delay=m.post_processing_delay,
+                                    slave_address=m.slave_address, ignore_errors=m.ignore_error)
+    return result
+
+
+def execute_transfers(channel: TxRxChannel, transfers: Iterable[Transfer]) -> Tuple[Optional[Tuple[Any, ...]], ...]:
+    """
+    Executes a sequence of transfers and returns the response of every transfer.
+
+    The transfers are passed to the channel as one batch, which allows the channel to combine them into fewer bus
+    transactions (see TxRxChannel.write_read_batch).
+    :param channel: The channel that is used to transfer the data
+    :param transfers: The transfers to be transmitted; they may address different devices
+    :return: a tuple with the response of each transfer, None for transfers without response
+    """
+    requests = []
+    for t in transfers:
+        m = t.metadata
+        requests.append(WriteReadRequest(t.pack(), m.command_width, m.rx_data,
+                                         device_busy_delay=m.device_busy_delay,
+                                         post_processing_delay=m.post_processing_delay,
+                                         slave_address=m.slave_address, ignore_errors=m.ignore_error))
+    return channel.write_read_batch(requests)
+
+
+async def execute_transfer_async(channel: AsyncTxRxChannel, *args):
+    """
+    Executes a transfer consisting of one or more Transfer objects on an asyncio channel.
+
+    While the device is busy, other coroutines of the same event loop can communicate with other devices.
+    :param channel: The asyncio channel that is used to transfer the data
+    :param args: a variable list of transfers to be transmitted
+    :return: a tuple of data if the last transfer has a response
+    """
+    result = None
+    for t in args:
+        m = t.metadata
+        result = await channel.write_read(t.pack(), m.command_width,
+                                          m.rx_data,
+                                          device_busy_delay=m.device_busy_delay,
+                                          post_processing_delay=m.post_processing_delay,
+                                          slave_address=m.slave_address, ignore_errors=m.ignore_error)
+    return result
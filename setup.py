@@ -29,6 +29,9 @@ extras_require = {
     'docs': [
         'sphinx~=2.2.1',
         'sphinx-rtd-theme~=0.4.3',
+    ],
+    'numpy': [
+        'numpy',
     ]
 }
 
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+"""
+Benchmarks of the hot paths of the adapters.
+
+Every benchmark reports the throughput in operations per second and the memory allocated by one operation. The
+results can be saved as JSON baseline and compared with a later run, e.g. before and after a dependency upgrade
+(the package must be installed, e.g. with pip install -e .):
+
+    python tests/benchmarks.py --save baseline.json
+    python tests/benchmarks.py --compare baseline.json
+    python tests/benchmarks.py --imports
+
+The comparison fails (exit code 1) if the throughput of a benchmark dropped by more than the tolerance. The import
+check fails if an entry module takes longer than the budget to import in a fresh interpreter. Baselines
+are only comparable on the same machine and Python version. The mocks run with a VirtualClock, hence the command
+delays do not add to the measured time.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters.clock import VirtualClock
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.mock_shdlc_channel_provider import ShdlcMockPortChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
+from circuitpython_sensirion_driver_adapters.transfer import Transfer, execute_transfer
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+FAN_OUT_CHANNEL_COUNTS = (1, 4, 16, 64, 256)
+
+# Generous upper bound of the import time of one module in a fresh interpreter, including the drivers it needs.
+# Typical values are well below 0.1 s; the budget catches heavy imports that slip in again.
+IMPORT_TIME_BUDGET = 0.5
+IMPORT_TIME_MODULES = ('circuitpython_sensirion_driver_adapters.channel_provider',
+                       'circuitpython_sensirion_driver_adapters.transfer',
+                       'circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_channel_provider',
+                       'circuitpython_sensirion_driver_adapters.multi_sensor_bridge',
+                       'circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_serial_channel_provider')
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+#: A benchmark is set up by a function that returns the operation to measure and a function that cleans up.
+Setup = Callable[[], Tuple[Callable[[], Any], Callable[[], None]]]
+
+
+class BenchmarkResult(NamedTuple):
+    ops_per_second: float
+    #: peak of the memory allocated while one operation runs. Unit: bytes
+    allocated_bytes: int
+    #: number of memory blocks that are still allocated after one operation, e.g. by growing caches or leaks
+    retained_blocks: float
+
+
+class ProductName(Transfer):
+    CMD_ID = 0xD0
+
+    def pack(self):
+        return self.tx_data.pack([1])
+
+    tx = TxData(CMD_ID, '>BB', device_busy_delay=0.05, slave_address=None, ignore_ack=False)
+    rx = RxData('>32s')
+
+
+class ProductNameResponse(ResponseProvider):
+    def get_id(self) -> str:
+        return "product-name"
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        return b'SVM41\x00'
+
+
+def _without_cleanup(operation: Callable[[], Any]) -> Tuple[Callable[[], Any], Callable[[], None]]:
+    return operation, lambda: None
+
+
+def setup_tx_pack():
+    transfer = mocks.MeasureRawSignals(50, 10)
+    return _without_cleanup(transfer.pack)
+
+
+def setup_rx_unpack():
+    rx = mocks.MeasureRawSignals.rx
+    data = bytes(range(rx.rx_length))
+    return _without_cleanup(lambda: rx.unpack(data))
+
+
+def setup_rx_unpack_dynamic_sized():
+    rx = RxData('>HH8s')
+    data = b'\x12\x34\x56\x78SVM41\x00'
+    return _without_cleanup(lambda: rx.unpack_dynamic_sized(data))
+
+
+def setup_build_tx_data():
+    crc = I2cChannelProvider.try_create_crc_calculator(CRC_PARAMETERS)
+    tx_data = mocks.MeasureRawSignals(50, 10).pack()
+    return _without_cleanup(lambda: I2cChannel.build_tx_data(tx_data, 2, crc))
+
+
+def setup_strip_and_check_crc(nr_of_words: int):
+    def setup():
+        crc = I2cChannelProvider.try_create_crc_calculator(CRC_PARAMETERS)
+        frame = crc.insert(bytes(range(2 * nr_of_words)))
+        return _without_cleanup(lambda: I2cChannel.strip_and_check_crc(bytearray(frame), crc))
+    return setup
+
+
+def setup_execute_transfer_i2c_mock():
+    channel = MockI2cChannelProvider(command_width=2, clock=VirtualClock()).get_channel(0x44, CRC_PARAMETERS)
+    transfer = mocks.MeasureRawSignals(50, 10)
+    return _without_cleanup(lambda: execute_transfer(channel, transfer))
+
+
+def setup_execute_transfer_shdlc_mock():
+    provider = ShdlcMockPortChannelProvider(ProductNameResponse(), clock=VirtualClock())
+    channel = provider.get_channel()
+    transfer = ProductName()
+    return (lambda: execute_transfer(channel, transfer)), provider.release_channel_resources
+
+
+def setup_multi_driver_fan_out(nr_of_channels: int, execute_concurrent: bool):
+    def setup():
+        clock = VirtualClock()
+        executor = ThreadPoolExecutor(max_workers=min(nr_of_channels, 32)) if execute_concurrent else None
+
+        @multi_driver(mocks.DummyDriver, execute_concurrent=execute_concurrent, executor=executor, clock=clock)
+        class MultiDummyDriver:
+            ...
+
+        channels = MultiChannel(tuple(MockI2cChannelProvider(command_width=2, mock_id=i, clock=clock)
+                                      .get_channel(0x44, CRC_PARAMETERS) for i in range(nr_of_channels)))
+        driver = MultiDummyDriver(channels)
+
+        def cleanup():
+            driver.close()
+            if executor is not None:
+                executor.shutdown()
+
+        return (lambda: driver.invoke_command(50, 10)), cleanup
+    return setup
+
+
+def all_benchmarks(fan_out_counts: Sequence[int] = FAN_OUT_CHANNEL_COUNTS) -> Dict[str, Setup]:
+    """
+    :param fan_out_counts:
+        The numbers of channels of the multi_driver benchmarks.
+    """
+    benchmarks = {
+        'tx_data.pack': setup_tx_pack,
+        'rx_data.unpack': setup_rx_unpack,
+        'rx_data.unpack_dynamic_sized': setup_rx_unpack_dynamic_sized,
+        'i2c_channel.build_tx_data': setup_build_tx_data,
+        'i2c_channel.strip_and_check_crc[2 words]': setup_strip_and_check_crc(2),
+        'i2c_channel.strip_and_check_crc[64 words]': setup_strip_and_check_crc(64),
+        'execute_transfer[i2c mock]': setup_execute_transfer_i2c_mock,
+        'execute_transfer[shdlc mock]': setup_execute_transfer_shdlc_mock,
+    }
+    for execute_concurrent in (False, True):
+        mode = 'concurrent' if execute_concurrent else 'sequential'
+        for count in fan_out_counts:
+            benchmarks[f'multi_driver[{mode}, {count} channels]'] = setup_multi_driver_fan_out(count,
+                                                                                               execute_concurrent)
+    return benchmarks
+
+
+def measure_throughput(operation: Callable[[], Any], min_time: float, repeat: int) -> float:
+    """
+    Run the operation in rounds of growing length until a round takes min_time, then take the best of repeat rounds.
+
+    :return:
+        The operations per second of the fastest round.
+    """
+    iterations = 1
+    while True:
+        elapsed = _time_round(operation, iterations)
+        if elapsed >= min_time:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(1.2 * min_time / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, _time_round(operation, iterations))
+    return iterations / best
+
+
+def _time_round(operation: Callable[[], Any], iterations: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure_allocations(operation: Callable[[], Any], rounds: int = 5) -> int:
+    """
+    Trace the memory allocated by single operations. Caches and worker threads are warmed up before.
+
+    :return:
+        The smallest peak of allocated bytes of the rounds.
+    """
+    operation()
+    allocated = []
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                # Python < 3.9: clearing the traces resets the peak as well
+                tracemalloc.clear_traces()
+            size_before, _ = tracemalloc.get_traced_memory()
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated.append(max(0, peak - size_before))
+    finally:
+        tracemalloc.stop()
+    return min(allocated)
+
+
+def measure_retained_blocks(operation: Callable[[], Any], iterations: int = 100) -> float:
+    """
+    :return:
+        The number of memory blocks that are still allocated after an operation, averaged over the iterations.
+    """
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(iterations):
+        operation()
+    gc.collect()
+    return max(0, sys.getallocatedblocks() - blocks_before) / iterations
+
+
+def run_benchmark(setup: Setup, min_time: float = 0.2, repeat: int = 3) -> BenchmarkResult:
+    operation, cleanup = setup()
+    try:
+        allocated_bytes = measure_allocations(operation)
+        retained_blocks = measure_retained_blocks(operation)
+        return BenchmarkResult(measure_throughput(operation, min_time, repeat), allocated_bytes, retained_blocks)
+    finally:
+        cleanup()
+
+
+def run_benchmarks(selection: Optional[str] = None, min_time: float = 0.2,
+                   repeat: int = 3) -> Iterator[Tuple[str, BenchmarkResult]]:
+    """
+    :param selection:
+        Only run the benchmarks whose name contains this string.
+    """
+    for name, setup in all_benchmarks().items():
+        if selection is None or selection in name:
+            yield name, run_benchmark(setup, min_time, repeat)
+
+
+def import_in_fresh_interpreter(module: str) -> dict:
+    """
+    :return:
+        The import time of the module in seconds ('elapsed') and the top level packages that are loaded afterwards
+        ('modules').
+    """
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+                                     cwd=path.join(path.dirname(__file__), ".."))
+    return json.loads(output)
+
+
+def check_import_times(budget: float = IMPORT_TIME_BUDGET) -> List[str]:
+    """
+    :return:
+        The modules of IMPORT_TIME_MODULES whose import takes longer than the budget.
+    """
+    too_slow = []
+    for module in IMPORT_TIME_MODULES:
+        elapsed = import_in_fresh_interpreter(module)['elapsed']
+        print(f'import {module:<84} {elapsed * 1000:>8.1f} ms', flush=True)
+        if elapsed >= budget:
+            too_slow.append(module)
+    return too_slow
+
+
+def environment() -> Dict[str, str]:
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system()}
+
+
+def save_baseline(file_name: str, results: Dict[str, BenchmarkResult]) -> None:
+    with open(file_name, 'w') as f:
+        json.dump({'environment': environment(),
+                   'benchmarks': {name: result._asdict() for name, result in results.items()}}, f, indent=2)
+
+
+def load_baseline(file_name: str) -> Dict[str, BenchmarkResult]:
+    with open(file_name) as f:
+        baseline = json.load(f)
+    return {name: BenchmarkResult(**result) for name, result in baseline['benchmarks'].items()}
+
+
+def compare(results: Dict[str, BenchmarkResult], baseline: Dict[str, BenchmarkResult],
+            tolerance: float) -> List[str]:
+    """
+    :param tolerance:
+        The accepted relative drop of the throughput, e.g. 0.2 for 20%.
+    :return:
+        The names of the benchmarks whose throughput dropped by more than the tolerance.
+    """
+    return [name for name, result in results.items()
+            if name in baseline and result.ops_per_second < (1.0 - tolerance) * baseline[name].ops_per_second]
+
+
+def format_result(name: str, result: BenchmarkResult, reference: Optional[BenchmarkResult]) -> str:
+    line = f'{name:<42} {result.ops_per_second:>14,.0f} ops/s {result.allocated_bytes:>9} B ' \
+           f'{result.retained_blocks:>6.2f} blocks retained'
+    if reference is not None:
+        line += f' {result.ops_per_second / reference.ops_per_second - 1.0:>+8.1%}'
+    return line
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='selection', help='only run the benchmarks whose name contains this string')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimal duration of a round in seconds')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed rounds per benchmark')
+    parser.add_argument('--save', metavar='FILE', help='save the results as JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='accepted relative drop of the throughput')
+    parser.add_argument('--imports', action='store_true',
+                        help='check the import times of the entry modules instead of running the benchmarks')
+    args = parser.parse_args(argv)
+    if args.imports:
+        too_slow = check_import_times()
+        for module in too_slow:
+            print(f'Import of {module} takes more than {IMPORT_TIME_BUDGET} s', file=sys.stderr)
+        return 1 if too_slow else 0
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results = {}
+    for name, result in run_benchmarks(args.selection, args.min_time, args.repeat):
+        results[name] = result
+        print(format_result(name, result, baseline.get(name)), flush=True)
+    if args.save:
+        save_baseline(args.save, results)
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f'Regression: {name} is more than {args.tolerance:.0%} slower than the baseline', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
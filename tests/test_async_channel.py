@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import asyncio
+import threading
+import time
+
+from sensirion_i2c_driver.transceiver_v1 import I2cTransceiverV1
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.i2c_adapter.async_i2c_channel import AsyncI2cChannel, AsyncI2cConnection
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.mock_shdlc_channel_provider import ShdlcMockPortChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.shdlc_transceiver_mock import ShdlcTransceiverMock
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
+from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import AsyncShdlcChannel
+from circuitpython_sensirion_driver_adapters.transfer import Transfer, execute_transfer_async
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+
+
+def run(coroutine):
+    """Same as asyncio.run, which requires Python 3.7"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class ReadFirmwareVersion(Transfer):
+    CMD_ID = 0xd1
+
+    def pack(self):
+        return self.tx_data.pack([])
+
+    tx = TxData(CMD_ID, '>B', device_busy_delay=0.05)
+    rx = RxData('>BB?BBBB')
+
+
+class RecordingTransceiver(I2cTransceiverV1):
+    """Single channel transceiver that records the transceive calls and returns a valid frame"""
+
+    def __init__(self, rx_data: bytes):
+        self.calls = []
+        self.threads = set()
+        self._rx_data = rx_data
+
+    @property
+    def channel_count(self):
+        return None
+
+    @property
+    def description(self):
+        return "recording transceiver"
+
+    def open(self):
+        ...
+
+    def close(self):
+        ...
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        self.calls.append((slave_address, tx_data, rx_length, read_delay))
+        self.threads.add(threading.get_ident())
+        return self.STATUS_OK, None, self._rx_data if rx_length else b""
+
+
+def test_async_i2c_channels_overlap_busy_delays():
+    nr_of_sensors = 8
+    channels = [MockI2cChannelProvider(command_width=2, mock_id=i).get_async_channel(0x59, CRC_PARAMETERS)
+                for i in range(nr_of_sensors)]
+
+    async def measure_all():
+        return await asyncio.gather(*[execute_transfer_async(channel, mocks.MeasureRawSignals(50, 10))
+                                      for channel in channels])
+
+    start = time.monotonic()
+    results = run(measure_all())
+    assert time.monotonic() - start < nr_of_sensors * mocks.MeasureRawSignals.tx.device_busy_delay
+    assert len(results) == nr_of_sensors
+    assert all(len(result) == 2 for result in results)
+
+
+def test_async_i2c_connection_splits_write_and_read():
+    crc = MockI2cChannelProvider.try_create_crc_calculator(CRC_PARAMETERS)
+    transceiver = RecordingTransceiver(I2cChannel.build_tx_data(bytes([0x12, 0x34, 0x56, 0x78]), 0, crc))
+    channel = AsyncI2cChannel(AsyncI2cConnection(transceiver), slave_address=0x59, crc=crc)
+    result = run(execute_transfer_async(channel, mocks.MeasureRawSignals(50, 10)))
+    assert result == (0x1234, 0x5678)
+    (write_address, tx_data, write_length, write_delay), (read_address, rx_data, rx_length, read_delay) = \
+        transceiver.calls
+    assert (write_address, write_length, write_delay) == (0x59, None, 0.0)
+    assert len(tx_data) == 8
+    assert (read_address, rx_data, rx_length, read_delay) == (0x59, None, 6, 0.0)
+    # the blocking transfers do not run on the thread of the event loop
+    assert threading.get_ident() not in transceiver.threads
+
+
+def test_async_shdlc_channel():
+    with ShdlcMockPortChannelProvider() as provider:
+        channel = provider.get_async_channel(0.1)
+        version = run(execute_transfer_async(channel, ReadFirmwareVersion()))
+    assert len(version) == 7
+
+
+def test_async_shdlc_channel_addresses_device_zero():
+    provider = ShdlcMockPortChannelProvider()
+    channel = AsyncShdlcChannel(ShdlcTransceiverMock(provider.sensor_mock), shdlc_address=2)
+    tx = ReadFirmwareVersion.tx
+    run(channel.write_read(tx.pack([]), tx.command_width, ReadFirmwareVersion.rx,
+                           post_processing_delay=0.5, slave_address=0))
+    busy_tracker = channel._channel.busy_tracker
+    assert busy_tracker.remaining(0) > 0.0
+    assert busy_tracker.remaining(2) == 0.0
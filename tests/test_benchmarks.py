@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import benchmarks
+
+
+def test_all_benchmarks_run():
+    # the large fan-outs are slow, the smoke test runs the smallest ones only
+    setups = benchmarks.all_benchmarks(fan_out_counts=benchmarks.FAN_OUT_CHANNEL_COUNTS[:2])
+    results = {name: benchmarks.run_benchmark(setup, min_time=0.001, repeat=1) for name, setup in setups.items()}
+    assert set(results) < set(benchmarks.all_benchmarks())
+    assert all(result.ops_per_second > 0 for result in results.values())
+    assert results['multi_driver[sequential, 4 channels]'].allocated_bytes > 0
+
+
+def test_save_and_compare_baseline(tmp_path):
+    results = dict(benchmarks.run_benchmarks('rx_data', min_time=0.001, repeat=1))
+    baseline_file = str(tmp_path / 'baseline.json')
+    benchmarks.save_baseline(baseline_file, results)
+    baseline = benchmarks.load_baseline(baseline_file)
+    assert baseline == results
+    assert benchmarks.compare(results, baseline, tolerance=0.2) == []
+    slower = {name: result._replace(ops_per_second=result.ops_per_second / 2) for name, result in results.items()}
+    assert benchmarks.compare(slower, baseline, tolerance=0.2) == list(results)
+    assert benchmarks.main(['-k', 'rx_data.unpack_dynamic', '--min-time', '0.001', '--compare', baseline_file,
+                            '--tolerance', '0.99']) == 0
@@ -11,7 +11,8 @@ from circuitpython_sensirion_driver_adapters.mocks.response_provider import Resp
 from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
 from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
 from circuitpython_sensirion_driver_adapters.rx_tx_data import TxData, RxData
-from circuitpython_sensirion_driver_adapters.transfer import Transfer, execute_transfer
+from circuitpython_sensirion_driver_adapters.transfer import Transfer, TransferMetadata, execute_transfer, \
+    execute_transfers
 
 
 class ResultProvider(ResponseProvider):
@@ -175,3 +176,116 @@ def test_general_call_reset_no_hw():
     assert isinstance(channel, I2cChannel)
     channel.i2c_general_call_reset()
     assert reset_mock.is_called > 0
+
+
+def test_transfer_metadata_is_resolved_per_class():
+    class ReadWithAddress(Transfer):
+        def pack(self) -> Optional[bytes]:
+            return self.tx_data.pack()
+
+        tx = TxData(cmd_id=0xABCD, descriptor='>H', device_busy_delay=0.02, slave_address=0x44, ignore_ack=True)
+        rx = RxData('>H')
+        post_processing_time = 0.01
+
+    class Wakeup(Transfer):
+        def pack(self) -> Optional[bytes]:
+            return None
+
+    metadata = ReadWithAddress().metadata
+    assert metadata is ReadWithAddress().metadata
+    assert (metadata.command_width, metadata.device_busy_delay, metadata.slave_address, metadata.ignore_error,
+            metadata.post_processing_delay) == (2, 0.02, 0x44, True, 0.01)
+    assert metadata.rx_data is ReadWithAddress.rx
+    wakeup = Wakeup().metadata
+    assert (wakeup.tx_data, wakeup.rx_data, wakeup.command_width, wakeup.slave_address) == (None, None, 0, None)
+
+
+def test_transfer_metadata_follows_class_attributes():
+    class Measure(Transfer):
+        def pack(self) -> Optional[bytes]:
+            return self.tx_data.pack()
+
+    class MeasureHighPrecision(Measure):
+        ...
+
+    assert Measure().metadata.tx_data is None
+    Measure.tx = TxData(cmd_id=0xABCD, descriptor='>H', device_busy_delay=0.02)
+    Measure.rx = RxData('>H')
+    assert Measure().metadata.tx_data is Measure.tx
+    assert MeasureHighPrecision().metadata.rx_data is Measure.rx
+    MeasureHighPrecision.post_processing_time = 0.01
+    assert MeasureHighPrecision().metadata.post_processing_delay == 0.01
+    assert Measure().metadata.post_processing_delay is None
+
+
+def test_transfer_metadata_of_overridden_properties():
+    class ReadFromAddress(Transfer):
+        def __init__(self, address):
+            self._address = address
+
+        def pack(self) -> Optional[bytes]:
+            return self.tx_data.pack()
+
+        @property
+        def slave_address(self) -> Optional[int]:
+            return self._address
+
+        tx = TxData(cmd_id=0xABCD, descriptor='>H')
+
+    assert ReadFromAddress(0x10).metadata.slave_address == 0x10
+    assert ReadFromAddress(0x11).metadata.slave_address == 0x11
+    assert isinstance(ReadFromAddress(0x11).metadata, TransferMetadata)
+
+
+class CountingResponse(ResponseProvider):
+
+    def get_id(self) -> str:
+        return 'counting-response'
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        return bytes(range(1, response_length + 1))
+
+
+class CountingConnection:
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.requests = []
+
+    def execute(self, address, request):
+        self.requests.append((address, request.tx_data, request.rx_length, request.read_delay))
+        return self._connection.execute(address, request)
+
+
+class SelectRegister(Transfer):
+    def pack(self) -> Optional[bytes]:
+        return self.tx_data.pack()
+
+    tx = TxData(cmd_id=0x1234, descriptor='>H', device_busy_delay=0.001)
+
+
+class ReadRegister(Transfer):
+    def pack(self) -> Optional[bytes]:
+        return None
+
+    rx = RxData('>HH')
+
+
+class ReadVersion(Transfer):
+    def pack(self) -> Optional[bytes]:
+        return self.tx_data.pack()
+
+    tx = TxData(cmd_id=0xE102, descriptor='>H', slave_address=0x10)
+    rx = RxData('>H')
+
+
+def test_execute_transfers_combines_write_and_read():
+    provider = MockI2cChannelProvider(command_width=2, response_provider=CountingResponse())
+    channel = provider.get_channel(slave_address=0x10, crc_parameters=(8, 0x31, 0xFF, 0x00))
+    connection = CountingConnection(channel._connection)
+    channel._connection = connection
+    results = execute_transfers(channel, [SelectRegister(), ReadRegister(), ReadVersion(), SelectRegister()])
+    assert results == (None, (0x0102, 0x0304), (0x0102,), None)
+    assert [(address, rx_length, read_delay) for address, _, rx_length, read_delay in connection.requests] == \
+           [(0x10, 6, 0.001), (0x10, 3, 0.0), (0x10, None, 0.001)]
+    assert connection.requests[0][1] == b'\x12\x34'
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import pytest
+from sensirion_i2c_driver import CrcCalculator
+from sensirion_i2c_driver.errors import I2cChecksumError
+
+from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters import lazy_import
+from circuitpython_sensirion_driver_adapters.i2c_adapter.crc_engine import TableCrcCalculator
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+
+CRC_PARAMETERS = [(8, 0x31, 0xFF, 0x00), (8, 0x07, 0x00, 0x55)]
+
+
+@pytest.mark.parametrize("parameters", CRC_PARAMETERS)
+def test_table_crc_matches_crc_calculator(parameters):
+    reference = CrcCalculator(*parameters)
+    table_crc = TableCrcCalculator.create(parameters)
+    for data in (b'', b'\x00', b'\xbe\xef', bytes(range(256))):
+        assert table_crc(data) == reference(data)
+
+
+def test_table_crc_is_shared():
+    assert I2cChannelProvider.try_create_crc_calculator((8, 0x31, 0xFF, 0x00)) is \
+           TableCrcCalculator.create((8, 0x31, 0xFF, 0x00))
+    assert not isinstance(TableCrcCalculator.create((16, 0x1021, 0xFFFF, 0x00)), TableCrcCalculator)
+
+
+@pytest.mark.parametrize("parameters", CRC_PARAMETERS)
+@pytest.mark.parametrize("cmd_width", [1, 2])
+@pytest.mark.parametrize("payload", [b'', b'\x01', b'\x01\x02', b'\x01\x02\x03', bytes(range(60))])
+def test_build_tx_data_and_strip_crc(parameters, cmd_width, payload):
+    reference = CrcCalculator(*parameters)
+    table_crc = TableCrcCalculator.create(parameters)
+    tx_data = bytes(cmd_width) + payload
+    frame = I2cChannel.build_tx_data(tx_data, cmd_width, table_crc)
+    assert frame == I2cChannel.build_tx_data(tx_data, cmd_width, reference)
+    stripped = I2cChannel.strip_and_check_crc(bytearray(frame[cmd_width:]), table_crc)
+    assert stripped == I2cChannel.strip_and_check_crc(bytearray(frame[cmd_width:]), reference)
+    assert (stripped or b'') == payload
+
+
+def test_strip_crc_reports_first_wrong_crc():
+    crc = TableCrcCalculator.create((8, 0x31, 0xFF, 0x00))
+    frame = bytearray(I2cChannel.build_tx_data(bytes(range(12)), 0, crc))
+    frame[5] ^= 0xFF
+    frame[8] ^= 0xFF
+    with pytest.raises(I2cChecksumError) as error:
+        I2cChannel.strip_and_check_crc(frame, crc)
+    assert error.value.received_checksum == frame[5]
+
+
+@pytest.mark.parametrize("nr_of_words", [0, 2, 200])
+def test_vectorized_strip_crc(nr_of_words):
+    pytest.importorskip("numpy")
+    crc = TableCrcCalculator.create((8, 0x31, 0xFF, 0x00))
+    frame = bytearray(I2cChannel.build_tx_data(bytes(i % 256 for i in range(2 * nr_of_words)), 0, crc) or b'')
+    assert crc.strip_and_check_vectorized(frame) == crc.strip_and_check(frame)
+    if nr_of_words == 0:
+        return
+    frame[-1] ^= 0xFF
+    frame[-4] ^= 0xFF
+    with pytest.raises(I2cChecksumError) as error:
+        crc.strip_and_check_vectorized(frame)
+    assert error.value.received_checksum == frame[-4]
+
+
+@pytest.mark.parametrize("numpy_available", [True, False])
+def test_strip_protocol_of_long_frame(monkeypatch, numpy_available):
+    if numpy_available:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(lazy_import, "numpy", lambda: None)
+    crc = TableCrcCalculator.create((8, 0x31, 0xFF, 0x00))
+    payload = bytes(i % 256 for i in range(2 * I2cChannel.vectorized_crc_min_length))
+    frame = bytearray(I2cChannel.build_tx_data(payload, 0, crc))
+    channel = I2cChannel(connection=None, crc=crc)
+    assert channel.strip_protocol(frame) == payload
+    frame[7] ^= 0xFF
+    with pytest.raises(I2cChecksumError) as error:
+        channel.strip_protocol(frame)
+    assert error.value.received_checksum == frame[8]
+
+
+@pytest.mark.parametrize("parameters", CRC_PARAMETERS)
+@pytest.mark.parametrize("payload", [b'', b'\x01', b'\x01\x02\x03', bytes(range(60))])
+def test_build_tx_data_into_buffer(parameters, payload):
+    crc = TableCrcCalculator.create(parameters)
+    tx_data = bytearray(b'\x36\x08' + payload)
+    buffer = bytearray(100)
+    length = I2cChannel.build_tx_data_into(buffer, tx_data, 2, crc)
+    assert length == TableCrcCalculator.frame_length(len(payload), 2)
+    assert buffer[:length] == I2cChannel.build_tx_data(tx_data, 2, CrcCalculator(*parameters))
+
+
+def test_channel_reuses_tx_buffer():
+    crc = TableCrcCalculator.create(CRC_PARAMETERS[0])
+    channel = I2cChannel(connection=None, crc=crc, reuse_tx_buffer=True)
+    first = channel.create_request(b'\x36\x08\x01\x02', 2, None).tx_data
+    assert first == I2cChannel.build_tx_data(b'\x36\x08\x01\x02', 2, crc)
+    second = channel.create_request(b'\x36\x09\x03\x04', 2, None).tx_data
+    assert second == I2cChannel.build_tx_data(b'\x36\x09\x03\x04', 2, crc)
+    # the transceivers accept bytes only
+    assert type(first) is bytes and type(second) is bytes
+    assert I2cChannel(connection=None, crc=crc).create_request(b'\x36\x08', 2, None).tx_data == b'\x36\x08'
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import threading
+import time
+
+import pytest
+from sensirion_i2c_driver import I2cCommand
+from sensirion_i2c_driver.errors import I2cNackError
+from sensirion_i2c_driver.transceiver_v1 import I2cTransceiverV1
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.channel_provider import I2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_bus_scheduler import I2cBusScheduler
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+
+CRC = I2cChannelProvider.try_create_crc_calculator((8, 0x31, 0xFF, 0x00))
+
+
+class BusyDevicesTransceiver(I2cTransceiverV1):
+    """Transceiver that NACKs reads from devices that are still busy after the last write"""
+
+    def __init__(self, busy_time: float) -> None:
+        self._busy_time = busy_time
+        self._busy_until = {}
+        self.operations = []
+        self._lock = threading.Lock()
+
+    @property
+    def channel_count(self):
+        return None
+
+    @property
+    def description(self):
+        return "busy devices"
+
+    def open(self):
+        ...
+
+    def close(self):
+        ...
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        assert self._lock.acquire(blocking=False), "concurrent bus access"
+        try:
+            now = time.monotonic()
+            self.operations.append((slave_address, 'w' if tx_data is not None else 'r'))
+            if tx_data is not None:
+                self._busy_until[slave_address] = now + self._busy_time
+                return self.STATUS_OK, None, b""
+            if self._busy_until.get(slave_address, 0.0) > now:
+                return self.STATUS_NACK, None, b""
+            return self.STATUS_OK, None, I2cChannel.build_tx_data(bytes([0, slave_address, 0, 1]), 0, CRC)
+        finally:
+            self._lock.release()
+
+
+@multi_driver(mocks.DummyDriver, execute_concurrent=True)
+class ParallelDummyDriver:
+    ...
+
+
+def test_bus_scheduler_interleaves_busy_devices():
+    busy_time = mocks.MeasureRawSignals.tx.device_busy_delay
+    transceiver = BusyDevicesTransceiver(busy_time)
+    scheduler = I2cBusScheduler(transceiver)
+    addresses = range(0x40, 0x48)
+    driver = ParallelDummyDriver(MultiChannel(tuple(I2cChannel(scheduler, slave_address=address, crc=CRC)
+                                                    for address in addresses)))
+    try:
+        start = time.monotonic()
+        results = driver.invoke_command(50, 10)
+        duration = time.monotonic() - start
+    finally:
+        driver.close()
+        scheduler.close()
+    assert results == tuple((address, 1) for address in addresses)
+    assert duration < len(addresses) * busy_time / 2
+    # all devices are written before the first one is read
+    assert [op for _, op in transceiver.operations[:len(addresses)]] == ['w'] * len(addresses)
+
+
+def test_bus_scheduler_serializes_commands_per_device():
+    transceiver = BusyDevicesTransceiver(0.01)
+    scheduler = I2cBusScheduler(transceiver)
+    channel = I2cChannel(scheduler, slave_address=0x10, crc=CRC)
+    threads = [threading.Thread(target=mocks.DummyDriver(channel).invoke_command, args=(1, 2)) for _ in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    scheduler.close()
+    assert [op for _, op in transceiver.operations] == ['w', 'r'] * 4
+
+
+def test_bus_scheduler_reports_errors():
+    transceiver = BusyDevicesTransceiver(1.0)
+    scheduler = I2cBusScheduler(transceiver)
+    channel = I2cChannel(scheduler, slave_address=0x10, crc=CRC)
+    with pytest.raises(I2cNackError):
+        # the read delay is shorter than the time the device is busy
+        mocks.DummyDriver(channel).invoke_command(1, 2)
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(0x10, None)
+
+
+class FailingPostProcessing(I2cCommand):
+    """Command whose post processing time cannot be evaluated, which kills the dispatcher thread"""
+
+    @property
+    def post_processing_time(self):
+        raise ValueError("broken command")
+
+    @post_processing_time.setter
+    def post_processing_time(self, value):
+        ...
+
+
+def test_bus_scheduler_fails_pending_commands_if_dispatcher_dies():
+    scheduler = I2cBusScheduler(BusyDevicesTransceiver(0.0))
+    broken = scheduler.submit(0x10, FailingPostProcessing(b'\x01', None, 0.0, 0.1))
+    queued = scheduler.submit(0x10, I2cCommand(b'\x02', None, 0.0, 0.1))
+    with pytest.raises(ValueError):
+        broken.result(timeout=5.0)
+    with pytest.raises(ValueError):
+        queued.result(timeout=5.0)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(0x11, I2cCommand(b'\x02', None, 0.0, 0.1))
+    scheduler.close()
+
+
+class TimedTransceiver(BusyDevicesTransceiver):
+    """Records the time of every bus operation"""
+
+    def __init__(self) -> None:
+        super().__init__(0.0)
+        self.times = []
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        self.times.append((slave_address, time.monotonic()))
+        return super().transceive(slave_address, tx_data, rx_length, read_delay, timeout)
+
+
+def test_bus_scheduler_waits_for_general_call_reset():
+    transceiver = TimedTransceiver()
+    scheduler = I2cBusScheduler(transceiver)
+    channel = I2cChannel(scheduler, slave_address=0x44, crc=CRC)
+    try:
+        channel.i2c_general_call_reset()
+        mocks.DummyDriver(channel).invoke_command(1, 2)
+    finally:
+        scheduler.close()
+    (reset_address, reset_time), (address, command_time) = transceiver.times[:2]
+    assert (reset_address, address) == (0x00, 0x44)
+    assert command_time - reset_time >= 0.05
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import sys
+
+import pytest
+
+from benchmarks import import_in_fresh_interpreter
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="lazy attributes require a module __getattr__ (Python 3.7)")
+@pytest.mark.parametrize("module, forbidden", [
+    ("circuitpython_sensirion_driver_adapters.channel_provider",
+     {"sensirion_i2c_driver", "sensirion_shdlc_driver", "serial", "numpy", "asyncio"}),
+    ("circuitpython_sensirion_driver_adapters.transfer",
+     {"sensirion_i2c_driver", "sensirion_shdlc_driver", "serial", "numpy", "asyncio"}),
+    ("circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_channel_provider",
+     {"sensirion_shdlc_driver", "sensirion_shdlc_sensorbridge", "serial", "numpy", "asyncio"}),
+    ("circuitpython_sensirion_driver_adapters.multi_sensor_bridge",
+     {"sensirion_shdlc_driver", "sensirion_shdlc_sensorbridge", "serial", "numpy"}),
+    ("circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_serial_channel_provider",
+     {"sensirion_i2c_driver", "numpy", "asyncio"}),
+])
+def test_imported_packages(module, forbidden):
+    # the import time itself is checked by the benchmark script (benchmarks.py --imports), since it is machine dependent
+    result = import_in_fresh_interpreter(module)
+    assert not forbidden.intersection(result['modules'])
+
+
+def test_lazy_attributes():
+    from circuitpython_sensirion_driver_adapters import channel_provider
+    from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+    from circuitpython_sensirion_driver_adapters.shdlc_adapter.shdlc_channel import ShdlcChannel
+    assert channel_provider.I2cChannel is I2cChannel
+    assert channel_provider.ShdlcChannel is ShdlcChannel
+    with pytest.raises(AttributeError):
+        channel_provider.NoSuchChannel
+
+
+def test_lazy_attributes_are_imported_at_once_before_python_3_7(monkeypatch):
+    from circuitpython_sensirion_driver_adapters import lazy_import
+    from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+    monkeypatch.setattr(sys, 'version_info', (3, 6, 15))
+    module_globals = {'__name__': 'old_python_module'}
+    attributes = {'I2cChannel': 'circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel'}
+    lazy_import.lazy_attributes(module_globals, attributes)
+    assert module_globals['I2cChannel'] is I2cChannel
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import pytest
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.clock import VirtualClock
+from circuitpython_sensirion_driver_adapters.instrumentation import CallbackSink, HistogramSink, Instrumentation, \
+    LatencyHistogram
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.mock_shdlc_channel_provider import ShdlcMockPortChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.simulated_i2c_bus import SimulatedI2cBusChannelProvider
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i * 1e-6)
+    assert histogram.count == 1000
+    assert histogram.min == pytest.approx(1e-6)
+    assert histogram.max == pytest.approx(1e-3)
+    assert histogram.mean == pytest.approx(500.5e-6, rel=1e-3)
+    assert histogram.percentile(50.0) == pytest.approx(500e-6, rel=0.02)
+    assert histogram.percentile(99.0) == pytest.approx(990e-6, rel=0.02)
+    assert histogram.percentile(100.0) == histogram.max
+    assert LatencyHistogram().percentile(50.0) == 0.0
+
+
+def test_i2c_channel_phases():
+    clock = VirtualClock()
+    events = []
+    channel = MockI2cChannelProvider(command_width=2, clock=clock).get_channel(0x44, CRC_PARAMETERS)
+    channel.set_instrumentation(Instrumentation(CallbackSink(events.append), timer=clock.monotonic))
+    driver = mocks.DummyDriver(channel)
+    driver.invoke_command(50, 10)
+    event, = events
+    assert event.channel is channel
+    assert event.command_id == mocks.MeasureRawSignals.CMD_ID
+    assert event.slave_address == 0x44
+    assert (event.tx_bytes, event.rx_bytes) == (8, 6)
+    # in virtual time, only the measurement delay of the device takes time; it is part of the transfer
+    assert event.total_time == pytest.approx(mocks.MeasureRawSignals.tx.device_busy_delay)
+    assert event.bus_time == pytest.approx(event.total_time)
+    assert event.busy_wait_time == event.crc_time == event.unpack_time == 0.0
+    assert event.error_type is None
+    channel.set_instrumentation(None)
+    driver.invoke_command(50, 10)
+    assert len(events) == 1
+
+
+def test_i2c_channel_busy_wait():
+    clock = VirtualClock()
+    events = []
+    channel = MockI2cChannelProvider(command_width=2, clock=clock).get_channel(0x44, CRC_PARAMETERS)
+    channel.set_instrumentation(Instrumentation(CallbackSink(events.append), timer=clock.monotonic))
+    channel.write_read(b'\x36\x82', 2, None, post_processing_delay=5.0)
+    channel.write_read(b'\x36\x82', 2, None)
+    assert [event.busy_wait_time for event in events] == [0.0, 5.0]
+    assert events[1].total_time == 5.0 and events[1].bus_time == 0.0
+
+
+def test_i2c_channel_cpu_times():
+    sink = HistogramSink()
+    channel = MockI2cChannelProvider(command_width=2, clock=VirtualClock()).get_channel(0x44, CRC_PARAMETERS)
+    channel.set_instrumentation(Instrumentation(sink))
+    driver = mocks.DummyDriver(channel)
+    for _ in range(10):
+        driver.invoke_command(50, 10)
+    statistics = sink.statistics((0x44, mocks.MeasureRawSignals.CMD_ID))
+    assert statistics.count == 10
+    assert statistics.tx_bytes == 80 and statistics.rx_bytes == 60
+    summary = statistics.summary()
+    assert summary['crc_time']['mean'] > 0 and summary['unpack_time']['mean'] > 0
+    assert summary['total_time']['p99'] >= summary['unpack_time']['p99']
+
+
+def test_i2c_channel_errors():
+    sink = HistogramSink()
+    channel = SimulatedI2cBusChannelProvider().get_channel(0x44, CRC_PARAMETERS)
+    channel.set_instrumentation(Instrumentation(sink))
+    with pytest.raises(Exception):
+        mocks.DummyDriver(channel).invoke_command(50, 10)
+    assert channel.write_read(b'\x36\x82', 2, None, ignore_errors=True) is None
+    assert sink.statistics((0x44, mocks.MeasureRawSignals.CMD_ID)).errors == {'I2cNackError': 1}
+    assert sink.statistics((0x44, 0x3682)).errors == {'I2cNackError': 1}
+
+
+def test_shdlc_channel_busy_wait():
+    clock = VirtualClock()
+    events = []
+    with ShdlcMockPortChannelProvider(clock=clock) as provider:
+        channel = provider.get_channel(0.1)
+        channel.set_instrumentation(Instrumentation(CallbackSink(events.append), timer=clock.monotonic))
+        channel.write_read(bytes([0x01]), 1, None, post_processing_delay=5.0)
+        channel.write_read(bytes([0x01, 0x02]), 1, None)
+    assert [event.command_id for event in events] == [0x01, 0x01]
+    assert [event.busy_wait_time for event in events] == [0.0, 5.0]
+    assert events[1].tx_bytes == 2 and events[1].total_time == 5.0
+
+
+def test_multi_driver_events_per_channel():
+    clock = VirtualClock()
+    sink = HistogramSink(key=lambda event: event.channel)
+    channels = tuple(MockI2cChannelProvider(command_width=2, mock_id=i, clock=clock).get_channel(0x44, CRC_PARAMETERS)
+                     for i in range(4))
+    multi_channel = MultiChannel(channels)
+    multi_channel.set_instrumentation(Instrumentation(sink, timer=clock.monotonic))
+
+    @multi_driver(mocks.DummyDriver, clock=clock)
+    class MultiDummyDriver:
+        ...
+
+    MultiDummyDriver(multi_channel).invoke_command(50, 10)
+    assert set(sink.keys()) == set(channels)
+    assert all(sink.statistics(channel).count == 1 for channel in channels)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import ctypes
+import errno
+
+import pytest
+from sensirion_i2c_driver import I2cConnection
+from sensirion_i2c_driver.errors import I2cNackError
+
+from circuitpython_sensirion_driver_adapters.i2c_adapter.crc_engine import TableCrcCalculator
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_rdwr import I2cBatchConnection, \
+    LinuxI2cRdwrTransceiver
+from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
+from circuitpython_sensirion_driver_adapters.transfer import Transfer, execute_transfer, execute_transfers
+
+CRC = TableCrcCalculator.create((8, 0x31, 0xFF, 0x00))
+
+
+class EchoCommand(ResponseProvider):
+    """Responds with the command id"""
+
+    def get_id(self) -> str:
+        return 'echo-command'
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        return cmd_id.to_bytes(2, 'big')[:response_length]
+
+
+class FakeI2cRdwrBus:
+    """Fake of the I2C_RDWR ioctl that dispatches the messages to sensor mocks"""
+
+    def __init__(self, addresses):
+        self.sensors = {address: I2cSensorMock(EchoCommand(), i2c_address=address, crc=CRC) for address in addresses}
+        self.calls = []
+
+    def ioctl(self, fd, request, data):
+        assert request == LinuxI2cRdwrTransceiver.I2C_RDWR
+        messages = []
+        for i in range(data.nmsgs):
+            msg = data.msgs[i]
+            is_read = bool(msg.flags & LinuxI2cRdwrTransceiver.I2C_M_RD)
+            messages.append((msg.addr, 'r' if is_read else 'w', msg.len))
+            sensor = self.sensors.get(msg.addr)
+            if sensor is None:
+                raise OSError(errno.EREMOTEIO, "Remote I/O error")
+            if is_read:
+                rx_data = sensor.read(msg.addr, msg.len)
+                ctypes.memmove(msg.buf, rx_data, len(rx_data))
+            else:
+                sensor.write(msg.addr, ctypes.string_at(msg.buf, msg.len))
+        self.calls.append(messages)
+
+
+class ReadId(Transfer):
+    def pack(self):
+        return self.tx_data.pack()
+
+    tx = TxData(0x3682, '>H')
+    rx = RxData('>H')
+
+
+class ReadIdDelayed(Transfer):
+    def pack(self):
+        return self.tx_data.pack()
+
+    tx = TxData(0x3683, '>H', device_busy_delay=0.001)
+    rx = RxData('>H')
+
+
+class ReadIdFrom(ReadId):
+    tx = TxData(0x3684, '>H', slave_address=0x44)
+
+
+def create_channel(bus, slave_address=0x59):
+    transceiver = LinuxI2cRdwrTransceiver('/dev/i2c-fake', do_open=False, ioctl=bus.ioctl)
+    return I2cChannel(I2cBatchConnection(transceiver), slave_address=slave_address, crc=CRC)
+
+
+def test_command_without_read_delay_is_one_transaction():
+    bus = FakeI2cRdwrBus([0x59])
+    assert execute_transfer(create_channel(bus), ReadId()) == (0x3682,)
+    assert bus.calls == [[(0x59, 'w', 2), (0x59, 'r', 3)]]
+
+
+def test_command_with_read_delay_is_split():
+    bus = FakeI2cRdwrBus([0x59])
+    assert execute_transfer(create_channel(bus), ReadIdDelayed()) == (0x3683,)
+    assert bus.calls == [[(0x59, 'w', 2)], [(0x59, 'r', 3)]]
+
+
+def test_transfers_are_combined_into_one_ioctl():
+    bus = FakeI2cRdwrBus([0x59, 0x44])
+    results = execute_transfers(create_channel(bus), [ReadId(), ReadIdFrom(), ReadId(), ReadIdDelayed(), ReadId()])
+    assert results == ((0x3682,), (0x3684,), (0x3682,), (0x3683,), (0x3682,))
+    assert [len(call) for call in bus.calls] == [6, 1, 1, 2]
+
+
+def test_transfers_are_split_at_the_message_limit():
+    bus = FakeI2cRdwrBus([0x59])
+    results = execute_transfers(create_channel(bus), [ReadId()] * 30)
+    assert results == ((0x3682,),) * 30
+    assert [len(call) for call in bus.calls] == [42, 18]
+
+
+def test_nack_is_reported():
+    bus = FakeI2cRdwrBus([0x59])
+    with pytest.raises(I2cNackError):
+        execute_transfer(create_channel(bus, slave_address=0x10), ReadId())
+    with pytest.raises(I2cNackError):
+        execute_transfers(create_channel(bus), [ReadId(), ReadIdFrom()])
+
+
+@pytest.mark.parametrize("connection_type", [I2cConnection, I2cBatchConnection])
+def test_reused_tx_buffer_with_transceiver(connection_type):
+    bus = FakeI2cRdwrBus([0x59])
+    transceiver = LinuxI2cRdwrTransceiver('/dev/i2c-fake', do_open=False, ioctl=bus.ioctl)
+    channel = I2cChannel(connection_type(transceiver), slave_address=0x59, crc=CRC, reuse_tx_buffer=True)
+    assert execute_transfer(channel, ReadId()) == (0x3682,)
+    assert execute_transfer(channel, ReadIdDelayed()) == (0x3683,)
+    assert execute_transfers(channel, [ReadId(), ReadIdDelayed()]) == ((0x3682,), (0x3683,))
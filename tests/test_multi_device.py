@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2021 Sensirion AG, Switzerland
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import i2c_device_mocks as mocks
-from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+from circuitpython_sensirion_driver_adapters.channel import AbstractMultiChannel
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import RandomResponse
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import ChannelFailure, QuarantineBackoff, multi_driver
 
 
 @multi_driver(mocks.DummyDriver)
@@ -52,3 +59,147 @@ def test_parallel_multi_sensor_with_init():
                                          test_str="hello")
     driver.invoke_command(50, 10)
     driver.do_something()
+
+
+def test_parallel_multi_sensor_reuses_worker_pool():
+    with ParallelDummyDriver(mocks.create_multi_channel(nr_of_channels=4,
+                                                        i2c_address=0x59,
+                                                        cmd_width=2,
+                                                        crc=(8, 0x31, 0xFF, 0))) as driver:
+        driver.invoke_command(50, 10)
+        executor = driver._executor
+        assert executor is not None
+        driver.invoke_command(50, 10)
+        assert driver._executor is executor
+    assert driver._executor is None
+
+
+def test_parallel_multi_sensor_with_shared_executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+
+        @multi_driver(mocks.DummyDriver, execute_concurrent=True, executor=executor)
+        class SharedPoolDummyDriver:
+            ...
+
+        drivers = [SharedPoolDummyDriver(mocks.create_multi_channel(nr_of_channels=3,
+                                                                    i2c_address=0x59,
+                                                                    cmd_width=2,
+                                                                    crc=(8, 0x31, 0xFF, 0)))
+                   for _ in range(2)]
+        for driver in drivers:
+            assert len(driver.invoke_command(50, 10)) == 3
+            driver.close()
+            assert driver._executor is None
+        assert not executor._shutdown
+
+
+def test_multi_driver_methods_are_generated_once():
+    driver = MultiDummyDriver(mocks.create_multi_channel(nr_of_channels=2,
+                                                         i2c_address=0x59,
+                                                         cmd_width=2,
+                                                         crc=(8, 0x31, 0xFF, 0)))
+    assert 'invoke_command' in type(driver).__dict__
+    assert driver.invoke_command.__func__ is type(driver).__dict__['invoke_command']
+    assert driver.invoke_command.__doc__ == mocks.DummyDriver.invoke_command.__doc__
+    assert isinstance(driver.channel, AbstractMultiChannel)
+    assert len(driver.invoke_command(50, 10)) == 2
+
+
+class ClosableDummyDriver(mocks.DummyDriver):
+    closed_channels = []
+
+    def close(self):
+        ClosableDummyDriver.closed_channels.append(self.channel)
+        return 'closed'
+
+
+@multi_driver(ClosableDummyDriver, execute_concurrent=True)
+class ClosableMultiDriver:
+    ...
+
+
+def test_multi_driver_chains_close_of_driver():
+    ClosableDummyDriver.closed_channels.clear()
+    with ClosableMultiDriver(mocks.create_multi_channel(nr_of_channels=3,
+                                                        i2c_address=0x59,
+                                                        cmd_width=2,
+                                                        crc=(8, 0x31, 0xFF, 0))) as driver:
+        driver.invoke_command(50, 10)
+        assert driver._executor is not None
+        assert driver.close.__doc__ == ClosableDummyDriver.close.__doc__
+        assert driver.close() == ('closed',) * 3
+        assert driver._executor is None
+    assert len(ClosableDummyDriver.closed_channels) == 6
+
+
+class SlowResponse(RandomResponse):
+    def __init__(self, delay: float, fail: bool = False) -> None:
+        self._delay = delay
+        self._fail = fail
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        time.sleep(self._delay)
+        if self._fail:
+            raise IOError("sensor not responding")
+        return super().handle_command(cmd_id, data, response_length)
+
+
+def create_slow_multi_channel(delays, failing=()) -> MultiChannel:
+    return MultiChannel(tuple(MockI2cChannelProvider(command_width=2, mock_id=i,
+                                                     response_provider=SlowResponse(delay, i in failing))
+                              .get_channel(slave_address=0x59, crc_parameters=(8, 0x31, 0xFF, 0))
+                              for i, delay in enumerate(delays)))
+
+
+def test_parallel_multi_sensor_as_completed():
+    with ParallelDummyDriver(create_slow_multi_channel((0.3, 0.0, 0.1), failing=(1,))) as driver:
+        results = list(driver.as_completed('invoke_command', 50, 10))
+    assert [i for i, _ in results] == [1, 2, 0]
+    assert isinstance(results[0][1], IOError)
+    assert len(results[1][1]) == 2
+
+
+def test_multi_sensor_as_completed():
+    driver = MultiDummyDriver(create_slow_multi_channel((0.0, 0.0), failing=(0,)))
+    results = list(driver.as_completed('invoke_command', 50, 10))
+    assert [i for i, _ in results] == [0, 1]
+    assert isinstance(results[0][1], IOError)
+
+
+@multi_driver(mocks.DummyDriver, execute_concurrent=True, isolate_faults=True)
+class IsolatingDummyDriver:
+    ...
+
+
+@multi_driver(mocks.DummyDriver, backoff=QuarantineBackoff(initial_delay=0.2, factor=2.0, max_delay=1.0))
+class QuarantiningDummyDriver:
+    ...
+
+
+def test_multi_sensor_isolates_faults():
+    with IsolatingDummyDriver(create_slow_multi_channel((0.0, 0.0, 0.0), failing=(1,))) as driver:
+        results = driver.invoke_command(50, 10)
+    assert isinstance(results[1], ChannelFailure)
+    assert isinstance(results[1].error, IOError)
+    assert not results[1].quarantined
+    assert len(results[0]) == 2 and len(results[2]) == 2
+
+
+def test_multi_sensor_quarantines_failing_channel():
+    driver = QuarantiningDummyDriver(create_slow_multi_channel((0.0, 0.0), failing=(0,)))
+    first = driver.invoke_command(50, 10)
+    assert not first[0].quarantined
+    assert driver.quarantined_channels() == (0,)
+    second = driver.invoke_command(50, 10)
+    assert second[0].quarantined and second[0].error is first[0].error
+    assert len(second[1]) == 2
+    time.sleep(0.25)
+    assert driver.quarantined_channels() == ()
+    third = driver.invoke_command(50, 10)
+    assert not third[0].quarantined
+    assert driver.quarantined_channels() == (0,)
+
+
+def test_quarantine_backoff():
+    backoff = QuarantineBackoff(initial_delay=0.5, factor=2.0, max_delay=3.0)
+    assert [backoff.delay(n) for n in range(1, 6)] == [0.5, 1.0, 2.0, 3.0, 3.0]
@@ -6,8 +6,11 @@ import pytest
 from sensirion_i2c_driver.crc_calculator import CrcCalculator
 
 from circuitpython_sensirion_driver_adapters.channel import AbstractMultiChannel
+from circuitpython_sensirion_driver_adapters.mocks.sensor_bridge_simulator import SensorBridgeSimulator
 from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
-from circuitpython_sensirion_driver_adapters.multi_sensor_bridge import Config, UsedPorts, I2cMultiSensorBridgeConnection
+from circuitpython_sensirion_driver_adapters import multi_sensor_bridge
+from circuitpython_sensirion_driver_adapters.multi_sensor_bridge import Config, UsedPorts, \
+    I2cMultiSensorBridgeConnection, SensorBridgeBringUpError
 from circuitpython_sensirion_driver_adapters.transfer import Transfer, execute_transfer
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
 
@@ -105,3 +108,99 @@ def test_multi_sensor_bridge_2_devices_4_channel():
             assert len(results) == 4
         finally:
             multi_device.switch_supply_off()
+
+
+class FakeSerialPort:
+    opened = []
+
+    def __init__(self, port, baudrate) -> None:
+        self.port = port
+        self.description = port
+        self.is_open = True
+        FakeSerialPort.opened.append(self)
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeSensorBridge:
+    configuration_time = 0.1
+
+    def __init__(self, connection, slave_address) -> None:
+        self.serial_port = connection.port.port
+        self.supply_on = set()
+
+    def set_i2c_frequency(self, port, frequency):
+        time.sleep(self.configuration_time)
+
+    def set_supply_voltage(self, port, voltage):
+        if self.serial_port == 'FAIL':
+            raise IOError("no response")
+
+    def switch_supply_on(self, port):
+        self.supply_on.add(port)
+
+    def switch_supply_off(self, port):
+        self.supply_on.discard(port)
+
+
+@pytest.fixture
+def fake_sensor_bridges(monkeypatch):
+    FakeSerialPort.opened = []
+    monkeypatch.setattr(multi_sensor_bridge, "ShdlcSerialPort", FakeSerialPort)
+    monkeypatch.setattr(multi_sensor_bridge, "SensorBridgeShdlcDevice", FakeSensorBridge)
+
+
+def test_multi_sensor_bridge_parallel_bring_up(fake_sensor_bridges):
+    configs = [Config(serial_port=f'COM{i}', ports=UsedPorts.ALL) for i in range(8)]
+    start = time.monotonic()
+    with I2cMultiSensorBridgeConnection(config_list=configs, baud_rate=460800, voltage=3.3,
+                                        i2c_frequency=100000) as multi_device:
+        duration = time.monotonic() - start
+        channel = multi_device.get_multi_channel(0x59, CrcCalculator(8, 0x31, 0xFF, 0))
+        assert channel.channel_count == 16
+    assert duration < len(configs) * 2 * FakeSensorBridge.configuration_time / 2
+    assert not any(port.is_open for port in FakeSerialPort.opened)
+
+
+def test_multi_sensor_bridge_failed_bring_up(fake_sensor_bridges):
+    configs = [Config(serial_port='COM1', ports=UsedPorts.ALL), Config(serial_port='FAIL', ports=UsedPorts.PORT_1)]
+    with pytest.raises(SensorBridgeBringUpError) as error:
+        with I2cMultiSensorBridgeConnection(config_list=configs, baud_rate=460800, voltage=3.3,
+                                            i2c_frequency=100000):
+            pass
+    assert list(error.value.errors) == [1]
+    assert error.value.configs[1] is configs[1]
+    assert not any(port.is_open for port in FakeSerialPort.opened)
+
+
+def test_multi_sensor_bridge_failed_bring_up_on_same_port(fake_sensor_bridges):
+    configs = [Config(serial_port='FAIL', ports=UsedPorts.PORT_1), Config(serial_port='FAIL', ports=UsedPorts.PORT_2)]
+    with pytest.raises(SensorBridgeBringUpError) as error:
+        with I2cMultiSensorBridgeConnection(config_list=configs, baud_rate=460800, voltage=3.3,
+                                            i2c_frequency=100000):
+            pass
+    assert sorted(error.value.errors) == [0, 1]
+    assert 'config 0 (FAIL)' in str(error.value) and 'config 1 (FAIL)' in str(error.value)
+
+
+def test_multi_sensor_bridge_simulator():
+    simulator = SensorBridgeSimulator(i2c_address=0x59)
+    configs = [Config(serial_port=f'SIM{i}', ports=UsedPorts.ALL) for i in range(4)]
+    with I2cMultiSensorBridgeConnection(config_list=configs, baud_rate=460800, voltage=3.3, i2c_frequency=400000,
+                                        serial_port_factory=simulator.open_serial_port,
+                                        device_factory=simulator.create_device) as multi_device:
+        assert all(all(bridge.supply_on.values()) for bridge in simulator.bridges.values())
+        channel = multi_device.get_multi_channel(0x59, CrcCalculator(8, 0x31, 0xFF, 0))
+        assert channel.channel_count == 8
+        start = time.monotonic()
+        results = MultiMiniSgp(channel).execute_self_test()
+        duration = time.monotonic() - start
+    assert len(results) == 8
+    # the two ports of a SensorBridge share the serial line, the SensorBridges work in parallel
+    assert duration < 3 * ExecuteSelfTest.tx.device_busy_delay
+    bridges = simulator.bridges
+    assert sorted(bridges) == [config.serial_port for config in configs]
+    assert not any(any(bridge.supply_on.values()) for bridge in bridges.values())
+    assert not any(bridge.serial.is_open for bridge in bridges.values())
+    assert all(bridge.supply_voltage == {port: 3.3 for port in bridge.supply_voltage} for bridge in bridges.values())
@@ -6,6 +6,7 @@ from typing import Iterable
 
 import pytest
 
+from circuitpython_sensirion_driver_adapters import lazy_import
 from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData, TxData
 
 
@@ -66,3 +67,79 @@ def test_dynamic_unpack(rx: RxData, data):
     not_equal = filter(lambda x: x[0] != x[1], zip(data, all_received))
 
     assert not any(not_equal)
+
+
+def test_dynamic_unpack_array_followed_by_scalar():
+    rx = RxData('>H4BH')
+    packed = struct.pack('>H4BH', 0xABCD, 1, 2, 3, 4, 0x1234)
+    assert rx.unpack_dynamic_sized(packed) == (0xABCD, (1, 2, 3, 4), 0x1234)
+
+
+def test_compiled_plan_merges_scalar_fields():
+    rx = RxData('>HHI8BH16s')
+    layout = [(f.offset, f.count, f.is_array, f.is_string) for f in rx.plan]
+    assert layout == [(0, 1, False, False), (8, 8, True, False), (16, 1, False, False), (18, 16, True, True)]
+
+
+def test_dynamic_unpack_truncated_string():
+    rx = RxData('>32s')
+    assert rx.unpack_dynamic_sized(b'SVM41') == ('SVM41',)
+    assert rx.unpack_dynamic_sized(b'SVM41\x00\x00\x00') == ('SVM41',)
+
+
+def test_pack_into():
+    tx = TxData(0xABCD, ">HH8s")
+    buffer = bytearray(2 + tx.size)
+    assert tx.pack_into(buffer, 2, [1234, "hello"]) == tx.size == 12
+    assert buffer[2:] == tx.pack([1234, "hello"])
+    assert buffer[:2] == b'\x00\x00'
+
+
+@pytest.mark.parametrize("use_numpy", [False, pytest.param(True, marks=pytest.mark.skipif(
+    lazy_import.numpy() is None, reason="numpy is not installed"))])
+@pytest.mark.parametrize("descriptor, convert_to_int", [('>Hh?f', False), ('<I4B', False), ('>H4B', True),
+                                                        ('>H6s', False)])
+def test_unpack_many(descriptor, convert_to_int, use_numpy):
+    rx = RxData(descriptor, convert_to_int=convert_to_int)
+    rows = [(i, -i, i % 2 == 0, i / 2) for i in range(20)]
+    if descriptor.endswith('4B'):
+        rows = [(i, 1, 2, 3, i) for i in range(20)]
+    elif descriptor.endswith('s'):
+        rows = [(i, f'id{i}'.encode()) for i in range(20)]
+    data = b''.join(struct.pack(descriptor, *row) for row in rows)
+    columns = rx.unpack_many(data + b'\x00', use_numpy=use_numpy)
+    frames = [rx.unpack(data[i * rx.rx_length:(i + 1) * rx.rx_length]) for i in range(len(rows))]
+    for column, expected in zip(columns, zip(*frames)):
+        if not convert_to_int and isinstance(expected[0], tuple):
+            expected = [value for row in expected for value in row]
+        assert list(column) == list(expected)
+    assert len(rx.unpack_many(data, count=3, use_numpy=use_numpy)[0]) == 3
+
+
+@pytest.mark.skipif(lazy_import.numpy() is None, reason="numpy is not installed")
+@pytest.mark.parametrize("descriptor", ['>Hh?f', '<I4B', '>H6s', '>BsH', '@BHB3hId', '@b2Bq'])
+def test_unpack_many_paths_agree(descriptor):
+    rx = RxData(descriptor)
+    frame_count = 5
+    data = bytes(range(256))[:rx.rx_length * frame_count]
+    pure = rx.unpack_many(data, use_numpy=False)
+    vectorized = rx.unpack_many(data, use_numpy=True)
+    assert len(pure) == len(vectorized)
+    for pure_column, numpy_column in zip(pure, vectorized):
+        assert len(pure_column) == len(numpy_column)
+        assert list(pure_column) == list(numpy_column)
+    frames = [rx.unpack(data[i * rx.rx_length:(i + 1) * rx.rx_length]) for i in range(frame_count)]
+    scalars = [column for column, value in zip(pure, frames[0]) if not isinstance(value, (tuple, str))]
+    assert [tuple(value for value in frame if not isinstance(value, (tuple, str))) for frame in frames] == \
+        list(zip(*scalars))
+
+
+def test_native_alignment():
+    rx = RxData('@B2BHBd')
+    values = (1, 2, 3, 0x1234, 5, 0.5)
+    assert rx.unpack_dynamic_sized(struct.pack('@B2BHBd', *values)) == (1, (2, 3), 0x1234, 5, 0.5)
+
+
+def test_unpack_many_empty_descriptor():
+    with pytest.raises(ValueError):
+        RxData().unpack_many(b'\x00\x00')
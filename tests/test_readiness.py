@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import time
+
+import pytest
+from sensirion_i2c_driver import I2cConnection
+from sensirion_i2c_driver.transceiver_v1 import I2cTransceiverV1
+
+from circuitpython_sensirion_driver_adapters.i2c_adapter import linux_i2c_channel_provider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_channel_provider import LinuxI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.readiness import FixedDelay, PollUntilAck, \
+    ReadinessCallback
+from circuitpython_sensirion_driver_adapters.i2c_adapter.transceiver_registry import TransceiverRegistry
+
+
+class BootingTransceiver(I2cTransceiverV1):
+    """Transceiver of devices that NACK their address until they have booted"""
+
+    def __init__(self, device_file=None, boot_time: float = 0.01) -> None:
+        self._ready_time = time.monotonic() + boot_time
+        self.probes = []
+
+    @property
+    def channel_count(self):
+        return None
+
+    @property
+    def description(self):
+        return "booting devices"
+
+    def open(self):
+        ...
+
+    def close(self):
+        ...
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        if tx_data is None and rx_length == 1:
+            self.probes.append(slave_address)
+        if tx_data == b'\x06' and slave_address == 0:
+            self._ready_time = time.monotonic() + 0.01
+        elif time.monotonic() < self._ready_time:
+            return self.STATUS_NACK, None, b""
+        return self.STATUS_OK, None, b""
+
+
+def test_poll_until_ack_backs_off():
+    results = iter([False, False, False, True])
+    delays = []
+    strategy = PollUntilAck(initial_delay=0.001, factor=2.0, max_delay=0.003)
+    start = time.monotonic()
+    strategy.wait_until_ready(lambda: delays.append(time.monotonic() - start) or next(results))
+    assert len(delays) == 4
+    assert delays[-1] >= 0.001 + 0.002 + 0.003
+    with pytest.raises(TimeoutError):
+        PollUntilAck(timeout=0.01).wait_until_ready(lambda: False)
+
+
+def test_readiness_callback():
+    calls = []
+    ReadinessCallback(calls.append).wait_until_ready()
+    assert calls == [None]
+
+
+def test_linux_provider_polls_devices(monkeypatch):
+    monkeypatch.setattr(linux_i2c_channel_provider, "LinuxI2cTransceiver", BootingTransceiver)
+    monkeypatch.setattr(linux_i2c_channel_provider, "LinuxI2cRdwrTransceiver", BootingTransceiver)
+    start = time.monotonic()
+    with LinuxI2cChannelProvider('/dev/i2c-1', readiness=PollUntilAck(), registry=TransceiverRegistry()) as provider:
+        assert time.monotonic() - start < 0.05
+        provider.get_channel(0x59, None)
+        provider.get_channel(0x59, None)
+        channel = provider.get_channel(0x44, None)
+        transceiver = channel._connection._transceiver.transceiver
+        # the address 0x59 is probed until it is acknowledged, 0x44 is acknowledged at once
+        assert transceiver.probes.count(0x59) > 1
+        assert transceiver.probes.count(0x44) == 1
+        # after a reset, the devices are probed again
+        channel.i2c_general_call_reset()
+        provider.get_channel(0x44, None)
+        assert transceiver.probes.count(0x44) == 2
+    assert provider._ready_devices == set()
+    with LinuxI2cChannelProvider('/dev/i2c-1', registry=TransceiverRegistry()) as provider:
+        assert isinstance(provider.readiness, FixedDelay)
+        assert provider.readiness.delay == 0.1
+
+
+def test_general_call_reset_with_readiness():
+    transceiver = BootingTransceiver(boot_time=0.0)
+    channel = I2cChannel(I2cConnection(transceiver), slave_address=0x59)
+    start = time.monotonic()
+    channel.i2c_general_call_reset(PollUntilAck())
+    assert time.monotonic() - start < 0.04
+    assert len(transceiver.probes) > 1
+    assert channel.probe()
+    assert channel.probe(quick_write=True)
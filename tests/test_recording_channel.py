@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import io
+
+import pytest
+from sensirion_i2c_driver.errors import I2cChecksumError
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.channel import WriteReadRequest
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.mock_shdlc_channel_provider import ShdlcMockPortChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import ReplayResponse
+from circuitpython_sensirion_driver_adapters.mocks.simulated_i2c_bus import SimulatedI2cBusChannelProvider
+from circuitpython_sensirion_driver_adapters.recording_channel import ChannelLogWriter, RecordingChannel, \
+    ReplayChannel, ReplayError, read_channel_log
+from circuitpython_sensirion_driver_adapters.rx_tx_data import RxData
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+
+
+def record_measurements(log: io.BytesIO, nr_of_measurements: int) -> list:
+    channel = MockI2cChannelProvider(command_width=2).get_channel(0x44, CRC_PARAMETERS)
+    with RecordingChannel(channel, log) as recording_channel:
+        driver = mocks.DummyDriver(recording_channel)
+        return [driver.invoke_command(i, 2 * i) for i in range(nr_of_measurements)]
+
+
+def test_record_and_replay():
+    log = io.BytesIO()
+    results = record_measurements(log, 5)
+    records = list(read_channel_log(io.BytesIO(log.getvalue())))
+    assert len(records) == 5
+    assert records[1].tx_bytes == mocks.MeasureRawSignals(1, 2).pack()
+    assert records[1].payload_offset == 2
+    assert len(records[1].rx_data) == 4  # the CRCs are stripped
+    assert len(records[1].raw_rx_data) == 6  # the raw frame contains the CRCs
+    assert records[1].device_busy_delay == pytest.approx(mocks.MeasureRawSignals.tx.device_busy_delay)
+    assert records[1].duration >= records[1].device_busy_delay
+    assert records[1].post_processing_delay is None and records[1].error is None
+    replay = mocks.DummyDriver(ReplayChannel(io.BytesIO(log.getvalue()), loop=False))
+    assert [replay.invoke_command(i, 2 * i) for i in range(5)] == results
+    with pytest.raises(ReplayError):
+        replay.invoke_command(0, 0)
+    # with a protocol channel, the raw frames are decoded by the real strip_protocol
+    protocol = MockI2cChannelProvider(command_width=2).get_channel(0x44, CRC_PARAMETERS)
+    replay = mocks.DummyDriver(ReplayChannel(io.BytesIO(log.getvalue()), protocol=protocol))
+    assert [replay.invoke_command(i, 2 * i) for i in range(5)] == results
+
+
+def test_replay_crc_error():
+    log = io.BytesIO()
+    provider = SimulatedI2cBusChannelProvider()
+    # the sensor uses other CRC parameters than the channel, hence the CRC check fails
+    provider.bus.add_sensor(0x44, crc_parameters=(8, 0x31, 0x00, 0x00))
+    rx = RxData('>HH')
+    with RecordingChannel(provider.get_channel(0x44, CRC_PARAMETERS), log) as channel:
+        with pytest.raises(I2cChecksumError):
+            channel.write_read(b'\x36\x82', 2, rx)
+    record, = read_channel_log(io.BytesIO(log.getvalue()))
+    assert record.error.startswith("I2cChecksumError")
+    assert record.rx_data is None and len(record.raw_rx_data) == 6
+    protocol = SimulatedI2cBusChannelProvider().get_channel(0x44, CRC_PARAMETERS)
+    with pytest.raises(I2cChecksumError):
+        ReplayChannel([record], protocol=protocol).write_read(b'\x36\x82', 2, rx)
+    with pytest.raises(ReplayError, match="I2cChecksumError"):
+        ReplayChannel([record]).write_read(b'\x36\x82', 2, rx)
+
+
+def test_errors_and_truncated_logs():
+    log = io.BytesIO()
+    channel = SimulatedI2cBusChannelProvider().get_channel(0x44, CRC_PARAMETERS)
+    with ChannelLogWriter(log) as writer:
+        with pytest.raises(Exception):
+            mocks.DummyDriver(RecordingChannel(channel, writer)).invoke_command(1, 2)
+        RecordingChannel(channel, writer).write_read(b'\x36\x82', 2, None, ignore_errors=True)
+    data = log.getvalue()
+    records = list(read_channel_log(io.BytesIO(data)))
+    assert records[0].error.startswith("I2cNackError")
+    assert records[1].error is None and records[1].rx_data is None
+    # a partially written record at the end of the log is ignored
+    assert len(list(read_channel_log(io.BytesIO(data[:-1])))) == 1
+    replay = ReplayChannel(records)
+    with pytest.raises(ReplayError, match="I2cNackError"):
+        mocks.DummyDriver(replay).invoke_command(1, 2)
+    assert replay.write_read(b'\x36\x82', 2, None) is None
+    with pytest.raises(ValueError):
+        list(read_channel_log(io.BytesIO(b'no log')))
+
+
+def test_failing_batch():
+    log = io.BytesIO()
+    provider = SimulatedI2cBusChannelProvider()
+    provider.bus.add_sensor(0x44)
+    channel = RecordingChannel(provider.get_channel(0x44, CRC_PARAMETERS), log)
+    rx = RxData('>H')
+    requests = [WriteReadRequest(b'\x36\x82', 2, rx),
+                WriteReadRequest(b'\x36\x82', 2, None, slave_address=0x45),
+                WriteReadRequest(b'\x36\x82', 2, rx),
+                WriteReadRequest(b'\x36\x82', 2, None)]
+    with pytest.raises(Exception):
+        channel.write_read_batch(requests)
+    records = list(read_channel_log(io.BytesIO(log.getvalue())))
+    # the requests after the failing one were not executed
+    assert [record.slave_address for record in records] == [None, 0x45]
+    assert records[0].error is None and len(records[0].rx_data) == 2
+    assert records[1].error.startswith("I2cNackError")
+
+
+def test_replay_response_with_sensor_mock():
+    log = io.BytesIO()
+    results = record_measurements(log, 3)
+    provider = MockI2cChannelProvider(command_width=2, response_provider=ReplayResponse(io.BytesIO(log.getvalue())))
+    driver = mocks.DummyDriver(provider.get_channel(0x44, CRC_PARAMETERS))
+    assert [driver.invoke_command(i, 2 * i) for i in range(3)] == results
+
+
+def test_record_shdlc_channel():
+    log = io.BytesIO()
+    rx = RxData('>BB')
+    with ShdlcMockPortChannelProvider() as provider:
+        with RecordingChannel(provider.get_channel(0.1), log) as channel:
+            result = channel.write_read(b'\xd1', 1, rx)
+    record, = read_channel_log(io.BytesIO(log.getvalue()))
+    assert record.dynamic_sized
+    assert ReplayChannel([record]).write_read(b'\xd1', 1, rx) == result
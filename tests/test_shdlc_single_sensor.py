@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright 2022 Sensirion AG, Switzerland
 
+import time
+
 import pytest
 from sensirion_shdlc_driver.errors import ShdlcDeviceError
 
@@ -163,3 +165,30 @@ def test_get_voc_state(svm41):
             svm41.stop_measurement()
         except ShdlcDeviceError:
             pass
+
+
+def test_post_processing_delay_is_deferred():
+    with ShdlcMockPortChannelProvider(response_provider=Svm41ResponseProvider()) as provider:
+        channel = provider.get_channel(0.1)
+        start = time.monotonic()
+        channel.write_read(bytes([0x01]), 1, None, post_processing_delay=0.1)
+        assert time.monotonic() - start < 0.05
+        assert channel.busy_tracker.remaining(0) > 0.05
+        # the next command to the device waits for the rest of the post processing delay
+        channel.write_read(bytes([0xd1]), 1, FirmwareVersion.rx)
+        assert time.monotonic() - start >= 0.1
+        assert channel.busy_tracker.remaining(0) == 0.0
+
+
+def test_post_processing_delay_is_deferred_after_error(monkeypatch):
+    with ShdlcMockPortChannelProvider(response_provider=Svm41ResponseProvider()) as provider:
+        channel = provider.get_channel(0.1)
+
+        def failing_transceive(*args, **kwargs):
+            raise ShdlcDeviceError(0x20)
+
+        monkeypatch.setattr(channel, '_transceive', failing_transceive)
+        with pytest.raises(ShdlcDeviceError):
+            channel.write_read(bytes([0x01]), 1, None, post_processing_delay=0.1)
+        # the device does its post processing anyway, hence the next command has to wait
+        assert channel.busy_tracker.remaining(0) > 0.05
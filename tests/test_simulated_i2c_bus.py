@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sensirion_i2c_driver import I2cConnection
+from sensirion_i2c_driver.errors import I2cNackError
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.clock import VirtualClock
+from circuitpython_sensirion_driver_adapters.i2c_adapter.i2c_channel import I2cChannel
+from circuitpython_sensirion_driver_adapters.mocks.i2c_sensor_mock import I2cSensorMock
+from circuitpython_sensirion_driver_adapters.mocks.response_provider import ResponseProvider
+from circuitpython_sensirion_driver_adapters.mocks.simulated_i2c_bus import SimulatedI2cBus, \
+    SimulatedI2cBusChannelProvider
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+ADDRESSES = range(0x08, 0x78)
+
+
+class AddressResponse(ResponseProvider):
+    """Responds with the address of the sensor and the command"""
+
+    def __init__(self, address: int) -> None:
+        self._address = address
+
+    def get_id(self) -> str:
+        return f"address-{self._address}"
+
+    def handle_command(self, cmd_id: int, data: bytes, response_length: int) -> bytes:
+        return bytes([0, self._address, cmd_id >> 8, cmd_id & 0xFF])[:response_length]
+
+
+class ResetCountingSensor(I2cSensorMock):
+    def __init__(self) -> None:
+        super().__init__(None)
+        self.reset_count = 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.reset_count += 1
+
+
+def test_sensors_are_addressed_individually():
+    provider = SimulatedI2cBusChannelProvider()
+    for address in (0x44, 0x45):
+        provider.bus.add_sensor(address, response_provider=AddressResponse(address))
+    assert mocks.DummyDriver(provider.get_channel(0x44, CRC_PARAMETERS)).invoke_command(1, 2) == (0x44, 0x2619)
+    assert mocks.DummyDriver(provider.get_channel(0x45, CRC_PARAMETERS)).invoke_command(1, 2) == (0x45, 0x2619)
+    unknown = provider.get_channel(0x46, CRC_PARAMETERS)
+    with pytest.raises(I2cNackError):
+        mocks.DummyDriver(unknown).invoke_command(1, 2)
+    assert not unknown.probe()
+    assert provider.get_channel(0x44, CRC_PARAMETERS).probe()
+
+
+def test_bus_as_transceiver():
+    bus = SimulatedI2cBus(byte_time=0.0)
+    bus.add_sensor(0x59, response_provider=AddressResponse(0x59))
+    channel = I2cChannel(I2cConnection(bus), slave_address=0x59,
+                         crc=SimulatedI2cBusChannelProvider.try_create_crc_calculator(CRC_PARAMETERS))
+    assert mocks.DummyDriver(channel).invoke_command(1, 2) == (0x59, 0x2619)
+    with pytest.raises(I2cNackError):
+        mocks.DummyDriver(I2cChannel(I2cConnection(bus), slave_address=0x10)).invoke_command(1, 2)
+
+
+def test_general_call_reset():
+    clock = VirtualClock()
+    bus = SimulatedI2cBus(clock=clock)
+    sensors = [bus.add_sensor(address, sensor=ResetCountingSensor()) for address in (0x10, 0x11)]
+    channel = SimulatedI2cBusChannelProvider(bus).get_channel(0x10, None)
+    channel.i2c_general_call_reset()
+    assert [sensor.reset_count for sensor in sensors] == [1, 1]
+    # the channel waits for the devices to reboot before the next command
+    channel.probe()
+    assert clock.monotonic() >= 0.05
+
+
+def test_many_sensors_share_the_bus():
+    clock = VirtualClock()
+    bus = SimulatedI2cBus(frequency=400000, clock=clock)
+    for address in ADDRESSES:
+        bus.add_sensor(address, response_provider=AddressResponse(address))
+    provider = SimulatedI2cBusChannelProvider(bus)
+    channel = MultiChannel(tuple(provider.get_channel(address, CRC_PARAMETERS) for address in ADDRESSES))
+
+    @multi_driver(mocks.DummyDriver, execute_concurrent=True, executor=ThreadPoolExecutor(max_workers=8), clock=clock)
+    class BusDriver:
+        ...
+
+    results = BusDriver(channel).invoke_command(1, 2)
+    assert results == tuple((address, 0x2619) for address in ADDRESSES)
+    assert bus.transfer_count == 2 * len(ADDRESSES)
+    # the measurements overlap, but the transfers are serialized on the bus
+    frame_bytes = (1 + 8) + (1 + 6)
+    bus_time = len(ADDRESSES) * frame_bytes * 9 / 400000
+    measurement_time = mocks.MeasureRawSignals.tx.device_busy_delay
+    assert max(bus_time, measurement_time) <= clock.monotonic() < measurement_time + 2 * bus_time
+
+
+def test_channel_defers_post_processing_to_next_command():
+    clock = VirtualClock()
+    bus = SimulatedI2cBus(byte_time=0.0, clock=clock)
+    for address in (0x59, 0x5A):
+        bus.add_sensor(address, response_provider=AddressResponse(address))
+    channel = I2cChannel(bus, slave_address=0x59, clock=clock)
+    channel.write_read(b'\x36\x15', payload_offset=2, response=None, device_busy_delay=0.5)
+    # the connection returns at once, the channel remembers when the device is ready again
+    assert clock.monotonic() == 0.0
+    assert channel.busy_tracker.remaining(0x59) == pytest.approx(0.5)
+    channel.write_read(b'\x36\x15', payload_offset=2, response=None, slave_address=0x5A)
+    assert clock.monotonic() == 0.0
+    channel.write_read(b'\x36\x15', payload_offset=2, response=None)
+    assert clock.monotonic() == pytest.approx(0.5)
+
+
+def test_i2c_connection_waits_for_post_processing_at_once():
+    bus = SimulatedI2cBus(byte_time=0.0)
+    bus.add_sensor(0x59, response_provider=AddressResponse(0x59))
+    # e.g. the channels of two providers that share one transceiver, each with its own busy tracker
+    first, second = (I2cChannel(I2cConnection(bus), slave_address=0x59) for _ in range(2))
+    start = time.monotonic()
+    first.write_read(b'\x36\x15', payload_offset=2, response=None, device_busy_delay=0.05)
+    assert time.monotonic() - start >= 0.05
+    assert first.busy_tracker.remaining(0x59) == 0.0
+    second.write_read(b'\x36\x15', payload_offset=2, response=None)
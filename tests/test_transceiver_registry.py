@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sensirion_shdlc_sensorbridge import SensorBridgePort
+
+from circuitpython_sensirion_driver_adapters.i2c_adapter import linux_i2c_channel_provider, \
+    sensor_bridge_i2c_channel_provider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.linux_i2c_channel_provider import LinuxI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.sensor_bridge_i2c_channel_provider import \
+    SensorBridgeI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.i2c_adapter.transceiver_registry import SharedTransceiver, \
+    TransceiverRegistry
+from circuitpython_sensirion_driver_adapters.mocks.sensor_bridge_simulator import SensorBridgeSimulator
+
+CRC_PARAMETERS = (8, 0x31, 0xFF, 0x00)
+
+
+class FakeTransceiver:
+    API_VERSION = 1
+    STATUS_OK = 0
+    instances = []
+
+    def __init__(self, device_file) -> None:
+        self.device_file = device_file
+        self.is_open = True
+        self.active = 0
+        self.max_active = 0
+        FakeTransceiver.instances.append(self)
+
+    @property
+    def channel_count(self):
+        return None
+
+    def transceive(self, slave_address, tx_data, rx_length, read_delay, timeout):
+        self.active += 1
+        self.max_active = max(self.active, self.max_active)
+        time.sleep(0.001)
+        self.active -= 1
+        return self.STATUS_OK, None, b""
+
+    def close(self):
+        self.is_open = False
+
+
+def test_registry_counts_references():
+    registry = TransceiverRegistry()
+    closed = []
+    first = registry.acquire('bus', lambda lock: object(), closed.append)
+    second = registry.acquire('bus', lambda lock: object(), closed.append)
+    assert first is second
+    assert registry.ref_count('bus') == 2
+    registry.release('bus')
+    assert closed == []
+    registry.release('bus')
+    assert closed == [first]
+    assert registry.ref_count('bus') == 0
+    assert registry.acquire('bus', lambda lock: object(), closed.append) is not first
+
+
+def test_registry_opens_resources_outside_its_lock():
+    registry = TransceiverRegistry()
+    opening = threading.Event()
+    proceed = threading.Event()
+    opened = []
+
+    def open_slowly(lock):
+        opening.set()
+        proceed.wait()
+        opened.append(object())
+        return opened[-1]
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    slow = executor.submit(registry.acquire, 'slow', open_slowly, lambda resource: None)
+    opening.wait()
+    waiting = executor.submit(registry.acquire, 'slow', open_slowly, lambda resource: None)
+    # other keys are not blocked while a resource is opened
+    assert registry.acquire('fast', lambda lock: 'fast', lambda resource: None) == 'fast'
+    proceed.set()
+    assert slow.result() is waiting.result() is opened[0]
+    assert len(opened) == 1 and registry.ref_count('slow') == 2
+    executor.shutdown()
+
+
+def test_registry_open_error():
+    registry = TransceiverRegistry()
+
+    def fail(lock):
+        raise OSError("no such device")
+
+    with pytest.raises(OSError):
+        registry.acquire('bus', fail, lambda resource: None)
+    assert registry.ref_count('bus') == 0
+    assert registry.acquire('bus', lambda lock: 'bus', lambda resource: None) == 'bus'
+
+
+def test_shared_transceiver_serializes_access():
+    registry = TransceiverRegistry()
+    shared = registry.acquire('bus', lambda lock: SharedTransceiver(FakeTransceiver('bus'), lock),
+                              lambda s: s.close())
+    threads = [threading.Thread(target=lambda: [shared.transceive(0x10, b'\x00', None, 0.0, 0.0) for _ in range(5)])
+               for _ in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert shared.transceiver.max_active == 1
+    assert shared.channel_count is None
+    registry.release('bus')
+    assert not shared.transceiver.is_open
+
+
+def test_linux_providers_share_the_transceiver(monkeypatch):
+    FakeTransceiver.instances = []
+    monkeypatch.setattr(linux_i2c_channel_provider, "LinuxI2cTransceiver", FakeTransceiver)
+    monkeypatch.setattr(linux_i2c_channel_provider, "LinuxI2cRdwrTransceiver", FakeTransceiver)
+    registry = TransceiverRegistry()
+    with LinuxI2cChannelProvider('/dev/i2c-1', registry=registry) as first:
+        with LinuxI2cChannelProvider('/dev/i2c-1', registry=registry, combined_transactions=True) as second:
+            first.get_channel(0x59, CRC_PARAMETERS)
+            second.get_channel(0x44, CRC_PARAMETERS)
+            assert len(FakeTransceiver.instances) == 1
+        assert FakeTransceiver.instances[0].is_open
+    assert not FakeTransceiver.instances[0].is_open
+
+
+def test_sensor_bridge_providers_share_the_bridge(monkeypatch):
+    simulator = SensorBridgeSimulator()
+    opened = []
+
+    def open_serial_port(port, baudrate):
+        opened.append(simulator.open_serial_port(port, baudrate))
+        return opened[-1]
+
+    monkeypatch.setattr(sensor_bridge_i2c_channel_provider, "ShdlcSerialPort", open_serial_port)
+    monkeypatch.setattr(sensor_bridge_i2c_channel_provider, "ShdlcConnection", lambda port: port)
+    monkeypatch.setattr(sensor_bridge_i2c_channel_provider, "SensorBridgeShdlcDevice",
+                        lambda connection, slave_address: simulator.create_device(connection))
+    registry = TransceiverRegistry()
+    providers = [SensorBridgeI2cChannelProvider(port, serial_port='COM1', serial_baud_rate=460800, registry=registry)
+                 for port in (SensorBridgePort.ONE, SensorBridgePort.ONE, SensorBridgePort.TWO)]
+    [provider.prepare_channel() for provider in providers]
+    bridge = simulator.bridges['COM1']
+    assert len(opened) == 1
+    # each port is configured once
+    assert bridge.command_count == 6
+    assert bridge.supply_on == {SensorBridgePort.ONE: True, SensorBridgePort.TWO: True}
+    providers[0].release_channel_resources()
+    assert bridge.supply_on[SensorBridgePort.ONE]
+    providers[1].release_channel_resources()
+    assert not bridge.supply_on[SensorBridgePort.ONE]
+    assert opened[0].is_open
+    providers[2].release_channel_resources()
+    assert not opened[0].is_open
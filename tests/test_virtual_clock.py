@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright 2023 Sensirion AG, Switzerland
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import i2c_device_mocks as mocks
+from circuitpython_sensirion_driver_adapters.clock import VirtualClock
+from circuitpython_sensirion_driver_adapters.mocks.mock_i2c_channel_provider import MockI2cChannelProvider
+from circuitpython_sensirion_driver_adapters.mocks.mock_shdlc_channel_provider import ShdlcMockPortChannelProvider
+from circuitpython_sensirion_driver_adapters.multi_channel import MultiChannel
+from circuitpython_sensirion_driver_adapters.multi_device_support import multi_driver
+
+NR_OF_SENSORS = 300
+MEASUREMENT_TIME = mocks.MeasureRawSignals.tx.device_busy_delay
+
+shared_executor = ThreadPoolExecutor(max_workers=16)
+
+
+def create_multi_channel(clock: VirtualClock) -> MultiChannel:
+    return MultiChannel(tuple(MockI2cChannelProvider(command_width=2, mock_id=i, clock=clock)
+                              .get_channel(slave_address=0x44, crc_parameters=(8, 0x31, 0xFF, 0x00))
+                              for i in range(NR_OF_SENSORS)))
+
+
+def test_virtual_clock_branches():
+    clock = VirtualClock(start=10.0)
+    clock.sleep(1.0)
+    assert clock.monotonic() == 11.0
+    branches = [clock.branch(clock.sleep) for _ in range(3)]
+    for delay, branch in zip((0.5, 2.0, 1.0), branches):
+        branch(delay)
+    # the branches run in parallel, the calling thread waits for the longest one
+    assert clock.monotonic() == 11.0
+    clock.join(branches)
+    assert clock.monotonic() == 13.0
+
+
+@pytest.mark.parametrize("execute_concurrent", [True, False])
+def test_simulate_many_sensors(execute_concurrent):
+    clock = VirtualClock()
+
+    @multi_driver(mocks.DummyDriver, execute_concurrent=execute_concurrent, executor=shared_executor, clock=clock)
+    class SimulatedDriver:
+        ...
+
+    driver = SimulatedDriver(create_multi_channel(clock))
+    start = time.monotonic()
+    results = driver.invoke_command(50, 10)
+    duration = time.monotonic() - start
+    assert len(results) == NR_OF_SENSORS
+    # the simulated measurements take no real time, but the virtual time passes as on real hardware
+    assert duration < NR_OF_SENSORS * MEASUREMENT_TIME / 10
+    expected = MEASUREMENT_TIME if execute_concurrent else NR_OF_SENSORS * MEASUREMENT_TIME
+    assert clock.monotonic() == pytest.approx(expected)
+
+
+def test_as_completed_in_virtual_time():
+    clock = VirtualClock()
+
+    @multi_driver(mocks.DummyDriver, execute_concurrent=True, executor=shared_executor, clock=clock)
+    class SimulatedDriver:
+        ...
+
+    channel = create_multi_channel(clock)
+    driver = SimulatedDriver(channel)
+    # the first sensor is still busy with the post processing of a command without response
+    channel.get_channel(0).write_read(bytes([0x36, 0x82]), 2, None, post_processing_delay=1.0)
+    completed = [(index, clock.monotonic()) for index, _ in driver.as_completed('invoke_command', 50, 10)]
+    assert completed[-1] == (0, pytest.approx(1.0 + MEASUREMENT_TIME))
+    assert all(t == pytest.approx(MEASUREMENT_TIME) for _, t in completed[:-1])
+
+
+def test_shdlc_channel_with_virtual_clock():
+    clock = VirtualClock()
+    with ShdlcMockPortChannelProvider(clock=clock) as provider:
+        channel = provider.get_channel(0.1)
+        start = time.monotonic()
+        channel.write_read(bytes([0x01]), 1, None, post_processing_delay=5.0)
+        assert clock.monotonic() == 0.0
+        channel.write_read(bytes([0x01]), 1, None)
+        assert clock.monotonic() == 5.0
+        assert time.monotonic() - start < 1.0